@@ -0,0 +1,26 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django(test_database=True, database_file=None):
+    """
+    Configure Django for a benchmark script and, by default, create a
+    throwaway test database so the real db.sqlite3 is never touched.
+    Pass database_file to put that database in a file, which several
+    threads can share.
+    """
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'farmbora.settings')
+
+    import django
+    django.setup()
+
+    if test_database:
+        from django.db import connection
+        from django.test.utils import setup_test_environment
+        setup_test_environment()
+        if database_file:
+            connection.settings_dict['TEST']['NAME'] = database_file
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
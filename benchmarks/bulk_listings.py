@@ -0,0 +1,83 @@
+"""
+Creating N product listings with N calls to products/create/ versus one call
+to products/bulk/, through the full request stack (auth, validation, search
+index maintenance) against a throwaway test database.
+
+    python benchmarks/bulk_listings.py --sizes 10 100 500
+"""
+import argparse
+import time
+
+from _django import setup_django
+
+
+def make_farmer():
+    from decimal import Decimal
+    from user.models import CustomUser, FarmerProfile
+
+    user = CustomUser.objects.create(username='bench-farmer')
+    FarmerProfile.objects.create(user=user, farm_name='Bench', farm_location='Nakuru', farm_size=Decimal('1.00'))
+    return user
+
+
+def client_for(user):
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
+
+
+def items(size, prefix):
+    return [
+        {'product_name': f'{prefix} {n}', 'quantity': '10.00', 'price_per_unit': '50.00',
+         'description': 'Benchmark listing.'}
+        for n in range(size)
+    ]
+
+
+def one_by_one(client, payload):
+    from django.urls import reverse
+
+    url = reverse('product-create')
+    for item in payload:
+        assert client.post(url, item, format='json').status_code == 201
+
+
+def in_bulk(client, payload):
+    from django.urls import reverse
+
+    assert client.post(reverse('products-bulk'), payload, format='json').status_code == 201
+
+
+def timed(function, *args):
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        function(*args)
+        elapsed = (time.perf_counter() - started) * 1000
+    return elapsed, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500])
+    args = parser.parse_args()
+
+    setup_django()
+    client = client_for(make_farmer())
+
+    print(f"{'items':>6}{'single ms':>12}{'queries':>9}{'bulk ms':>10}{'queries':>9}{'speedup':>9}")
+    for size in args.sizes:
+        single_ms, single_queries = timed(one_by_one, client, items(size, f'single {size}'))
+        bulk_ms, bulk_queries = timed(in_bulk, client, items(size, f'bulk {size}'))
+        print(f"{size:>6}{single_ms:>12.1f}{single_queries:>9}{bulk_ms:>10.1f}{bulk_queries:>9}"
+              f"{single_ms / bulk_ms:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Rendering handle_success envelopes around large FarmerProfilesListSerializer
+pages with DRF's JSONRenderer versus shared.renderers.EnvelopeJSONRenderer,
+including a payload spliced in pre-encoded (as from a cache) and raw
+values() rows carrying UUID/Decimal/datetime objects. No database needed.
+
+    python benchmarks/envelope_renderer.py --sizes 50 200 1000 --repeat 50
+"""
+import argparse
+import time
+
+from _django import setup_django
+
+
+def make_profiles(size):
+    from decimal import Decimal
+    from django.utils import timezone
+    from user.models import FarmerProfile
+
+    now = timezone.now()
+    return [
+        FarmerProfile(
+            user_id=None,
+            farm_name=f'Farm {i}',
+            farm_location=f'Nakuru {i % 20}',
+            farm_size=Decimal('12.50'),
+            farm_description='Mixed maize and bean smallholding.',
+            latitude=Decimal('-0.303000'),
+            longitude=Decimal('36.080000'),
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(size)
+    ]
+
+
+def timed(render, payload, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        render(payload)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 1000])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django(test_database=False)
+    from rest_framework.renderers import JSONRenderer
+    from shared.renderers import EnvelopeJSONRenderer, RawJSON
+    from user.serializers import FarmerProfilesListSerializer
+
+    drf, envelope = JSONRenderer(), EnvelopeJSONRenderer()
+    print(f"{'rows':>6}  {'payload':<10}{'JSONRenderer ms':>17}{'Envelope ms':>13}{'speedup':>9}")
+    for size in args.sizes:
+        profiles = make_profiles(size)
+        data = FarmerProfilesListSerializer(profiles, many=True).data
+        rows = [
+            {'id': profile.pk, 'farm_size': profile.farm_size, 'latitude': profile.latitude,
+             'longitude': profile.longitude, 'updated_at': profile.updated_at}
+            for profile in profiles
+        ]
+        cases = [
+            ('serialized', {'status': 'success', 'message': 'ok', 'data': data}, None),
+            ('values()', {'status': 'success', 'message': 'ok', 'data': rows}, None),
+            ('cached', {'status': 'success', 'message': 'ok', 'data': data},
+             {'status': 'success', 'message': 'ok', 'data': RawJSON.from_data(data)}),
+        ]
+        for label, payload, spliced in cases:
+            assert envelope.render(spliced or payload) == drf.render(payload)
+            baseline = timed(drf.render, payload, args.repeat)
+            fast = timed(envelope.render, spliced or payload, args.repeat)
+            print(f"{size:>6}  {label:<10}{baseline:>17.3f}{fast:>13.3f}{baseline / fast:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Login throughput and tail latency for a burst of concurrent logins: the
+sync LoginView on a fixed number of sync workers (the WSGI path) versus
+AsyncLoginView on one event loop with the bounded hashing pool.
+
+    python benchmarks/login_concurrency.py --requests 48 --workers 4
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _django import setup_django
+
+PASSWORD = 'harvest-season-2024'
+
+
+def summarise(name, latencies, elapsed, statuses):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    ok = statuses.count(200)
+    print(
+        f"{name:<8}{ok / elapsed:>10.1f}{statistics.median(latencies) * 1000:>10.0f}"
+        f"{p99 * 1000:>10.0f}{ok:>6}{statuses.count(503):>6}"
+    )
+
+
+def run_sync(total, workers):
+    from django.test import Client
+
+    # Latency is measured from the start of the burst, so time spent waiting
+    # for a free worker counts, as it would behind a gunicorn backlog.
+    def login(i):
+        response = Client().post('/api/v1/auth/login/', {'username': f'bench{i}', 'password': PASSWORD})
+        return time.perf_counter() - started, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(login, range(total)))
+    summarise('sync', [r[0] for r in results], time.perf_counter() - started, [r[1] for r in results])
+
+
+def run_async(total, workers, max_pending):
+    from django.test import AsyncClient
+    from shared.workers import BoundedPool
+    from user.views import async_auth
+
+    async_auth.hashing_pool = BoundedPool(max_workers=workers, max_pending=max_pending)
+    client = AsyncClient()
+
+    async def login(i):
+        started = time.perf_counter()
+        response = await client.post(
+            '/api/v1/auth/async/login/',
+            {'username': f'bench{i}', 'password': PASSWORD},
+            content_type='application/json',
+        )
+        return time.perf_counter() - started, response.status_code
+
+    async def burst():
+        return await asyncio.gather(*(login(i) for i in range(total)))
+
+    started = time.perf_counter()
+    results = asyncio.run(burst())
+    summarise(f'async/{max_pending}', [r[0] for r in results], time.perf_counter() - started, [r[1] for r in results])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=48)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(fd)
+    setup_django(database_file=path)
+    # 503s are expected; keep django.request from logging each one.
+    logging.disable(logging.ERROR)
+    try:
+        from django.contrib.auth.hashers import make_password
+        from user.models import CustomUser
+
+        password = make_password(PASSWORD)
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f'bench{i}', password=password) for i in range(args.requests)]
+        )
+
+        print(f"{'path':<8}{'logins/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'ok':>6}{'503':>6}")
+        run_sync(args.requests, args.workers)
+        run_async(args.requests, args.workers, max_pending=args.requests)
+        run_async(args.requests, args.workers, max_pending=args.workers * 2)
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
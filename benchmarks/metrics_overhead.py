@@ -0,0 +1,41 @@
+"""
+Per-request cost of shared.metrics.MetricsMiddleware around a view that
+does nothing, i.e. the overhead it adds to every request.
+
+    python benchmarks/metrics_overhead.py --requests 200000
+"""
+import argparse
+import time
+
+from _django import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200_000)
+    args = parser.parse_args()
+
+    setup_django(test_database=False)
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from django.urls import resolve
+    from shared.metrics import MetricsMiddleware
+
+    request = RequestFactory().get('/api/v1/auth/farmer/profiles/list/')
+    request.resolver_match = resolve('/api/v1/auth/farmer/profiles/list/')
+    response = HttpResponse(b'{}')
+
+    def view(request):
+        return response
+
+    middleware = MetricsMiddleware(view)
+    for label, handler in (('bare view', view), ('with middleware', middleware)):
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            handler(request)
+        per_request = (time.perf_counter() - started) / args.requests * 1e6
+        print(f"{label:<16}{per_request:>8.2f} us/request")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Nearby-farm lookup through the geohash index versus a full scan, for a
+growing number of farms spread over Kenya.
+
+    python benchmarks/nearby_farms.py --sizes 1000 10000 100000 --radius 30
+"""
+import argparse
+import random
+import time
+
+from _django import setup_django
+
+
+def seed(total, start):
+    from decimal import Decimal
+    from user.models import CustomUser, FarmerProfile
+
+    CustomUser.objects.bulk_create(
+        [CustomUser(username=f'bench{i}') for i in range(start, total)], batch_size=2000
+    )
+    users = CustomUser.objects.filter(username__startswith='bench', farmer_profile__isnull=True)
+    farms = []
+    for user in users.iterator(chunk_size=2000):
+        farm = FarmerProfile(
+            user=user,
+            farm_name=user.username,
+            farm_location='Kenya',
+            farm_size=Decimal('1.00'),
+            latitude=Decimal(f'{random.uniform(-4.5, 4.5):.6f}'),
+            longitude=Decimal(f'{random.uniform(34.0, 41.5):.6f}'),
+        )
+        farm.geohash = farm.compute_geohash()
+        farms.append(farm)
+    FarmerProfile.objects.bulk_create(farms, batch_size=2000)
+
+
+def full_scan(latitude, longitude, radius_km, limit):
+    from shared import geo
+    from user.models import FarmerProfile
+
+    hits = []
+    for pk, farm_latitude, farm_longitude in FarmerProfile.objects.values_list('id', 'latitude', 'longitude').iterator():
+        distance = geo.haversine_km(latitude, longitude, float(farm_latitude), float(farm_longitude))
+        if distance <= radius_km:
+            hits.append((distance, pk))
+    return sorted(hits)[:limit]
+
+
+def timed(function, points, radius_km):
+    started = time.perf_counter()
+    for latitude, longitude in points:
+        function(latitude, longitude, radius_km, 50)
+    return (time.perf_counter() - started) / len(points) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--radius', type=float, default=30.0)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from user.nearby import nearby_farm_distances
+
+    random.seed(7)
+    points = [(random.uniform(-4.0, 4.0), random.uniform(34.5, 41.0)) for _ in range(args.queries)]
+    seeded = 0
+    print(f"{'farms':>8}{'geohash ms':>12}{'full scan ms':>14}")
+    for size in sorted(args.sizes):
+        seed(size, seeded)
+        seeded = size
+        for latitude, longitude in points[:5]:
+            assert nearby_farm_distances(latitude, longitude, args.radius, 50) == full_scan(latitude, longitude, args.radius, 50)
+        indexed = timed(nearby_farm_distances, points, args.radius)
+        scanned = timed(full_scan, points[:5], args.radius)
+        print(f"{size:>8}{indexed:>12.2f}{scanned:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
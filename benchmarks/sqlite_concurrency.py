@@ -0,0 +1,117 @@
+"""
+Write and read throughput on one SQLite file under concurrent load, with
+Django's stock SQLite backend versus the production profile from
+shared/sqlite/base.py (WAL, synchronous=NORMAL, busy_timeout, mmap and a
+serialized writer). Writers register a farmer the way the signup and
+profile views do (uniqueness check, user insert, profile insert in one
+transaction); readers page through farmer profiles.
+
+    python benchmarks/sqlite_concurrency.py --writers 4 --readers 4 --seconds 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from _django import ROOT, setup_django
+
+
+def register(n, worker):
+    from decimal import Decimal
+    from django.db import transaction
+    from user.models import CustomUser, FarmerProfile
+
+    username = f'farmer-{worker}-{n}'
+    with transaction.atomic():
+        if CustomUser.objects.filter(username=username).exists():
+            return
+        user = CustomUser.objects.create(username=username, password='unusable')
+        FarmerProfile.objects.create(
+            user=user, farm_name=f'Farm {n}', farm_location='Nakuru', farm_size=Decimal('2.50'),
+        )
+
+
+def browse():
+    from user.models import FarmerProfile
+
+    list(FarmerProfile.objects.select_related('user').order_by('-id')[:20])
+
+
+def run(writers, readers, seconds):
+    from django.db import OperationalError, connections
+
+    counts = {'writes': 0, 'locked': 0, 'reads': 0, 'read_locked': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(kind, index):
+        done = failed = n = 0
+        try:
+            while time.perf_counter() < deadline:
+                n += 1
+                try:
+                    register(n, index) if kind == 'writes' else browse()
+                    done += 1
+                except OperationalError:
+                    failed += 1
+        finally:
+            connections.close_all()
+        with lock:
+            counts[kind] += done
+            counts['locked' if kind == 'writes' else 'read_locked'] += failed
+
+    threads = [threading.Thread(target=worker, args=('writes', i)) for i in range(writers)]
+    threads += [threading.Thread(target=worker, args=('reads', i)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {key: value / seconds for key, value in counts.items()}
+
+
+def child(writers, readers, seconds):
+    fd, path = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(fd)
+    try:
+        setup_django(database_file=path)
+        print(json.dumps(run(writers, readers, seconds)))
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.writers, args.readers, args.seconds)
+        return
+
+    # The engine is chosen when settings load, so each profile runs in its
+    # own process.
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:g}s, per second")
+    print(f"{'profile':<10}{'writes':>9}{'locked':>9}{'reads':>9}{'locked':>9}")
+    for name, flag in (('stock', '0'), ('wal', '1')):
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', '--writers', str(args.writers),
+             '--readers', str(args.readers), '--seconds', str(args.seconds)],
+            cwd=ROOT, env={**os.environ, 'DB_SQLITE_PROFILE': flag},
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{name:<10}{result['writes']:>9.1f}{result['locked']:>9.1f}"
+              f"{result['reads']:>9.1f}{result['read_locked']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
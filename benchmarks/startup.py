@@ -0,0 +1,102 @@
+"""
+Cold-start cost of a worker process: import time per module while loading
+Django and the URLconf (from ``python -X importtime``), and time from
+process start to the first and second response, with and without the
+preload warmup from farmbora/warmup.py.
+
+    python benchmarks/startup.py --runs 5 --top 15
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from _django import ROOT
+
+IMPORTS = """
+import os
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'farmbora.settings')
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+"""
+
+FIRST_REQUEST = """
+import json, os, sys, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'farmbora.settings')
+from farmbora.wsgi import application
+loaded = time.perf_counter()
+if sys.argv[1] == 'warm':
+    from farmbora.warmup import warm_up
+    warm_up()
+warmed = time.perf_counter()
+from django.test import Client
+client = Client(HTTP_HOST='localhost')
+timings = []
+for _ in range(2):
+    before = time.perf_counter()
+    status = client.get('/api/v1/auth/products/list/').status_code
+    timings.append((time.perf_counter() - before) * 1000)
+assert status == 401, status
+print(json.dumps({
+    'load': (loaded - started) * 1000,
+    'warmup': (warmed - loaded) * 1000,
+    'first': timings[0],
+    'second': timings[1],
+}))
+"""
+
+
+def import_times(top):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORTS],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    total = sum(self_us for _, self_us, _ in rows)
+    print(f"modules imported: {len(rows)}, total import time {total / 1000:.1f} ms")
+    print(f"{'cumulative ms':>14}{'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>9.1f}  {name}")
+    first_party = [row for row in rows if row[2].split('.')[0] in ('farmbora', 'shared', 'user')]
+    print("\nfirst-party modules")
+    for cumulative_us, self_us, name in sorted(first_party, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>9.1f}  {name}")
+
+
+def first_request(mode, runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', FIRST_REQUEST, mode],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    import_times(args.top)
+    print(f"\nmedian of {args.runs} processes, ms")
+    print(f"{'mode':<6}{'app load':>10}{'warmup':>9}{'1st request':>13}{'2nd request':>13}")
+    for mode in ('cold', 'warm'):
+        timings = first_request(mode, args.runs)
+        print(f"{mode:<6}{timings['load']:>10.1f}{timings['warmup']:>9.1f}"
+              f"{timings['first']:>13.1f}{timings['second']:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Insert throughput and primary key index size for random (v4) versus
+time-ordered (v7) UUID keys, using the same char(32) column Django uses for
+UUIDField on SQLite.
+
+    python benchmarks/uuid_keys.py --rows 200000 --batch 1000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.uuid7 import uuid7  # noqa: E402
+
+
+def run(generator, rows, batch):
+    fd, path = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE listing (id char(32) NOT NULL PRIMARY KEY, "
+            "product_name varchar(255) NOT NULL, created_at datetime NOT NULL)"
+        )
+        started = time.perf_counter()
+        for _ in range(0, rows, batch):
+            conn.executemany(
+                "INSERT INTO listing VALUES (?, 'maize', datetime('now'))",
+                [(generator().hex,) for _ in range(batch)],
+            )
+            conn.commit()
+        elapsed = time.perf_counter() - started
+
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        try:
+            index_pages = conn.execute(
+                "SELECT count(*) FROM dbstat WHERE name = 'sqlite_autoindex_listing_1'"
+            ).fetchone()[0]
+        except sqlite3.OperationalError:
+            index_pages = None
+        conn.close()
+        return elapsed, index_pages and index_pages * page_size, os.path.getsize(path)
+    finally:
+        os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--batch', type=int, default=1_000)
+    args = parser.parse_args()
+
+    print(f"{'key':<6}{'rows/s':>12}{'index KiB':>12}{'file KiB':>12}")
+    for name, generator in (('uuid4', uuid.uuid4), ('uuid7', uuid7)):
+        elapsed, index_bytes, file_bytes = run(generator, args.rows, args.batch)
+        index_kib = f"{index_bytes // 1024}" if index_bytes else "n/a"
+        print(f"{name:<6}{args.rows / elapsed:>12.0f}{index_kib:>12}{file_bytes // 1024:>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,11 @@ ASGI config for farmbora project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run it under an ASGI server (e.g. ``gunicorn farmbora.asgi:application -k
+uvicorn.workers.UvicornWorker``) so the async login and registration views
+(``api/v1/auth/async/...``) hash passwords in their bounded pool without
+blocking the worker.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
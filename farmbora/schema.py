@@ -0,0 +1,173 @@
+"""
+OpenAPI schema for the FarmBora API, generated once instead of per hit.
+
+``python manage.py build_api_schema`` writes the schema to
+API_SCHEMA["FILE"], stamped with the code version. /swagger.json serves that
+file (compressed and with an ETag) as long as the stamp matches the running
+code; otherwise the first request regenerates it, in memory and on disk
+when the location is writable. Swagger UI reads the same document.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.views import get_schema_view
+from rest_framework.permissions import AllowAny
+
+API_SCHEMA_SETTINGS = {
+    'FILE': os.path.join(settings.BASE_DIR, 'openapi.json'),
+    # Release identifier, e.g. a git SHA set by the deploy. Without one the
+    # version is a digest of the project's Python sources.
+    'VERSION': os.environ.get('APP_VERSION'),
+    'SOURCE_DIRS': ('farmbora', 'shared', 'user'),
+    'MAX_AGE': 300,
+    **getattr(settings, 'API_SCHEMA', {}),
+}
+
+schema_info = openapi.Info(
+    title="FarmBora API",
+    default_version='v1',
+    description="API documentation for FarmBora",
+)
+
+VERSION_KEY = 'x-code-version'
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    if API_SCHEMA_SETTINGS['VERSION']:
+        return API_SCHEMA_SETTINGS['VERSION']
+    digest = hashlib.blake2b(digest_size=12)
+    for directory in API_SCHEMA_SETTINGS['SOURCE_DIRS']:
+        for root, dirs, files in os.walk(os.path.join(settings.BASE_DIR, directory)):
+            dirs[:] = sorted(name for name in dirs if name != '__pycache__')
+            for name in sorted(files):
+                if name.endswith('.py'):
+                    path = os.path.join(root, name)
+                    digest.update(os.path.relpath(path, settings.BASE_DIR).encode())
+                    with open(path, 'rb') as source:
+                        digest.update(source.read())
+    return digest.hexdigest()
+
+
+_generated = {}
+_generate_lock = threading.Lock()
+
+
+class CachedSchemaGenerator(OpenAPISchemaGenerator):
+    """
+    Generator that introspects the full public schema once per process and
+    returns the same document afterwards. Requests only vary the host,
+    which is left out so clients resolve paths against the page they used.
+    """
+
+    def __init__(self, info, version='', url=None, patterns=None, urlconf=None):
+        super().__init__(info, version, url, patterns, urlconf)
+        self.cacheable = patterns is None and urlconf is None
+
+    def get_schema(self, request=None, public=False):
+        if not (self.cacheable and public):
+            return super().get_schema(request, public)
+        key = (self.version, self.url)
+        with _generate_lock:
+            if key not in _generated:
+                _generated[key] = super().get_schema(None, public)
+            return _generated[key]
+
+
+schema_view = get_schema_view(
+    schema_info,
+    public=True,
+    permission_classes=[AllowAny],
+    authentication_classes=[],
+    generator_class=CachedSchemaGenerator,
+)
+swagger_ui = schema_view.with_ui("swagger", cache_timeout=0)
+
+
+def build_schema():
+    """The schema as JSON bytes, stamped with the current code version."""
+    schema = CachedSchemaGenerator(schema_info).get_schema(None, public=True)
+    document = json.loads(OpenAPICodecJson(validators=[]).encode(schema))
+    document[VERSION_KEY] = code_version()
+    return json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def write_schema(path=None):
+    path = path or API_SCHEMA_SETTINGS['FILE']
+    content = build_schema()
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as output:
+        output.write(content)
+    os.replace(temporary, path)
+    return content
+
+
+class SchemaDocument:
+
+    def __init__(self, content):
+        self.content = content
+        self.gzipped = gzip.compress(content, mtime=0)
+        digest = hashlib.blake2b(content, digest_size=12).hexdigest()
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+
+_document = None
+_document_lock = threading.Lock()
+
+
+def _read_current(path):
+    try:
+        with open(path, 'rb') as artifact:
+            content = artifact.read()
+    except OSError:
+        return None
+    try:
+        stamped = json.loads(content).get(VERSION_KEY)
+    except ValueError:
+        return None
+    return content if stamped == code_version() else None
+
+
+def get_schema_document():
+    global _document
+    if _document is None:
+        with _document_lock:
+            if _document is None:
+                path = API_SCHEMA_SETTINGS['FILE']
+                content = _read_current(path)
+                if content is None:
+                    try:
+                        content = write_schema(path)
+                    except OSError:
+                        content = build_schema()
+                _document = SchemaDocument(content)
+    return _document
+
+
+def api_schema_view(request):
+    document = get_schema_document()
+    compressed = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    etag = document.gzip_etag if compressed else document.etag
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(
+            document.gzipped if compressed else document.content,
+            content_type='application/json',
+        )
+        if compressed:
+            response['Content-Encoding'] = 'gzip'
+    response['ETag'] = etag
+    response['Cache-Control'] = f"public, max-age={API_SCHEMA_SETTINGS['MAX_AGE']}"
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -35,6 +36,72 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,
 }
 
+# Per-process cache of authenticated users (see user/authentication.py).
+AUTH_USER_CACHE_MAX_ENTRIES = 10000
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# In-process Bloom filter in front of refresh token blacklist lookups
+# (see user/tokens.py). SYNC_INTERVAL is how many seconds a token
+# blacklisted by another worker process can take to be seen by this one;
+# SETTLE_SECONDS how long a blacklist write may take to commit.
+TOKEN_BLACKLIST_BLOOM = {
+    "SYNC_INTERVAL": 2,
+    "REBUILD_INTERVAL": 3600,
+    "SETTLE_SECONDS": 5,
+    "MIN_CAPACITY": 10000,
+    "ERROR_RATE": 0.001,
+}
+
+# Thread pool that runs password hashing for the async login/registration
+# views (user/views/async_auth.py). Requests beyond MAX_PENDING queued or
+# running jobs get a 503 with Retry-After.
+AUTH_HASHING_POOL = {
+    "MAX_WORKERS": 4,
+    "MAX_PENDING": 64,
+    "RETRY_AFTER": 1,
+}
+
+# Read-through cache of FarmerProfileByIDView payloads (see
+# user/profile_cache.py). BACKEND "local" keeps an LRU per process;
+# "shared" stores entries in the CACHES alias named by ALIAS.
+FARMER_PROFILE_CACHE = {
+    "BACKEND": "local",
+    "ALIAS": "default",
+    "MAX_ENTRIES": 10000,
+    "TIMEOUT": 300,
+}
+
+# Idempotency-Key replay for the create endpoints (see shared/idempotency.py).
+# Use BACKEND "shared" with several workers so retries that land on another
+# worker are still recognised.
+IDEMPOTENCY = {
+    "BACKEND": "local",
+    "ALIAS": "default",
+    "MAX_ENTRIES": 10000,
+    "TIMEOUT": 24 * 60 * 60,
+    "WAIT_TIMEOUT": 10,
+}
+
+# Per-route request metrics served at /metrics (see shared/metrics.py). With
+# several gunicorn workers, point DIR (or PROMETHEUS_MULTIPROC_DIR) at a
+# directory they share and empty it on deploy; scrapes then see every
+# worker's totals, at most FLUSH_INTERVAL seconds old. Only ALLOWED_IPS, or
+# scrapers sending "Authorization: Bearer <TOKEN>", may read it.
+METRICS = {
+    "DIR": os.environ.get("PROMETHEUS_MULTIPROC_DIR"),
+    "FLUSH_INTERVAL": 5,
+    "ALLOWED_IPS": ("127.0.0.1", "::1"),
+    "TOKEN": os.environ.get("METRICS_TOKEN"),
+}
+
+# Prebuilt OpenAPI document served at /swagger.json (see farmbora/schema.py).
+# Run `manage.py build_api_schema` at deploy time; a stale or missing file is
+# rebuilt on first request. APP_VERSION, if set, replaces the source digest
+# as the code version.
+API_SCHEMA = {
+    "FILE": BASE_DIR / "openapi.json",
+    "MAX_AGE": 300,
+}
 
 # Application definition
 
@@ -54,6 +121,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'shared.metrics.MetricsMiddleware',
+    'shared.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -86,11 +155,54 @@ WSGI_APPLICATION = 'farmbora.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Persistent connections: each worker thread reuses its connection for
+# DB_CONN_MAX_AGE seconds (0 closes it after every request, empty keeps it
+# open forever) and checks it is still usable before reusing it.
+DB_CONN_MAX_AGE = os.environ.get('DB_CONN_MAX_AGE', '60')
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1'
+
+# DB_SQLITE_PROFILE=1 switches to the production SQLite profile: WAL,
+# synchronous=NORMAL, a busy timeout (seconds), mmap and write transactions
+# that begin IMMEDIATE, plus the shared.sqlite engine (shared/sqlite/base.py),
+# which queues each process's writers behind one lock.
+DB_SQLITE_PROFILE = os.environ.get('DB_SQLITE_PROFILE', '0') == '1'
+SQLITE_PROFILE_OPTIONS = {
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 5,
+    'init_command': 'PRAGMA journal_mode = WAL; PRAGMA synchronous = NORMAL; PRAGMA mmap_size = 268435456',
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'shared.sqlite' if DB_SQLITE_PROFILE else 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(DB_CONN_MAX_AGE) if DB_CONN_MAX_AGE else None,
+        'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+        'OPTIONS': SQLITE_PROFILE_OPTIONS if DB_SQLITE_PROFILE else {},
+    }
+}
+
+# Read replicas, as a comma-separated list of SQLite files kept in sync with
+# the primary (`manage.py sync_sqlite_replicas` copies it for local testing).
+# They are opened read-only (Django opens SQLite names as URIs) as aliases
+# replica1, replica2, ...; shared.routers.PrimaryReplicaRouter sends
+# eligible reads to them.
+for index, replica in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{Path(replica.strip()).resolve()}?mode=ro',
+        'OPTIONS': {},
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['shared.routers.PrimaryReplicaRouter']
+
+# Which models' reads may go to a replica, and how long a client that wrote
+# stays on the primary so it reads its own writes.
+DATABASE_REPLICA_ROUTING = {
+    'MODELS': ['user.FarmerProfile', 'user.ProductListing'],
+    'STICKY_SECONDS': 5,
 }
 
 AUTH_USER_MODEL = "user.CustomUser"
@@ -115,12 +227,20 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.CachedJWTAuthentication",
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "shared.renderers.EnvelopeJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
     ),
+    "DEFAULT_PAGINATION_CLASS": "shared.pagination.KeysetPagination",
+    "PAGE_SIZE": 50,
 }
 
 SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': False,
+    # Swagger UI loads the prebuilt document (farmbora/schema.py).
+    'SPEC_URL': 'api-schema',
     'SECURITY_DEFINITIONS': {
         'Bearer': {
             'type': 'apiKey',
@@ -1,25 +1,15 @@
 from django.contrib import admin
 from django.urls import path
 from django.urls import include
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-from rest_framework.permissions import AllowAny
-
-schema_view=get_schema_view(
-    openapi.Info(
-        title="FarmBora API",
-        default_version='v1',
-        description="API documentation for FarmBora",
-    ),
-    public=True,
-    permission_classes=[AllowAny],
-    authentication_classes=[],
-)
+from shared.lazy import LazyView
+from shared.metrics import metrics_view
 
+# The drf_yasg stack in farmbora.schema is only imported when a schema
+# route is first hit.
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/auth/', include('user.urls')),
-    path("swagger/", schema_view.with_ui("swagger", cache_timeout=0)),
+    path("swagger.json", LazyView('farmbora.schema.api_schema_view'), name="api-schema"),
+    path("swagger/", LazyView('farmbora.schema.swagger_ui'), name="swagger-ui"),
+    path("metrics", metrics_view, name="metrics"),
 ]
-
-
@@ -0,0 +1,33 @@
+"""
+Preload warmup for forking servers.
+
+With ``preload_app`` gunicorn imports the WSGI application once in the
+master and forks workers from it. ``warm_up`` then finishes the work each
+worker would otherwise repeat on its first requests (importing the lazily
+loaded views, building the URL reverse tables and the OpenAPI document)
+so workers start ready and share those pages copy-on-write. See
+gunicorn.conf.py.
+"""
+import gc
+
+from django.db import connections
+from django.urls import get_resolver
+
+from shared.lazy import iter_lazy_views
+
+
+def warm_up():
+    resolver = get_resolver()
+    for view in iter_lazy_views(resolver.url_patterns):
+        view.load()
+    resolver.reverse_dict  # noqa: B018 - populates the reverse tables
+
+    from farmbora import schema
+    schema.get_schema_document()
+
+    # Connections must never be shared across fork.
+    connections.close_all()
+    # Move everything loaded so far out of the collector's generations, so
+    # collections in the workers do not write to (and so copy) these pages.
+    gc.collect()
+    gc.freeze()
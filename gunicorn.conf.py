@@ -0,0 +1,16 @@
+# gunicorn -c gunicorn.conf.py farmbora.wsgi:application
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+
+# Load the app once in the master and fork workers from it; see
+# farmbora/warmup.py. Set GUNICORN_PRELOAD=0 to load it per worker instead.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from farmbora.warmup import warm_up
+        warm_up()
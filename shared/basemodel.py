@@ -1,11 +1,16 @@
-import  uuid
 from django.db import models
+from shared.uuid7 import uuid7
 
 
 class BaseModel(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='%(class)s_created_id_idx'),
+            # Delta sync (user/sync.py) walks rows in (updated_at, id) order.
+            models.Index(fields=['updated_at', 'id'], name='%(class)s_updated_id_idx'),
+        ]
\ No newline at end of file
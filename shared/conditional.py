@@ -0,0 +1,83 @@
+import hashlib
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def weak_etag(*parts):
+    digest = hashlib.blake2b('|'.join(str(part) for part in parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def is_conditional(request):
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+def instance_validators(pk, versions):
+    """
+    ETag and Last-Modified for one object from its own ``updated_at`` plus
+    those of any nested objects its serializer renders.
+    """
+    versions = [version for version in versions if version is not None]
+    return weak_etag(pk, *versions), max(versions, default=None)
+
+
+def instance_versions(queryset, version_fields):
+    """The object's version timestamps in one values_list query, or None if it does not exist."""
+    return queryset.order_by().values_list(*version_fields).first()
+
+
+def object_versions(instance, version_fields):
+    """The same timestamps as instance_versions, read from a loaded object."""
+    versions = []
+    for path in version_fields:
+        value = instance
+        for name in path.split('__'):
+            value = getattr(value, name)
+        versions.append(value)
+    return versions
+
+
+def page_validators(objects, request, version_fields=('updated_at',), pagination=None):
+    """
+    ETag for a page from the rows actually returned: their ids and
+    ``updated_at`` values (plus those of nested objects, listed in
+    ``version_fields``), the pagination links and the query string. Any
+    insert, update or delete that changes the page changes the tag, and no
+    query beyond the page itself is needed. There is no Last-Modified: a
+    newest-timestamp cannot tell that a row left the page.
+    """
+    etag = weak_etag(
+        sorted(request.query_params.lists()),
+        sorted((pagination or {}).items()),
+        *((obj.pk, *object_versions(obj, version_fields)) for obj in objects),
+    )
+    return etag, None
+
+
+def not_modified(request, etag, last_modified):
+    """
+    A 304 carrying the validators if the client's copy is current, else
+    None. The caller can then skip serializing the object or page.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=_timestamp(last_modified))
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(_timestamp(last_modified))
+    # Responses depend on the caller's token: keep them out of shared caches
+    # and have clients revalidate instead of reusing them blindly.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    return timegm(value.utctimetuple())
@@ -0,0 +1,93 @@
+import math
+
+# Geohash helpers for radius search on databases without a spatial extension.
+# A geohash prefix is a rectangular cell, and all points in a cell share the
+# prefix, so "points near X" becomes a handful of indexed range scans on a
+# plain CharField followed by an exact distance check on the survivors.
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9
+
+MAX_COVERING_CELLS = 16
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size_degrees(precision):
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def covering_cells(latitude, longitude, radius_km, max_cells=MAX_COVERING_CELLS):
+    """
+    Geohash prefixes that together cover the bounding box of the circle.
+
+    Picks the longest prefix for which the box spans at most max_cells
+    cells, which keeps both the number of range scans and the number of
+    false-positive candidates small.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    dlon = dlat / max(math.cos(math.radians(latitude)), 0.01)
+    south, north = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    west, east = longitude - dlon, longitude + dlon
+    if east - west >= 360.0:
+        west, east = -180.0, 180.0 - 1e-9
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lon_step = cell_size_degrees(precision)
+        first_row = math.floor((south + 90.0) / lat_step)
+        last_row = math.floor((north + 90.0) / lat_step)
+        first_col = math.floor((west + 180.0) / lon_step)
+        last_col = math.floor((east + 180.0) / lon_step)
+        if (last_row - first_row + 1) * (last_col - first_col + 1) > max_cells and precision > 1:
+            continue
+        cells = set()
+        for row in range(first_row, last_row + 1):
+            cell_lat = min(-90.0 + (row + 0.5) * lat_step, 90.0)
+            for col in range(first_col, last_col + 1):
+                cell_lon = (-180.0 + (col + 0.5) * lon_step + 180.0) % 360.0 - 180.0
+                cells.add(encode(cell_lat, cell_lon, precision))
+        return sorted(cells)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
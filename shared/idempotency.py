@@ -0,0 +1,230 @@
+import functools
+import hashlib
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+from drf_yasg import openapi
+from rest_framework import status
+from rest_framework.response import Response
+
+from shared.readthrough import build_backend
+from shared.renderers import EnvelopeJSONRenderer, RawJSON
+from shared.responses import handle_error, render_response
+
+# Idempotency-Key support for create endpoints (see ``idempotent``).
+#
+# The first request with a key runs the view; its response is stored as
+# (request fingerprint, status, encoded body) for TIMEOUT seconds and
+# replayed to later requests with the same key without running the view.
+# While it runs, the key holds a pending marker: duplicates arriving then
+# wait up to WAIT_TIMEOUT seconds for the result, and get a 409 if it does
+# not come. BACKEND "local" keeps keys per process, which only covers a
+# single worker; "shared" stores them in the CACHES alias named by ALIAS.
+IDEMPOTENCY_SETTINGS = {
+    'BACKEND': 'local',
+    'ALIAS': 'default',
+    'MAX_ENTRIES': 10000,
+    'TIMEOUT': 24 * 60 * 60,
+    # How long a pending marker outlives a worker that died mid-request.
+    'LOCK_TIMEOUT': 30,
+    'WAIT_TIMEOUT': 10,
+    # How often waiters in other processes look for the result.
+    'POLL_INTERVAL': 0.05,
+    **getattr(settings, 'IDEMPOTENCY', {}),
+}
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+idempotency_key_parameter = openapi.Parameter(
+    'Idempotency-Key', openapi.IN_HEADER, type=openapi.TYPE_STRING,
+    description="Client-chosen unique key; retries with the same key get the first response back.",
+)
+
+MISMATCH = object()
+IN_PROGRESS = object()
+
+
+class IdempotencyStore:
+    """
+    Pending markers and stored responses over a get/set/add/delete backend.
+    Waiters in the same process are woken as soon as the result is stored;
+    waiters in other processes poll for it.
+    """
+
+    def __init__(self, backend, lock_timeout=30, wait_timeout=10, poll_interval=0.05):
+        self.backend = backend
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def begin(self, key, fingerprint):
+        """
+        None if the caller now owns ``key`` and must run the request and
+        call finish(); otherwise the stored (fingerprint, status, body),
+        MISMATCH if the key was used for a different request, or
+        IN_PROGRESS if the first request did not finish in time.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            if self.backend.add(key, (fingerprint, None, None), self.lock_timeout):
+                with self._lock:
+                    self._flights[key] = threading.Event()
+                return None
+            entry = self.backend.get(key)
+            if entry is not None:
+                if entry[0] != fingerprint:
+                    return MISMATCH
+                if entry[1] is not None:
+                    return entry
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return IN_PROGRESS
+            with self._lock:
+                flight = self._flights.get(key)
+            if entry is not None and flight is not None:
+                flight.wait(remaining)
+            else:
+                # No entry means it was released or expired since the add
+                # (or the cache is failing): pause before trying again.
+                time.sleep(min(self.poll_interval, remaining))
+
+    def finish(self, key, fingerprint, status_code=None, body=None):
+        """Store the response, or with no status release the key so a retry runs again."""
+        try:
+            if status_code is None:
+                self.backend.delete(key)
+            else:
+                self.backend.set(key, (fingerprint, status_code, body))
+        finally:
+            with self._lock:
+                flight = self._flights.pop(key, None)
+            if flight is not None:
+                flight.set()
+
+    def clear(self):
+        self.backend.clear()
+
+
+idempotency_store = IdempotencyStore(
+    build_backend(IDEMPOTENCY_SETTINGS, key_prefix='idempotency:'),
+    lock_timeout=IDEMPOTENCY_SETTINGS['LOCK_TIMEOUT'],
+    wait_timeout=IDEMPOTENCY_SETTINGS['WAIT_TIMEOUT'],
+    poll_interval=IDEMPOTENCY_SETTINGS['POLL_INTERVAL'],
+)
+
+_renderer = EnvelopeJSONRenderer()
+
+
+def _store_key(path, user_id, key):
+    # Scoped to the route and the caller, hashed to a fixed size.
+    return hashlib.blake2b(f'{path}\0{user_id}\0{key}'.encode(), digest_size=16).hexdigest()
+
+
+def _fingerprint(method, data):
+    # Keyed with SECRET_KEY: request bodies hold passwords, and a plain fast
+    # hash of them sitting in the cache could be brute-forced offline.
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return salted_hmac('shared.idempotency.fingerprint', f'{method}\0{payload}', algorithm='sha256').hexdigest()
+
+
+def _invalid_key(key):
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return handle_error(
+            message=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters.",
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+    return None
+
+
+def _replay(entry):
+    """The response for what begin() returned when the caller does not own the key."""
+    if entry is MISMATCH:
+        return handle_error(
+            message="This Idempotency-Key was already used for a different request.",
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if entry is IN_PROGRESS:
+        return handle_error(
+            message="A request with this Idempotency-Key is still being processed; retry shortly.",
+            status_code=status.HTTP_409_CONFLICT
+        )
+    _, status_code, body = entry
+    return Response(RawJSON(body), status=status_code, headers={REPLAYED_HEADER: 'true'})
+
+
+def idempotent(handler):
+    """
+    Makes an APIView handler honour the Idempotency-Key header. Responses
+    below 500 are stored and replayed; server errors release the key so
+    the client's retry runs the view again.
+    """
+
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if key is None:
+            return handler(view, request, *args, **kwargs)
+        invalid = _invalid_key(key)
+        if invalid is not None:
+            return invalid
+        user_id = request.user.pk if request.user.is_authenticated else ''
+        store_key = _store_key(request.path, user_id, key)
+        fingerprint = _fingerprint(request.method, request.data)
+        entry = idempotency_store.begin(store_key, fingerprint)
+        if entry is not None:
+            return _replay(entry)
+
+        stored = False
+        try:
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code < 500:
+                idempotency_store.finish(
+                    store_key, fingerprint, response.status_code, _renderer.render(response.data)
+                )
+                stored = True
+        finally:
+            if not stored:
+                idempotency_store.finish(store_key, fingerprint)
+        return response
+
+    return wrapper
+
+
+async def run_idempotent(request, data, get_response):
+    """
+    ``idempotent`` for async views outside DRF: awaits ``get_response()``
+    for the rendered response unless the request's Idempotency-Key already
+    has one. Keys are scoped to the route only, as these views run before
+    anyone is authenticated.
+    """
+    key = request.META.get(HEADER)
+    if key is None:
+        return await get_response()
+    invalid = _invalid_key(key)
+    if invalid is not None:
+        return render_response(invalid)
+    store_key = _store_key(request.path, '', key)
+    fingerprint = _fingerprint(request.method, data)
+    # begin() may wait for another request holding the key.
+    entry = await sync_to_async(idempotency_store.begin, thread_sensitive=False)(store_key, fingerprint)
+    if entry is not None:
+        return render_response(_replay(entry))
+
+    stored = False
+    try:
+        response = await get_response()
+        if response.status_code < 500:
+            idempotency_store.finish(store_key, fingerprint, response.status_code, response.content)
+            stored = True
+    finally:
+        if not stored:
+            idempotency_store.finish(store_key, fingerprint)
+    return response
@@ -0,0 +1,60 @@
+import threading
+
+from django.utils.module_loading import import_string
+
+
+class LazyView:
+    """
+    URLconf callback that imports its view module on first use.
+
+    ``LazyView('app.views.SomeView')`` stands in for ``SomeView.as_view()``
+    (or for a plain view function), so loading the URLconf no longer pulls
+    in every view module and its dependencies. The name and module are
+    known up front, which is all URL resolving and reversing needs; any
+    other attribute (``csrf_exempt``, ``cls``, the async marker, ...)
+    imports the view and is read from it.
+    """
+
+    def __init__(self, dotted_path, **initkwargs):
+        module, _, name = dotted_path.rpartition('.')
+        self.__module__ = module
+        self.__name__ = self.__qualname__ = name
+        self.dotted_path = dotted_path
+        self.initkwargs = initkwargs
+        self._view = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._view is not None
+
+    def load(self):
+        if self._view is None:
+            with self._lock:
+                if self._view is None:
+                    target = import_string(self.dotted_path)
+                    as_view = getattr(target, 'as_view', None)
+                    self._view = as_view(**self.initkwargs) if as_view is not None else target
+        return self._view
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # Django asks for view_class while building its reverse tables; the
+        # module and name set above already give the same lookup string.
+        if name.startswith('__') or name in ('_view', '_lock') or (name == 'view_class' and not self.loaded):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+    def __repr__(self):
+        return f'<LazyView {self.dotted_path}>'
+
+
+def iter_lazy_views(patterns):
+    """Every LazyView in a URLconf's patterns, including included ones."""
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            yield from iter_lazy_views(pattern.url_patterns)
+        elif isinstance(pattern.callback, LazyView):
+            yield pattern.callback
@@ -0,0 +1,272 @@
+import bisect
+import contextvars
+import hmac
+import ipaddress
+import json
+import os
+import tempfile
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+METRICS_SETTINGS = {
+    # Directory shared by all worker processes of one deployment; each
+    # process writes its own snapshot there and /metrics sums them. None
+    # keeps metrics per process.
+    'DIR': os.environ.get('PROMETHEUS_MULTIPROC_DIR'),
+    # How often, in seconds, a process writes its snapshot.
+    'FLUSH_INTERVAL': 5,
+    'LATENCY_BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    # Who may scrape /metrics: clients whose REMOTE_ADDR is in one of these
+    # addresses or networks, or that send "Authorization: Bearer <TOKEN>".
+    # Behind a proxy REMOTE_ADDR is the proxy's, so set TOKEN there.
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+    'TOKEN': None,
+    **getattr(settings, 'METRICS', {}),
+}
+
+BUCKETS = tuple(METRICS_SETTINGS['LATENCY_BUCKETS'])
+ALLOWED_NETWORKS = tuple(ipaddress.ip_network(entry) for entry in METRICS_SETTINGS['ALLOWED_IPS'])
+
+# Per-series value layout: request count, latency sum, one slot per bucket
+# (plus +Inf), then SQL query count, SQL seconds, serializer seconds and
+# response bytes. Flat lists keep recording and merging cheap.
+COUNT, DURATION_SUM, FIRST_BUCKET = 0, 1, 2
+QUERIES = FIRST_BUCKET + len(BUCKETS) + 1
+QUERY_SECONDS, SERIALIZER_SECONDS, RESPONSE_BYTES = QUERIES + 1, QUERIES + 2, QUERIES + 3
+SERIES_WIDTH = RESPONSE_BYTES + 1
+
+# Request-scoped [query count, query seconds, serializer seconds, inside a
+# serializer]. A ContextVar rather than a thread local so async views and
+# work handed to sync_to_async threads still report into the request that
+# caused it.
+_request_stats = contextvars.ContextVar('request_stats', default=None)
+
+
+class MetricsRegistry:
+
+    def __init__(self, directory=None, flush_interval=5):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._series = {}
+        self._statuses = {}
+        self._next_flush = time.monotonic() + flush_interval
+
+    def record(self, route, method, status, duration, stats, response_bytes):
+        key = (route, method)
+        bucket = FIRST_BUCKET + bisect.bisect_left(BUCKETS, duration)
+        with self._lock:
+            values = self._series.get(key)
+            if values is None:
+                values = self._series[key] = [0] * SERIES_WIDTH
+            values[COUNT] += 1
+            values[DURATION_SUM] += duration
+            values[bucket] += 1
+            values[QUERIES] += stats[0]
+            values[QUERY_SECONDS] += stats[1]
+            values[SERIALIZER_SECONDS] += stats[2]
+            values[RESPONSE_BYTES] += response_bytes
+            status_key = (route, method, status)
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+        if self.directory and time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'series': [[*key, *values] for key, values in self._series.items()],
+                'statuses': [[*key, count] for key, count in self._statuses.items()],
+            }
+
+    def flush(self):
+        """Atomically write this process's totals to its snapshot file."""
+        self._next_flush = time.monotonic() + self.flush_interval
+        os.makedirs(self.directory, exist_ok=True)
+        handle, path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'w') as output:
+            json.dump(self.snapshot(), output)
+        os.replace(path, os.path.join(self.directory, f'metrics-{os.getpid()}.json'))
+
+    def collect(self):
+        """Totals across every process sharing the directory (or just this one)."""
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        series, statuses = {}, {}
+        for name in os.listdir(self.directory):
+            if not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as snapshot_file:
+                    snapshot = json.load(snapshot_file)
+            except (OSError, ValueError):
+                continue
+            for row in snapshot['series']:
+                totals = series.setdefault(tuple(row[:2]), [0] * SERIES_WIDTH)
+                for index, value in enumerate(row[2:]):
+                    totals[index] += value
+            for *key, count in snapshot['statuses']:
+                statuses[tuple(key)] = statuses.get(tuple(key), 0) + count
+        return {
+            'series': [[*key, *values] for key, values in series.items()],
+            'statuses': [[*key, count] for key, count in statuses.items()],
+        }
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+            self._statuses.clear()
+
+
+registry = MetricsRegistry(METRICS_SETTINGS['DIR'], METRICS_SETTINGS['FLUSH_INTERVAL'])
+
+
+def render_prometheus(snapshot):
+    lines = [
+        '# HELP farmbora_http_requests_total Requests by route, method and status.',
+        '# TYPE farmbora_http_requests_total counter',
+    ]
+    for route, method, status, count in sorted(snapshot['statuses']):
+        lines.append(f'farmbora_http_requests_total{{route="{route}",method="{method}",status="{status}"}} {count}')
+
+    series = sorted(snapshot['series'])
+    lines += [
+        '# HELP farmbora_http_request_duration_seconds Request latency by route and method.',
+        '# TYPE farmbora_http_request_duration_seconds histogram',
+    ]
+    for route, method, *values in series:
+        labels = f'route="{route}",method="{method}"'
+        cumulative = 0
+        for index, bound in enumerate((*BUCKETS, '+Inf')):
+            cumulative += values[FIRST_BUCKET + index]
+            lines.append(f'farmbora_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'farmbora_http_request_duration_seconds_sum{{{labels}}} {values[DURATION_SUM]}')
+        lines.append(f'farmbora_http_request_duration_seconds_count{{{labels}}} {values[COUNT]}')
+
+    for name, index, help_text in (
+        ('farmbora_db_queries_total', QUERIES, 'SQL queries run by requests.'),
+        ('farmbora_db_query_seconds_total', QUERY_SECONDS, 'Time spent in SQL queries.'),
+        ('farmbora_serializer_seconds_total', SERIALIZER_SECONDS, 'Time spent producing serializer data.'),
+        ('farmbora_http_response_bytes_total', RESPONSE_BYTES, 'Response body bytes (non-streaming responses).'),
+    ):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for route, method, *values in series:
+            lines.append(f'{name}{{route="{route}",method="{method}"}} {values[index]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _may_scrape(request):
+    token = METRICS_SETTINGS['TOKEN']
+    if token:
+        scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if scheme.lower() == 'bearer' and hmac.compare_digest(credentials.encode(), token.encode()):
+            return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in network for network in ALLOWED_NETWORKS)
+
+
+def metrics_view(request):
+    if not _may_scrape(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_prometheus(registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def _query_timer(execute, sql, params, many, context):
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started
+
+
+def _install_query_timer(sender, connection, **kwargs):
+    if _query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_query_timer)
+
+
+class SerializerTimingMixin:
+    """
+    Adds a serializer's to_representation time to the current request's
+    serializer seconds. Only the outermost serializer is timed, so nested
+    serializers and the children of a ListSerializer are not counted twice.
+    """
+
+    def to_representation(self, instance):
+        stats = _request_stats.get()
+        if stats is None or stats[3]:
+            return super().to_representation(instance)
+        stats[3] = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats[2] += time.perf_counter() - started
+            stats[3] = False
+
+
+class MetricsMiddleware:
+    """
+    Records latency, SQL query count and time, serializer time (of
+    serializers using SerializerTimingMixin) and response size per resolved
+    URL name into ``registry``, served by metrics_view in Prometheus text
+    format. Put it first in MIDDLEWARE so the latency covers the rest of
+    the stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        connection_created.connect(_install_query_timer, dispatch_uid='metrics-query-timer')
+        from django.db import connections
+        for connection in connections.all(initialized_only=True):
+            _install_query_timer(None, connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = [0, 0.0, 0.0, False]
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        self._record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = [0, 0.0, 0.0, False]
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        self._record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    def _record(self, request, response, duration, stats):
+        match = request.resolver_match
+        route = (match.url_name or match.view_name) if match is not None else 'unmatched'
+        size = 0 if response.streaming else len(response.content)
+        registry.record(route, request.method, response.status_code, duration, stats, size)
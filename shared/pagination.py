@@ -0,0 +1,142 @@
+import json
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.pagination import BasePagination
+from rest_framework.settings import api_settings
+
+from shared.responses import handle_paginated_success
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over the (created_at, id) key of BaseModel, newest
+    first. Subclasses can page over another (key_field, id) ordering by
+    setting key_field, descending and the key's encode_key/decode_key.
+
+    Each page is a single indexed range query limited to page_size + 1 rows,
+    so the cost of a page does not depend on how deep the client has paged.
+    Cursors are opaque to clients and only encode the boundary key and the
+    direction of travel. Ids are time-ordered (v7) for new rows, but rows
+    created before rekey_uuid7 has run still carry random ids, so
+    created_at stays the leading key.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 200
+    key_field = 'created_at'
+    descending = True
+
+    @property
+    def ordering(self):
+        sign = '-' if self.descending else ''
+        return (sign + self.key_field, sign + 'id')
+
+    @property
+    def key_fields(self):
+        """Columns the cursors are built from; querysets must load them."""
+        return (self.key_field, 'id')
+
+    def encode_key(self, value):
+        return value.isoformat()
+
+    def decode_key(self, value):
+        key = parse_datetime(value)
+        if key is None:
+            raise ValueError(value)
+        return key
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            size = int(value)
+        except (TypeError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def encode_cursor(self, obj, reverse):
+        payload = {
+            'c': self.encode_key(getattr(obj, self.key_field)),
+            'i': str(obj.pk),
+            'r': int(reverse),
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        value = request.query_params.get(self.cursor_query_param)
+        if not value:
+            return None
+        try:
+            raw = urlsafe_b64decode(value + '=' * (-len(value) % 4))
+            payload = json.loads(raw)
+            return self.decode_key(payload['c']), uuid.UUID(payload['i']), bool(payload['r'])
+        except (TypeError, ValueError, ArithmeticError, KeyError, AttributeError):
+            raise InvalidCursor("Invalid pagination cursor.")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            reverse = False
+        else:
+            key, pk, reverse = cursor
+            # Rows after the cursor in the direction of travel.
+            lookup = 'lt' if reverse != self.descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.key_field}__{lookup}': key})
+                | Q(**{self.key_field: key, f'id__{lookup}': pk})
+            )
+
+        if reverse:
+            queryset = queryset.order_by(*(
+                name[1:] if name.startswith('-') else '-' + name for name in self.ordering
+            ))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_cursor = None
+        self.previous_cursor = None
+        if results:
+            if reverse:
+                self.next_cursor = self.encode_cursor(results[-1], reverse=False)
+                if has_more:
+                    self.previous_cursor = self.encode_cursor(results[0], reverse=True)
+            else:
+                if has_more:
+                    self.next_cursor = self.encode_cursor(results[-1], reverse=False)
+                if cursor is not None:
+                    self.previous_cursor = self.encode_cursor(results[0], reverse=True)
+        return results
+
+    def get_pagination_data(self):
+        return {
+            'next': self.next_cursor,
+            'previous': self.previous_cursor,
+            'page_size': self.page_size,
+        }
+
+    def get_paginated_response(self, data, message=""):
+        return handle_paginated_success(
+            data=data,
+            pagination=self.get_pagination_data(),
+            message=message,
+        )
@@ -0,0 +1,129 @@
+import threading
+import uuid
+
+from django.core.cache import caches
+
+from shared.lru import LRUCache
+
+_MISSING = object()
+
+
+class SharedCacheBackend:
+    """
+    Adapter giving a Django cache alias (Redis, Memcached, ...) the same
+    get/set/add/delete interface as LRUCache, so every worker shares entries.
+
+    The alias is shared with other users, so ``clear`` cannot flush it.
+    Keys carry a generation token stored under the prefix instead; clearing
+    replaces the token and the old entries are left to expire. A token the
+    cache has evicted is replaced the same way, which only ever costs misses.
+    """
+
+    def __init__(self, alias='default', timeout=300, key_prefix=''):
+        self.cache = caches[alias]
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self._generation_key = key_prefix + 'generation'
+
+    def _key(self, key):
+        generation = self.cache.get_or_set(self._generation_key, _new_generation, None)
+        return f'{self.key_prefix}{generation}:{key}'
+
+    def get(self, key, default=None):
+        return self.cache.get(self._key(key), default)
+
+    def set(self, key, value, timeout=_MISSING):
+        self.cache.set(self._key(key), value, self.timeout if timeout is _MISSING else timeout)
+
+    def add(self, key, value, timeout=_MISSING):
+        return self.cache.add(self._key(key), value, self.timeout if timeout is _MISSING else timeout)
+
+    def delete(self, key):
+        self.cache.delete(self._key(key))
+
+    def clear(self):
+        self.cache.set(self._generation_key, _new_generation(), None)
+
+
+def _new_generation():
+    return uuid.uuid4().hex
+
+
+def build_backend(options, key_prefix=''):
+    """LRUCache for BACKEND 'local' (the default), SharedCacheBackend for 'shared'."""
+    if options.get('BACKEND', 'local') == 'shared':
+        return SharedCacheBackend(options.get('ALIAS', 'default'), options['TIMEOUT'], key_prefix)
+    return LRUCache(max_entries=options['MAX_ENTRIES'], timeout=options['TIMEOUT'])
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.failed = False
+
+
+class ReadThroughCache:
+    """
+    Read-through cache over a get/set/delete backend.
+
+    ``get_or_load`` returns the cached value or calls ``loader`` and stores
+    its result; a loader returning None (e.g. "not found") is not cached.
+    Concurrent misses on the same key in this process share one loader
+    call, so a hot key that expires or is invalidated costs one query, not
+    one per waiting request. A load that overlaps a ``delete`` is returned
+    to its callers but not stored, so it cannot resurrect stale data.
+    """
+
+    def __init__(self, backend, wait_timeout=5):
+        self.backend = backend
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._epoch = 0
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def get_or_load(self, key, loader):
+        value = self.backend.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            epoch = self._epoch
+
+        if not leader:
+            if flight.done.wait(self.wait_timeout) and not flight.failed:
+                return flight.value
+            return loader()
+
+        try:
+            flight.value = loader()
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if not flight.failed and flight.value is not None and epoch == self._epoch:
+                    self.backend.set(key, flight.value)
+            flight.done.set()
+        return flight.value
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._epoch += 1
+        self.backend.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+        self.backend.clear()
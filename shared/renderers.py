@@ -0,0 +1,128 @@
+import datetime
+import decimal
+import json
+import uuid
+from functools import lru_cache
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder as DRFJSONEncoder
+
+
+class RawJSON:
+    """
+    Already-encoded JSON bytes to be spliced into a response as-is, e.g. a
+    serialized payload kept in a cache. Pass it as ``data`` (or ``errors`` /
+    ``pagination``) to the helpers in shared/responses.py.
+    """
+
+    __slots__ = ('encoded',)
+
+    def __init__(self, encoded):
+        self.encoded = encoded
+
+    @classmethod
+    def from_data(cls, data):
+        return cls(encode(data))
+
+    def decode(self):
+        return json.loads(self.encoded)
+
+    def __eq__(self, other):
+        return isinstance(other, RawJSON) and other.encoded == self.encoded
+
+    def __repr__(self):
+        return f'RawJSON({self.encoded[:40]!r}...)'
+
+
+_drf_encoder = DRFJSONEncoder()
+
+
+def _default(obj):
+    # Exact-type lookups for the common cases, then DRF's isinstance chain
+    # for everything else; output matches DRF's JSONEncoder either way.
+    encoder = _TYPE_ENCODERS.get(type(obj))
+    if encoder is not None:
+        return encoder(obj)
+    return _drf_encoder.default(obj)
+
+
+_TYPE_ENCODERS = {
+    uuid.UUID: str,
+    decimal.Decimal: float,
+    datetime.datetime: _drf_encoder.default,
+    datetime.date: datetime.date.isoformat,
+}
+
+_encoder = json.JSONEncoder(
+    default=_default,
+    ensure_ascii=not api_settings.UNICODE_JSON,
+    allow_nan=not api_settings.STRICT_JSON,
+    separators=(',', ':'),
+)
+
+
+def encode(data):
+    """Encode data exactly as JSONRenderer would in compact mode."""
+    text = _encoder.encode(data)
+    # Same escaping as JSONRenderer, so the output is safe inside <script>.
+    if '\u2028' in text or '\u2029' in text:
+        text = text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+    return text.encode()
+
+
+@lru_cache(maxsize=64)
+def _encode_key(key):
+    return encode(key) + b':'
+
+
+@lru_cache(maxsize=1024)
+def _encode_member(key, value):
+    # Status strings and messages repeat across responses.
+    return _encode_key(key) + encode(value)
+
+
+class EnvelopeJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer specialised for the {status, message, data, ...} envelope
+    built by shared/responses.py.
+
+    Envelopes holding RawJSON members are assembled member by member: the
+    RawJSON bytes are spliced in without being parsed or re-encoded, and
+    status and message members are encoded once and reused. Anything else
+    is encoded in one pass by a single shared encoder with exact-type fast
+    paths for UUID, Decimal and datetime, so plain responses cost no more
+    than with JSONRenderer. Output is byte-for-byte what JSONRenderer
+    produces. Requests asking for indented output get the stock renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(_decode_raw(data), accepted_media_type, renderer_context)
+        if isinstance(data, RawJSON):
+            return data.encoded
+        if type(data) is not dict or not any(isinstance(value, RawJSON) for value in data.values()):
+            return encode(data)
+
+        # One join, so the payload bytes are copied once.
+        parts = []
+        for key, value in data.items():
+            parts.append(b',' if parts else b'{')
+            if isinstance(value, RawJSON):
+                parts += (_encode_key(key), value.encoded)
+            elif key in ('status', 'message') and type(value) is str:
+                parts.append(_encode_member(key, value))
+            else:
+                parts += (_encode_key(key), encode(value))
+        parts.append(b'}')
+        return b''.join(parts)
+
+
+def _decode_raw(data):
+    if isinstance(data, RawJSON):
+        return data.decode()
+    if type(data) is dict:
+        return {key: _decode_raw(value) for key, value in data.items()}
+    return data
@@ -1,5 +1,7 @@
 from rest_framework.response import Response
 
+from shared.renderers import EnvelopeJSONRenderer
+
 
 def handle_success(data=None, message="", status_code=200):
     response = {
@@ -9,6 +11,15 @@ def handle_success(data=None, message="", status_code=200):
     }
     return Response(response, status=status_code)
 
+def handle_paginated_success(data=None, pagination=None, message="", status_code=200):
+    response = {
+        "status": "success",
+        "message": message,
+        "data": data,
+        "pagination": pagination
+    }
+    return Response(response, status=status_code)
+
 def handle_error(errors=None, message="", status_code=400):
     response = {
         "status": "error",
@@ -37,4 +48,11 @@ def handle_permission_denied(message="Permission Denied", status_code=403):
         "status": "error",
         "message": message
     }
-    return Response(response, status=status_code)
\ No newline at end of file
+    return Response(response, status=status_code)
+
+def render_response(response):
+    """Render a helper's Response outside a DRF view (e.g. in async views)."""
+    response.accepted_renderer = EnvelopeJSONRenderer()
+    response.accepted_media_type = "application/json"
+    response.renderer_context = {}
+    return response.render()
@@ -0,0 +1,180 @@
+import contextvars
+import hashlib
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+
+REPLICA_SETTINGS = {
+    # Models whose reads may be served by a replica.
+    'MODELS': ['user.FarmerProfile', 'user.ProductListing'],
+    # How long a client keeps reading from the primary after it wrote, to
+    # cover replication lag (read-your-writes).
+    'STICKY_SECONDS': 5,
+    'COOKIE_NAME': 'db_primary_until',
+    # Clients that drop cookies (most mobile HTTP stacks) are pinned by
+    # bearer token in this cache instead; use a shared one across workers.
+    'CACHE_ALIAS': 'default',
+    # How often a replica's connection is re-checked, in seconds.
+    'HEALTH_CHECK_INTERVAL': 10,
+    **getattr(settings, 'DATABASE_REPLICA_ROUTING', {}),
+}
+
+PRIMARY = 'default'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class _RequestState:
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+# Set by ReplicaRoutingMiddleware for the duration of a request. Outside a
+# request (management commands, shell, tests without the middleware) every
+# read goes to the primary.
+_request_state = contextvars.ContextVar('db_request_state', default=None)
+
+
+def replica_aliases():
+    """Aliases of DATABASES entries that mirror the primary."""
+    return [
+        alias for alias, database in settings.DATABASES.items()
+        if alias != PRIMARY and database.get('TEST', {}).get('MIRROR') == PRIMARY
+    ]
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads of REPLICA_SETTINGS['MODELS'] made while handling a safe
+    (GET/HEAD/OPTIONS) request to a random healthy replica, and everything
+    else to the primary. A request stops using replicas as soon as it
+    writes or opens a transaction on the primary, and the middleware keeps
+    the client on the primary for STICKY_SECONDS after any write.
+    """
+
+    def __init__(self, replicas=None):
+        self.replicas = replica_aliases() if replicas is None else list(replicas)
+        self.models = {label.lower() for label in REPLICA_SETTINGS['MODELS']}
+        self.health_check_interval = REPLICA_SETTINGS['HEALTH_CHECK_INTERVAL']
+        self._health = {}
+        self._health_lock = threading.Lock()
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or state.pinned or not self.replicas:
+            return PRIMARY
+        if model._meta.label_lower not in self.models or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        healthy = [alias for alias in self.replicas if self.is_healthy(alias)]
+        return random.choice(healthy) if healthy else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in self.replicas
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        checked_at, healthy = self._health.get(alias, (None, True))
+        if checked_at is not None and now - checked_at < self.health_check_interval:
+            return healthy
+        with self._health_lock:
+            try:
+                connection = connections[alias]
+                connection.ensure_connection()
+                healthy = connection.is_usable()
+            except DatabaseError:
+                healthy = False
+            self._health[alias] = (now, healthy)
+        return healthy
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Tells PrimaryReplicaRouter which requests may read from replicas: safe
+    methods from clients that have not written in the last STICKY_SECONDS.
+    A request that writes pins the client to the primary with a short-lived
+    cookie and, for token-authenticated clients, a cache entry keyed by the
+    token. Without replicas configured it does nothing.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = bool(replica_aliases())
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        state = _RequestState(self.must_use_primary(request))
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.stick_if_wrote(request, state, response)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        state = _RequestState(self.must_use_primary(request))
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.stick_if_wrote(request, state, response)
+
+    def must_use_primary(self, request):
+        if request.method not in SAFE_METHODS:
+            return True
+        now = time.time()
+        try:
+            if float(request.COOKIES.get(REPLICA_SETTINGS['COOKIE_NAME'], 0)) > now:
+                return True
+        except ValueError:
+            pass
+        key = _token_key(request)
+        return key is not None and caches[REPLICA_SETTINGS['CACHE_ALIAS']].get(key, 0) > now
+
+    def stick_if_wrote(self, request, state, response):
+        if state.wrote:
+            seconds = REPLICA_SETTINGS['STICKY_SECONDS']
+            until = time.time() + seconds
+            response.set_cookie(
+                REPLICA_SETTINGS['COOKIE_NAME'], str(until),
+                max_age=seconds, httponly=True, samesite='Lax',
+            )
+            key = _token_key(request)
+            if key is not None:
+                caches[REPLICA_SETTINGS['CACHE_ALIAS']].set(key, until, seconds)
+        return response
+
+
+def _token_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return 'db-primary:' + hashlib.blake2b(authorization.encode(), digest_size=16).hexdigest()
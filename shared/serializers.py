@@ -0,0 +1,180 @@
+class InvalidFieldSelection(Exception):
+    pass
+
+
+class FieldSelection:
+    """
+    The fields a client asked for with ``?fields=``, ``?exclude=`` and
+    ``?expand=`` (comma-separated, dotted for nested fields, e.g.
+    ``fields=farm_name,user.username&expand=user``).
+
+    ``fields`` is None when the client did not restrict the fields. Nested
+    selections are kept per field name in ``nested``.
+    """
+
+    def __init__(self, fields=None, exclude=(), expand=()):
+        self.fields = None
+        self.exclude = set()
+        self.expand = set()
+        self.nested = {}
+        if fields is not None:
+            self.fields = set()
+            for path in fields:
+                self.add_field(path)
+        for path in exclude:
+            self.add_exclude(path)
+        for path in expand:
+            self.add_expand(path)
+
+    @classmethod
+    def from_query_params(cls, query_params):
+        """The selection in a request's query string, or None if it has none."""
+        lists = [
+            [path.strip() for path in query_params.get(key, '').split(',') if path.strip()]
+            for key in ('fields', 'exclude', 'expand')
+        ]
+        if not any(lists):
+            return None
+        fields, exclude, expand = lists
+        return cls(fields or None, exclude, expand)
+
+    def child(self, name):
+        if name not in self.nested:
+            self.nested[name] = FieldSelection()
+        return self.nested[name]
+
+    def add_field(self, path):
+        name, _, rest = path.partition('.')
+        if self.fields is None:
+            self.fields = set()
+        self.fields.add(name)
+        if rest:
+            self.child(name).add_field(rest)
+
+    def add_exclude(self, path):
+        name, _, rest = path.partition('.')
+        if rest:
+            self.child(name).add_exclude(rest)
+        else:
+            self.exclude.add(name)
+
+    def add_expand(self, path):
+        name, _, rest = path.partition('.')
+        self.expand.add(name)
+        if rest:
+            self.child(name).add_expand(rest)
+
+
+class QuerysetBuilderMixin:
+    """
+    Lets a ModelSerializer build the queryset it needs.
+
+    Nested serializers that also use this mixin are followed with
+    select_related, and only the columns listed in Meta.fields (plus the
+    foreign keys needed for the joins) are loaded, so serializing any
+    number of rows costs a single query.
+
+    A FieldSelection passed as ``selection=`` (to the serializer and to
+    setup_queryset) narrows both the output and the loaded columns.
+    Serializers listed in ``Meta.expandable_fields`` (name -> serializer
+    class) are only included, and joined, when the selection expands them.
+    """
+
+    def __init__(self, *args, selection=None, **kwargs):
+        self.selection = selection
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.selection is None:
+            return fields
+        selected = {}
+        for name, nested_class, nested_selection in self.plan(self.selection):
+            if name in fields:
+                field = fields[name]
+                if isinstance(field, QuerysetBuilderMixin):
+                    field.selection = nested_selection
+            else:
+                field = nested_class(read_only=True, selection=nested_selection)
+            selected[name] = field
+        return selected
+
+    @classmethod
+    def plan(cls, selection=None):
+        """
+        (name, nested serializer class or None, nested selection) for each
+        field in the output, in order.
+        """
+        expandable = getattr(cls.Meta, 'expandable_fields', {})
+        if selection is None:
+            names = list(cls.Meta.fields)
+        else:
+            known = set(cls.Meta.fields) | set(expandable)
+            unknown = (selection.fields or set()) | selection.exclude | selection.expand | set(selection.nested)
+            unknown -= known
+            if unknown:
+                raise InvalidFieldSelection(
+                    f"Unknown field(s) for {cls.Meta.model.__name__}: {', '.join(sorted(unknown))}. "
+                    f"Available: {', '.join(sorted(known))}."
+                )
+            requested = selection.expand | (selection.fields or set())
+            names = [
+                name for name in [*cls.Meta.fields, *expandable]
+                if (name not in expandable or name in requested)
+                and (selection.fields is None or name in selection.fields or name in selection.expand)
+                and name not in selection.exclude
+            ]
+        plan = []
+        for name in names:
+            nested_class = expandable.get(name)
+            field = cls._declared_fields.get(name)
+            if nested_class is None and isinstance(field, QuerysetBuilderMixin):
+                nested_class = type(field)
+            nested_selection = selection.nested.get(name) if selection is not None else None
+            if nested_selection is not None and nested_class is None:
+                raise InvalidFieldSelection(f"'{name}' has no nested fields to select.")
+            plan.append((name, nested_class, nested_selection))
+        return plan
+
+    @classmethod
+    def get_related_fields(cls, prefix='', selection=None):
+        related = []
+        for name, nested_class, nested_selection in cls.plan(selection):
+            if nested_class is not None:
+                path = prefix + name
+                related.append(path)
+                related.extend(nested_class.get_related_fields(path + '__', nested_selection))
+        return related
+
+    @classmethod
+    def get_only_fields(cls, prefix='', selection=None):
+        only = []
+        for name, nested_class, nested_selection in cls.plan(selection):
+            only.append(prefix + name)
+            if nested_class is not None:
+                only.extend(nested_class.get_only_fields(prefix + name + '__', nested_selection))
+        return only
+
+    @classmethod
+    def get_version_fields(cls, prefix='', selection=None):
+        """The ``updated_at`` of every model rendered, for the conditional-GET validators."""
+        versions = []
+        if any(field.name == 'updated_at' for field in cls.Meta.model._meta.concrete_fields):
+            versions.append(prefix + 'updated_at')
+        for name, nested_class, nested_selection in cls.plan(selection):
+            if nested_class is not None:
+                versions.extend(nested_class.get_version_fields(prefix + name + '__', nested_selection))
+        return versions
+
+    @classmethod
+    def setup_queryset(cls, queryset=None, selection=None, required=()):
+        """
+        The queryset for serializing with ``selection``. ``required`` names
+        further columns the caller reads itself, such as the pagination keys.
+        """
+        if queryset is None:
+            queryset = cls.Meta.model.objects.all()
+        related = cls.get_related_fields(selection=selection)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*cls.get_only_fields(selection=selection), *required)
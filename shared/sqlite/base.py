@@ -0,0 +1,117 @@
+"""
+SQLite engine for running the API on a single SQLite file.
+
+Django's own options cover most of the profile (see SQLITE_PROFILE_OPTIONS
+in farmbora/settings.py): ``init_command`` sets WAL journaling,
+``synchronous=NORMAL`` and ``mmap_size``, ``timeout`` is SQLite's busy
+timeout and ``transaction_mode: 'IMMEDIATE'`` takes the write lock when a
+transaction begins, so a read transaction never has to upgrade.
+
+What they cannot do is queue this process's writers. With
+``ENGINE: 'shared.sqlite'`` transactions begin once a process-wide writer
+lock for the database file is held, and autocommit INSERT/UPDATE/DELETE
+statements take the same lock, so threads wait in Python instead of
+polling SQLite's lock and failing with "database is locked" when the busy
+timeout runs out. The lock waits as long as ``timeout``. Between processes
+SQLite's own lock and busy timeout still apply.
+
+Every ``transaction.atomic()`` block is therefore a write transaction; keep
+read-only code outside them.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+# sqlite3.connect()'s own default busy timeout, in seconds.
+DEFAULT_TIMEOUT = 5.0
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_writer_locks = {}
+_writer_locks_guard = threading.Lock()
+
+
+def writer_lock(name):
+    """The process-wide lock serializing writes to the database file ``name``."""
+    with _writer_locks_guard:
+        return _writer_locks.setdefault(str(name), threading.Lock())
+
+
+class SerializedWriteCursor(base.SQLiteCursorWrapper):
+    # Set by DatabaseWrapper.create_cursor.
+    wrapper = None
+
+    def execute(self, query, params=None):
+        if self.wrapper.holds_writer or not _is_write(query):
+            return super().execute(query, params)
+        with self.wrapper.writer():
+            return super().execute(query, params)
+
+    def executemany(self, query, param_list):
+        if self.wrapper.holds_writer or not _is_write(query):
+            return super().executemany(query, param_list)
+        with self.wrapper.writer():
+            return super().executemany(query, param_list)
+
+
+def _is_write(query):
+    return query.lstrip()[:7].upper().startswith(WRITE_STATEMENTS)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.holds_writer = False
+        self._writer_lock = writer_lock(self.settings_dict['NAME'])
+        self._writer_timeout = self.settings_dict['OPTIONS'].get('timeout', DEFAULT_TIMEOUT)
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SerializedWriteCursor)
+        cursor.wrapper = self
+        return cursor
+
+    def acquire_writer(self):
+        if not self._writer_lock.acquire(timeout=self._writer_timeout):
+            raise OperationalError("database is locked")
+        self.holds_writer = True
+
+    def release_writer(self):
+        if self.holds_writer:
+            self.holds_writer = False
+            self._writer_lock.release()
+
+    @contextmanager
+    def writer(self):
+        self.acquire_writer()
+        try:
+            yield
+        finally:
+            self.release_writer()
+
+    def _start_transaction_under_autocommit(self):
+        self.acquire_writer()
+        try:
+            super()._start_transaction_under_autocommit()
+        except BaseException:
+            self.release_writer()
+            raise
+
+    def _commit(self):
+        super()._commit()
+        # A failed commit leaves the transaction open until the rollback.
+        self.release_writer()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self.release_writer()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self.release_writer()
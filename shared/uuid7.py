@@ -0,0 +1,49 @@
+import os
+import threading
+import time
+import uuid
+
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7(timestamp_ms=None):
+    """
+    Time-ordered UUID (RFC 9562 version 7).
+
+    The top 48 bits are a unix timestamp in milliseconds, the 12 bit rand_a
+    field is used as a per-process counter so ids generated within the same
+    millisecond still sort in creation order, and the remaining 62 bits are
+    random. Passing timestamp_ms builds an id for a past instant (used when
+    rekeying existing rows) and does not touch the counter.
+    """
+    global _last_ms, _counter
+
+    if timestamp_ms is None:
+        with _lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > _last_ms:
+                _last_ms = now_ms
+                _counter = int.from_bytes(os.urandom(2), 'big') & 0x7FF
+            else:
+                _counter += 1
+                if _counter > 0xFFF:
+                    _last_ms += 1
+                    _counter = 0
+            timestamp_ms, seq = _last_ms, _counter
+    else:
+        seq = int.from_bytes(os.urandom(2), 'big') & 0xFFF
+
+    rand_b = int.from_bytes(os.urandom(8), 'big') & 0x3FFFFFFFFFFFFFFF
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80
+    value |= 0x7 << 76
+    value |= seq << 64
+    value |= 0x2 << 62
+    value |= rand_b
+    return uuid.UUID(int=value)
+
+
+def uuid7_timestamp_ms(value):
+    return value.int >> 80 if value.version == 7 else None
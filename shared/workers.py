@@ -0,0 +1,86 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+class PoolSaturated(Exception):
+    pass
+
+
+class BoundedPool:
+    """
+    Fixed-size thread pool for CPU-heavy work called from async views.
+
+    At most ``max_pending`` jobs may be queued or running at once; beyond
+    that ``run`` raises PoolSaturated immediately, so callers can shed load
+    with a fast 503 instead of letting latency grow without bound.
+    Password hashing (hashlib.pbkdf2_hmac) releases the GIL, so the pool's
+    threads hash in parallel. With ``max_workers=0`` jobs run on Django's
+    shared sync thread instead, which keeps them on the request's database
+    connection (useful in tests).
+    """
+
+    def __init__(self, max_workers=4, max_pending=64, name='bounded-pool'):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = None
+        if max_workers:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return False
+            self._pending += 1
+            return True
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, func, *args, **kwargs):
+        if not self._acquire():
+            raise PoolSaturated()
+        try:
+            if self._executor is None:
+                job = asyncio.ensure_future(sync_to_async(func)(*args, **kwargs))
+            else:
+                # copy_context so the job still reports into the request's
+                # context variables, as sync_to_async would.
+                job = self._executor.submit(
+                    contextvars.copy_context().run, _with_db_cleanup(func), *args, **kwargs
+                )
+        except BaseException:
+            self._release()
+            raise
+        # The slot is freed when the job finishes, not when the caller stops
+        # waiting: a caller cancelled by a client disconnect must not let more
+        # work in while its job is still queued or running. Cancelling a job
+        # that has not started yet drops it from the queue.
+        job.add_done_callback(lambda _: self._release())
+        if self._executor is None:
+            return await asyncio.shield(job)
+        return await asyncio.wrap_future(job)
+
+
+def _with_db_cleanup(func):
+    # Pool threads live outside the request cycle, so nothing else closes
+    # their database connections; honour CONN_MAX_AGE the same way Django
+    # does at request boundaries.
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
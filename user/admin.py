@@ -1,3 +1,23 @@
 from django.contrib import admin
+from .models import FarmerProfile, BuyerProfile, ProductListing
 
-# Register your models here.
+
+@admin.register(FarmerProfile)
+class FarmerProfileAdmin(admin.ModelAdmin):
+    list_display = ('farm_name', 'user', 'farm_location', 'created_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(BuyerProfile)
+class BuyerProfileAdmin(admin.ModelAdmin):
+    list_display = ('company_name', 'user', 'company_address', 'created_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(ProductListing)
+class ProductListingAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'farmer', 'price_per_unit', 'quantity', 'created_at')
+    list_select_related = ('farmer__user',)
+    raw_id_fields = ('farmer',)
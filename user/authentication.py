@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from shared.lru import LRUCache
+from .models import CustomUser, FarmerProfile, BuyerProfile
+
+# Per-process snapshot of each authenticated user's row plus whether they
+# have a farmer/buyer profile. Entries are dropped by the signal handlers in
+# user/signals.py on save/delete in this process; the timeout bounds how long
+# other worker processes can keep serving a stale snapshot.
+user_cache = LRUCache(
+    max_entries=getattr(settings, 'AUTH_USER_CACHE_MAX_ENTRIES', 10000),
+    timeout=getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60),
+)
+
+USER_FIELDS = [field.attname for field in CustomUser._meta.concrete_fields]
+
+
+def load_user_state(user_id):
+    queryset = CustomUser.objects.annotate(
+        has_farmer_profile=Exists(FarmerProfile.objects.filter(user=OuterRef('pk'))),
+        has_buyer_profile=Exists(BuyerProfile.objects.filter(user=OuterRef('pk'))),
+    )
+    row = queryset.values_list(*USER_FIELDS, 'has_farmer_profile', 'has_buyer_profile').get(pk=user_id)
+    state = {
+        'db': queryset.db,
+        'values': row[:len(USER_FIELDS)],
+        'has_farmer_profile': row[-2],
+        'has_buyer_profile': row[-1],
+    }
+    user_cache.set(str(user_id), state)
+    return state
+
+
+def build_user(state):
+    user = CustomUser.from_db(state['db'], USER_FIELDS, state['values'])
+    # A cached None makes hasattr(user, 'farmer_profile') False and
+    # user.farmer_profile raise DoesNotExist without a query. Existing
+    # profiles are still loaded on access so views always write fresh rows.
+    if not state['has_farmer_profile']:
+        user._state.fields_cache['farmer_profile'] = None
+    if not state['has_buyer_profile']:
+        user._state.fields_cache['buyer_profile'] = None
+    return user
+
+
+def get_cached_user(user_id):
+    state = user_cache.get(str(user_id))
+    if state is None:
+        state = load_user_state(user_id)
+    return build_user(state)
+
+
+# Invalidation is signal-driven: save() and delete() drop the entry, but
+# queryset.update() and raw SQL send no signals. Deactivating users with
+# CustomUser.objects.filter(...).update(is_active=False) leaves them
+# authenticated until AUTH_USER_CACHE_TIMEOUT expires, so call
+# invalidate_user() for each of them afterwards, or deactivate through save().
+def invalidate_user(user_id):
+    key = str(user_id)
+    user_cache.delete(key)
+    # Also drop anything cached between the write and the commit.
+    transaction.on_commit(lambda: user_cache.delete(key))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user from the per-process
+    user_cache, so warm requests authenticate without touching the database.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = get_cached_user(user_id)
+        except (CustomUser.DoesNotExist, ValueError) as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,50 @@
+from .models import CustomUser, FarmerProfile, ProductListing
+
+# Batching for the ProductListing pre_delete handler that maintains derived
+# data (the search index, price rollups, the feed, sync tombstones). Django
+# sends pre_delete once per row; the ``origin`` it passes tells which delete
+# the row belongs to, so the handler can deal with every listing of a
+# cascade or queryset delete on the first call and skip the rest.
+
+
+def deleted_listings(origin, instance):
+    """
+    The listings removed by the delete that ``origin`` started, as a
+    queryset. None for origins not recognised here.
+    """
+    if isinstance(origin, ProductListing):
+        return ProductListing.objects.filter(pk=origin.pk)
+    model = getattr(origin, 'model', None)
+    if model is ProductListing:
+        return origin
+    if isinstance(origin, FarmerProfile):
+        return ProductListing.objects.filter(farmer=origin)
+    if model is FarmerProfile:
+        return ProductListing.objects.filter(farmer__in=origin.values('pk'))
+    if isinstance(origin, CustomUser):
+        return ProductListing.objects.filter(farmer__user=origin)
+    if model is CustomUser:
+        return ProductListing.objects.filter(farmer__user__in=origin.values('pk'))
+    return None
+
+
+def claim_deleted_listings(instance, origin, tag, fields=(), using=None):
+    """
+    ``(pk, *fields)`` rows of every listing removed by the delete
+    ``instance`` belongs to, on the first call for that delete, and an
+    empty list on the calls for its other rows. ``tag`` keeps the pending
+    set of each handler apart; it lives on the origin, so a later delete
+    starts afresh.
+    """
+    holder = origin if origin is not None else instance
+    pending = holder.__dict__.setdefault(tag, set())
+    if instance.pk in pending:
+        pending.discard(instance.pk)
+        return []
+    listings = deleted_listings(origin, instance)
+    if listings is None:
+        listings = ProductListing.objects.filter(pk=instance.pk)
+    rows = list(listings.using(using).values_list('pk', *fields))
+    pending.update(row[0] for row in rows)
+    pending.discard(instance.pk)
+    return rows
@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+EXPORT_CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def parse_timestamp(value):
+    """Parse an ISO datetime or date query parameter, or raise ValueError."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_current_timezone())
+    return parsed
+
+
+def export_queryset(serializer_class, updated_since=None, updated_until=None):
+    queryset = serializer_class.setup_queryset()
+    if updated_since is not None:
+        queryset = queryset.filter(updated_at__gte=updated_since)
+    if updated_until is not None:
+        queryset = queryset.filter(updated_at__lt=updated_until)
+    return queryset.order_by('updated_at', 'id')
+
+
+def iter_rows(serializer_class, queryset):
+    serializer = serializer_class()
+    for instance in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield serializer.to_representation(instance)
+
+
+def iter_ndjson(rows):
+    buffer = []
+    for row in rows:
+        buffer.append(json.dumps(row, ensure_ascii=False, separators=(',', ':')))
+        if len(buffer) >= 500:
+            yield ('\n'.join(buffer) + '\n').encode()
+            buffer = []
+    if buffer:
+        yield ('\n'.join(buffer) + '\n').encode()
+
+
+def iter_csv(rows, fields):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % 500 == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def iter_gzip(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def accepts_gzip(request):
+    """
+    Whether Accept-Encoding allows gzip: listed (or matched by ``*``) with
+    a q-value above zero. ``gzip;q=0`` refuses it.
+    """
+    qualities = {}
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, *params = [part.strip() for part in coding.split(';')]
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+    for name in ('gzip', 'x-gzip', '*'):
+        if name in qualities:
+            return qualities[name] > 0
+    return False
@@ -0,0 +1,157 @@
+from itertools import islice
+
+from django.db import router
+
+from .market import normalize
+from .models import FeedEntry, ProductListing
+
+# The marketplace feed: FeedEntry rows copy the listing, farm and farmer
+# columns the feed shows. Signal handlers in user/signals.py (and the bulk
+# views, which skip signals) keep them current with one statement per
+# change: an upsert for a listing, an UPDATE by farmer_id or user_id when a
+# farm or username changes. rebuild_feed recreates the table and check_feed
+# compares it with the source tables.
+
+# Feed column -> path from ProductListing.
+SOURCES = {
+    'id': 'id',
+    'product_name': 'product_name',
+    'price_per_unit': 'price_per_unit',
+    'quantity': 'quantity',
+    'product_image': 'product_image',
+    'created_at': 'created_at',
+    'farmer_id': 'farmer_id',
+    'farm_name': 'farmer__farm_name',
+    'farm_location': 'farmer__farm_location',
+    'farm_image': 'farmer__farm_image',
+    'user_id': 'farmer__user_id',
+    'username': 'farmer__user__username',
+}
+
+COLUMNS = [*SOURCES, 'location_key']
+
+
+def _entry(values):
+    values['location_key'] = normalize(values['farm_location'])
+    return FeedEntry(**values)
+
+
+def source_entries(queryset):
+    """Unsaved FeedEntry objects for the listings in ``queryset``, from one joined query."""
+    fields = list(SOURCES)
+    return [
+        _entry(dict(zip(fields, row)))
+        for row in queryset.values_list(*SOURCES.values()).iterator()
+    ]
+
+
+def listing_entries(listings, farmer):
+    """FeedEntry objects for listings of ``farmer`` held in memory, without queries."""
+    user = farmer.user
+    return [
+        _entry({
+            'id': listing.pk,
+            'product_name': listing.product_name,
+            'price_per_unit': listing.price_per_unit,
+            'quantity': listing.quantity,
+            'product_image': listing.product_image,
+            'created_at': listing.created_at,
+            'farmer_id': farmer.pk,
+            'farm_name': farmer.farm_name,
+            'farm_location': farmer.farm_location,
+            'farm_image': farmer.farm_image,
+            'user_id': user.pk,
+            'username': user.username,
+        })
+        for listing in listings
+    ]
+
+
+def save_entries(entries, using=None):
+    if entries:
+        using = using or router.db_for_write(FeedEntry)
+        FeedEntry.objects.using(using).bulk_create(
+            entries, update_conflicts=True, unique_fields=['id'],
+            update_fields=[column for column in COLUMNS if column != 'id'],
+        )
+
+
+def refresh_listing(listing, using=None):
+    farmer = listing.farmer if ProductListing.farmer.is_cached(listing) else None
+    if farmer is not None and type(farmer).user.is_cached(farmer):
+        entries = listing_entries([listing], farmer)
+    else:
+        entries = source_entries(ProductListing.objects.using(using).filter(pk=listing.pk))
+    save_entries(entries, using=using)
+
+
+def refresh_farm(farmer, using=None):
+    FeedEntry.objects.using(using).filter(farmer_id=farmer.pk).update(
+        farm_name=farmer.farm_name,
+        farm_location=farmer.farm_location,
+        location_key=normalize(farmer.farm_location),
+        farm_image=farmer.farm_image,
+    )
+
+
+def refresh_username(user, using=None):
+    FeedEntry.objects.using(using).filter(user_id=user.pk).update(username=user.username)
+
+
+def remove_entries(ids, using=None):
+    FeedEntry.objects.using(using).filter(id__in=ids).delete()
+
+
+def _iter_source(queryset, chunk_size):
+    fields = list(SOURCES)
+    for row in queryset.values_list(*SOURCES.values()).iterator(chunk_size=chunk_size):
+        yield _entry(dict(zip(fields, row)))
+
+
+def rebuild(using='default', chunk_size=2000):
+    """
+    Recreate every entry from the listings, holding one chunk of them in
+    memory at a time. Run it in a transaction, or readers see a partial
+    feed. Returns the number of entries.
+    """
+    FeedEntry.objects.using(using).all().delete()
+    entries = _iter_source(ProductListing.objects.using(using), chunk_size)
+    total = 0
+    while True:
+        chunk = list(islice(entries, chunk_size))
+        if not chunk:
+            return total
+        FeedEntry.objects.using(using).bulk_create(chunk)
+        total += len(chunk)
+
+
+def check(using='default', chunk_size=2000, repair=False):
+    """
+    Compare the feed with its source tables in one ordered pass over each.
+    Returns the ids of listings without an entry (missing), entries without
+    a listing (orphaned) and entries whose columns differ (stale). With
+    ``repair`` the differences are fixed.
+    """
+    expected = _iter_source(ProductListing.objects.using(using).order_by('pk'), chunk_size)
+    actual = FeedEntry.objects.using(using).order_by('pk').values_list(*COLUMNS).iterator(chunk_size=chunk_size)
+    missing, orphaned, stale = [], [], []
+    entry = next(expected, None)
+    row = next(actual, None)
+    while entry is not None or row is not None:
+        if row is None or (entry is not None and entry.pk < row[0]):
+            missing.append(entry.pk)
+            entry = next(expected, None)
+        elif entry is None or row[0] < entry.pk:
+            orphaned.append(row[0])
+            row = next(actual, None)
+        else:
+            if tuple(getattr(entry, column) for column in COLUMNS) != row:
+                stale.append(entry.pk)
+            entry = next(expected, None)
+            row = next(actual, None)
+    if repair:
+        FeedEntry.objects.using(using).filter(id__in=orphaned).delete()
+        for start in range(0, len(missing) + len(stale), chunk_size):
+            ids = (missing + stale)[start:start + chunk_size]
+            save_entries(source_entries(ProductListing.objects.using(using).filter(pk__in=ids)), using=using)
+    return {'missing': missing, 'orphaned': orphaned, 'stale': stale}
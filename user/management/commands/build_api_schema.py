@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from farmbora import schema
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI document served at /swagger.json for the current code version."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Where to write it (default: API_SCHEMA['FILE']).")
+
+    def handle(self, *args, **options):
+        path = options['output'] or schema.API_SCHEMA_SETTINGS['FILE']
+        content = schema.write_schema(path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(content)} bytes to {path} (version {schema.code_version()})"
+        ))
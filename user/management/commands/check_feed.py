@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from user import feed
+
+
+class Command(BaseCommand):
+    help = "Compare the marketplace feed with the listings, farms and users it copies."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--repair', action='store_true', help="Fix the entries that differ.")
+
+    def handle(self, *args, **options):
+        using = options['database']
+        with transaction.atomic(using=using):
+            problems = feed.check(using=using, chunk_size=options['chunk_size'], repair=options['repair'])
+        total = sum(len(ids) for ids in problems.values())
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Feed is consistent"))
+            return
+        for kind, ids in problems.items():
+            for pk in ids[:20]:
+                self.stdout.write(f"{kind}: {pk}")
+            if len(ids) > 20:
+                self.stdout.write(f"{kind}: ... and {len(ids) - 20} more")
+        summary = ', '.join(f"{len(ids)} {kind}" for kind, ids in problems.items())
+        if options['repair']:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {summary} feed entries"))
+            return
+        raise CommandError(f"Feed is inconsistent: {summary}")
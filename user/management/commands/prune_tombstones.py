@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from user.models import Tombstone
+from user.sync import SYNC_SETTINGS
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete sync tombstones older than DELTA_SYNC['TOMBSTONE_DAYS'], in "
+        "small batches. Cursors that old are refused anyway. Meant to run periodically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        cutoff = timezone.now() - timedelta(days=SYNC_SETTINGS['TOMBSTONE_DAYS'])
+        total = 0
+        while True:
+            ids = list(
+                Tombstone.objects
+                .filter(deleted_at__lt=cutoff)
+                .order_by('deleted_at', 'id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            Tombstone.objects.filter(id__in=ids).delete()
+            total += len(ids)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} sync tombstones."))
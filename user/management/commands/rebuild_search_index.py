@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from user import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for product listings and farms in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(search.SEARCH_INDEXES), action='append')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--database', default='default')
+        parser.add_argument(
+            '--recreate', action='store_true',
+            help="Drop and recreate the index tables before loading them."
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not search.fts_enabled(using):
+            self.stdout.write("Full-text index is only maintained on SQLite; nothing to do.")
+            return
+
+        kinds = options['kind'] or sorted(search.SEARCH_INDEXES)
+        if options['recreate']:
+            kinds = sorted(search.SEARCH_INDEXES)
+        search.create_search_tables(using=using, drop=options['recreate'])
+        for kind in kinds:
+            with transaction.atomic(using=using):
+                total = search.rebuild_index(kind, using=using, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f"{kind}: indexed {total} rows"))
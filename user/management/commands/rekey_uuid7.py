@@ -0,0 +1,87 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from shared.uuid7 import uuid7
+from user import feed, sync
+from user.authentication import user_cache
+from user.profile_cache import profile_cache
+from user.models import FarmerProfile, BuyerProfile, ProductListing, Tombstone
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite legacy random (v4) primary keys of BaseModel tables to "
+        "time-ordered v7 ids derived from created_at, updating every foreign "
+        "key that points at them. Old ids of synced models get tombstones and "
+        "the rekeyed rows a new updated_at, so delta-sync clients swap them. "
+        "The feed and the search index are rebuilt afterwards."
+    )
+
+    models = (FarmerProfile, BuyerProfile, ProductListing)
+    tombstone_kinds = {FarmerProfile: Tombstone.FARMER_PROFILE, ProductListing: Tombstone.PRODUCT}
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        rekeyed = 0
+        for model in self.models:
+            pending = [
+                (pk, created_at)
+                for pk, created_at in model.objects.values_list('id', 'created_at').iterator()
+                if pk.version != 7
+            ]
+            label = model._meta.label
+            if dry_run:
+                self.stdout.write(f"{label}: {len(pending)} rows would be rekeyed")
+                continue
+
+            references = [
+                (rel.related_model, rel.field.attname)
+                for rel in model._meta.related_objects
+                if rel.field.target_field == model._meta.pk
+            ]
+            kind = self.tombstone_kinds.get(model)
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                with transaction.atomic():
+                    # .update() sends no signals: touch updated_at by hand so
+                    # the rows (and those whose foreign key moved) sync again.
+                    now = timezone.now()
+                    for old_id, created_at in batch:
+                        new_id = uuid7(int(created_at.timestamp() * 1000))
+                        model.objects.filter(pk=old_id).update(id=new_id, updated_at=now)
+                        for related_model, attname in references:
+                            related_model._base_manager.filter(**{attname: old_id}).update(
+                                **{attname: new_id}, **_touch(related_model, now)
+                            )
+                    if kind is not None:
+                        sync.record_deletions(kind, [old_id for old_id, _ in batch])
+            self.stdout.write(self.style.SUCCESS(f"{label}: rekeyed {len(pending)} rows"))
+            rekeyed += len(pending)
+
+        if rekeyed:
+            self.refresh_derived_data()
+
+    def refresh_derived_data(self):
+        # The feed, the search index and the caches all hold the old ids.
+        with transaction.atomic():
+            total = feed.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} feed entries"))
+        call_command('rebuild_search_index', stdout=self.stdout)
+        profile_cache.clear()
+        user_cache.clear()
+        self.stdout.write(self.style.WARNING(
+            "Cleared the profile cache and this process's user cache. Restart the app "
+            "workers so their per-process caches do not serve the old ids."
+        ))
+
+
+def _touch(model, now):
+    return {'updated_at': now} if any(field.name == 'updated_at' for field in model._meta.concrete_fields) else {}
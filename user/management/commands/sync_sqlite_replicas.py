@@ -0,0 +1,38 @@
+import sqlite3
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from shared.routers import PRIMARY, replica_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database into every replica file from DATABASE_REPLICAS, "
+        "standing in for replication when running replicas locally."
+    )
+
+    def handle(self, *args, **options):
+        aliases = replica_aliases()
+        if not aliases:
+            raise CommandError("No replicas configured; set DATABASE_REPLICAS to a list of SQLite files.")
+        if connections[PRIMARY].vendor != 'sqlite':
+            raise CommandError("Only SQLite replicas can be synced with this command.")
+
+        primary = connections[PRIMARY]
+        primary.ensure_connection()
+        for alias in aliases:
+            path = urlsplit(str(connections[alias].settings_dict['NAME'])).path
+            connections[alias].close()
+            target = sqlite3.connect(path)
+            try:
+                # The backup API takes a consistent snapshot even while the
+                # primary is being written to.
+                primary.connection.backup(target)
+                # Replicas are opened read-only, which a WAL database
+                # copied from a WAL primary cannot be without its -shm file.
+                target.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f"{alias}: copied primary to {path}"))
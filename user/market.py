@@ -0,0 +1,222 @@
+import re
+from collections import defaultdict
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import FarmerProfile, MarketPriceRollup, ProductListing
+
+# Daily market-price rollups per (product, location).
+#
+# A listing contributes its price and quantity to the bucket keyed by its
+# normalized product name, its farm's normalized location and the day it was
+# listed. Signal handlers in user/signals.py (and the bulk views, which skip
+# signals) pass the contributions that appear and disappear to apply(), which
+# adjusts the affected buckets' histograms in a few statements. The
+# rebuild_price_rollups command recomputes every bucket from the listings.
+
+CENT = Decimal('0.01')
+
+LISTING_FIELDS = ('product_name', 'farmer__farm_location', 'created_at', 'price_per_unit', 'quantity')
+
+STATISTIC_FIELDS = [
+    'listings', 'total_quantity', 'min_price', 'max_price', 'mean_price',
+    'weighted_price', 'p25_price', 'median_price', 'p75_price',
+]
+
+# How often apply() reads the buckets again after losing a race to create one.
+CREATE_ATTEMPTS = 3
+
+
+_space_re = re.compile(r'\s+')
+
+
+def normalize(value):
+    return _space_re.sub(' ', (value or '').strip()).casefold()
+
+
+def contribution(product_name, farm_location, created_at, price, quantity):
+    """The (bucket key, price, quantity) a listing with these values adds."""
+    key = (normalize(product_name), normalize(farm_location), timezone.localdate(created_at))
+    return key, Decimal(price).quantize(CENT), Decimal(quantity).quantize(CENT)
+
+
+def listing_contribution(listing, farm_location=None):
+    if farm_location is None:
+        if ProductListing.farmer.is_cached(listing):
+            farm_location = listing.farmer.farm_location
+        else:
+            farm_location = (
+                FarmerProfile.objects.filter(pk=listing.farmer_id).values_list('farm_location', flat=True).first()
+            )
+    return contribution(
+        listing.product_name, farm_location, listing.created_at, listing.price_per_unit, listing.quantity
+    )
+
+
+def queryset_contributions(queryset):
+    """Contributions of every listing in ``queryset``, from one values query."""
+    return [contribution(*values) for values in queryset.values_list(*LISTING_FIELDS).iterator()]
+
+
+def _histogram_deltas(added, removed):
+    deltas = defaultdict(lambda: defaultdict(lambda: [0, Decimal(0)]))
+    for sign, contributions in ((1, added), (-1, removed)):
+        for key, price, quantity in contributions:
+            entry = deltas[key][str(price)]
+            entry[0] += sign
+            entry[1] += sign * quantity
+    return deltas
+
+
+def _merge(histogram, delta):
+    for price, (count, quantity) in delta.items():
+        current = histogram.get(price, [0, '0'])
+        count = current[0] + count
+        quantity = Decimal(current[1]) + quantity
+        if count:
+            histogram[price] = [count, str(quantity.quantize(CENT))]
+        else:
+            histogram.pop(price, None)
+    return histogram
+
+
+def apply(added=(), removed=(), using=None):
+    """Adjust the buckets touched by listings appearing (added) and disappearing (removed)."""
+    deltas = _histogram_deltas(added, removed)
+    for key in [key for key, delta in deltas.items() if not any(entry[0] or entry[1] for entry in delta.values())]:
+        del deltas[key]
+    if not deltas:
+        return
+    using = using or router.db_for_write(MarketPriceRollup)
+    lookup = Q()
+    for product_key, location_key, day in deltas:
+        lookup |= Q(product_key=product_key, location_key=location_key, day=day)
+    # No savepoint: a failure here has to abort the enclosing write anyway.
+    with transaction.atomic(using=using, savepoint=False):
+        for attempt in range(1, CREATE_ATTEMPTS + 1):
+            try:
+                _apply_deltas(deltas, lookup, using)
+                return
+            except IntegrityError:
+                # Another transaction created one of the buckets after we
+                # read them. Its row is visible (and lockable) now.
+                if attempt == CREATE_ATTEMPTS:
+                    raise
+
+
+def _locked_rollups(lookup, using):
+    return {
+        (rollup.product_key, rollup.location_key, rollup.day): rollup
+        for rollup in MarketPriceRollup.objects.using(using).select_for_update().filter(lookup)
+    }
+
+
+def _apply_deltas(deltas, lookup, using):
+    # select_for_update locks nothing for buckets that do not exist yet, so
+    # they are created first, in a savepoint: if that fails, nothing else
+    # has been written and apply() can start over.
+    existing = _locked_rollups(lookup, using)
+    created, updated, emptied = [], [], []
+    for key, delta in deltas.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            rollup = MarketPriceRollup(product_key=key[0], location_key=key[1], day=key[2], prices={})
+        histogram = _merge(dict(rollup.prices), delta)
+        if not histogram:
+            if rollup.pk is not None:
+                emptied.append(rollup.pk)
+            continue
+        set_statistics(rollup, histogram)
+        (updated if rollup.pk is not None else created).append(rollup)
+    if created:
+        with transaction.atomic(using=using):
+            MarketPriceRollup.objects.using(using).bulk_create(created)
+    if emptied:
+        MarketPriceRollup.objects.using(using).filter(pk__in=emptied).delete()
+    if updated:
+        now = timezone.now()
+        for rollup in updated:
+            rollup.updated_at = now
+        MarketPriceRollup.objects.using(using).bulk_update(updated, STATISTIC_FIELDS + ['prices', 'updated_at'])
+
+
+def statistics(histogram):
+    """Summary statistics of a {price: [listings, quantity]} histogram."""
+    entries = sorted((Decimal(price), count, Decimal(quantity)) for price, (count, quantity) in histogram.items())
+    listings = sum(count for _, count, _ in entries)
+    total_quantity = sum(quantity for _, _, quantity in entries)
+    price_sum = sum(price * count for price, count, _ in entries)
+    weighted_sum = sum(price * quantity for price, _, quantity in entries)
+    return {
+        'listings': listings,
+        'total_quantity': total_quantity.quantize(CENT),
+        'min_price': entries[0][0],
+        'max_price': entries[-1][0],
+        'mean_price': (price_sum / listings).quantize(CENT, ROUND_HALF_EVEN),
+        # Price per unit across all listed quantity; None when nothing is on offer.
+        'weighted_price': (weighted_sum / total_quantity).quantize(CENT, ROUND_HALF_EVEN) if total_quantity else None,
+        'p25_price': _percentile(entries, listings, 25),
+        'median_price': _percentile(entries, listings, 50),
+        'p75_price': _percentile(entries, listings, 75),
+    }
+
+
+def _percentile(entries, listings, percent):
+    # Nearest rank over the listings' prices.
+    rank = max(1, -(-percent * listings // 100))
+    seen = 0
+    for price, count, _ in entries:
+        seen += count
+        if seen >= rank:
+            return price
+    return entries[-1][0]
+
+
+def set_statistics(rollup, histogram):
+    rollup.prices = histogram
+    for field, value in statistics(histogram).items():
+        setattr(rollup, field, value)
+
+
+def merged_histogram(rollups):
+    histogram = {}
+    for rollup in rollups:
+        _merge(histogram, {price: [count, Decimal(quantity)] for price, (count, quantity) in rollup.prices.items()})
+    return histogram
+
+
+def rebuild(using='default', chunk_size=2000):
+    """Recompute every bucket from the listings. Returns the number of buckets."""
+    histograms = defaultdict(dict)
+    queryset = ProductListing.objects.using(using).values_list(*LISTING_FIELDS)
+    for values in queryset.iterator(chunk_size=chunk_size):
+        key, price, quantity = contribution(*values)
+        _merge(histograms[key], {str(price): [1, quantity]})
+    rollups = []
+    for (product_key, location_key, day), histogram in histograms.items():
+        rollup = MarketPriceRollup(product_key=product_key, location_key=location_key, day=day)
+        set_statistics(rollup, histogram)
+        rollups.append(rollup)
+    MarketPriceRollup.objects.using(using).all().delete()
+    MarketPriceRollup.objects.using(using).bulk_create(rollups, batch_size=chunk_size)
+    return len(rollups)
+
+
+def remove_listings(rows, using=None):
+    """Take out listings being deleted, given as LISTING_FIELDS value rows."""
+    apply(removed=[contribution(*values) for values in rows], using=using)
+
+
+def move_farm_listings(farmer, previous_location, using=None):
+    """Move a farm's listings to the buckets of its new location."""
+    if normalize(previous_location) == normalize(farmer.farm_location):
+        return
+    current = queryset_contributions(ProductListing.objects.using(using).filter(farmer=farmer))
+    previous = [
+        ((product_key, normalize(previous_location), day), price, quantity)
+        for (product_key, _, day), price, quantity in current
+    ]
+    apply(added=current, removed=previous, using=using)
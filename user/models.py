@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from shared.basemodel import BaseModel
+from shared import geo
 class CustomUser(AbstractUser):
     phone_number = models.CharField(max_length=15, blank=True, null=True)
 
@@ -15,11 +16,26 @@ class FarmerProfile(BaseModel):
     farm_image=models.URLField(blank=True,null=True)
     farm_description=models.TextField(blank=True,null=True)
     is_farmer = models.BooleanField(default=False)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    geohash = models.CharField(max_length=12, blank=True, null=True, db_index=True, editable=False)
 
 
     def __str__(self):
         return f"{self.farm_name} - {self.user.username}"
 
+    def compute_geohash(self):
+        if self.latitude is None or self.longitude is None:
+            return None
+        return geo.encode(float(self.latitude), float(self.longitude))
+
+    def save(self, *args, **kwargs):
+        self.geohash = self.compute_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+
 class BuyerProfile(BaseModel):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='buyer_profile')
     company_name = models.CharField(max_length=255)
@@ -43,4 +59,94 @@ class ProductListing(BaseModel):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.product_name} by {self.farmer.user.username}"
\ No newline at end of file
+        return f"{self.product_name} by {self.farmer.user.username}"
+
+
+class MarketPriceRollup(models.Model):
+    """
+    Daily price statistics for one product at one location, maintained
+    incrementally by user/market.py as listings change. ``prices`` holds
+    the underlying histogram ({price: [listings, quantity]}), from which
+    every other column is derived and which lets days be merged exactly.
+    """
+    id = models.BigAutoField(primary_key=True)
+    product_key = models.CharField(max_length=255)
+    location_key = models.CharField(max_length=255)
+    day = models.DateField()
+    listings = models.PositiveIntegerField(default=0)
+    total_quantity = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2)
+    mean_price = models.DecimalField(max_digits=10, decimal_places=2)
+    weighted_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    p25_price = models.DecimalField(max_digits=10, decimal_places=2)
+    median_price = models.DecimalField(max_digits=10, decimal_places=2)
+    p75_price = models.DecimalField(max_digits=10, decimal_places=2)
+    prices = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product_key', 'location_key', 'day'], name='market_price_rollup_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_key} @ {self.location_key} on {self.day}"
+
+
+class FeedEntry(models.Model):
+    """
+    One row per product listing with the farm and farmer columns the
+    marketplace feed shows, kept in step with its sources by user/feed.py
+    so a feed page is a single-table index scan. ``id`` is the listing's id.
+    """
+    id = models.UUIDField(primary_key=True, editable=False)
+    product_name = models.CharField(max_length=255)
+    price_per_unit = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    product_image = models.URLField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    farmer_id = models.UUIDField(db_index=True)
+    farm_name = models.CharField(max_length=255)
+    farm_location = models.CharField(max_length=255)
+    location_key = models.CharField(max_length=255)
+    farm_image = models.URLField(blank=True, null=True)
+    user_id = models.IntegerField(db_index=True)
+    username = models.CharField(max_length=150)
+
+    class Meta:
+        indexes = [
+            # One per feed ordering: newest and cheapest, overall and per location.
+            models.Index(fields=['-created_at', '-id'], name='feed_newest_idx'),
+            models.Index(fields=['price_per_unit', 'id'], name='feed_cheapest_idx'),
+            models.Index(fields=['location_key', '-created_at', '-id'], name='feed_location_newest_idx'),
+            models.Index(fields=['location_key', 'price_per_unit', 'id'], name='feed_location_cheapest_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_name} by {self.username}"
+
+
+class Tombstone(models.Model):
+    """
+    A deleted farmer profile or product listing, so delta sync
+    (user/sync.py) can tell clients to drop it. ``id`` is the deleted
+    row's id; prune_tombstones removes entries older than the sync window.
+    """
+    FARMER_PROFILE = 'farmer_profile'
+    PRODUCT = 'product'
+    KIND_CHOICES = [(FARMER_PROFILE, 'Farmer profile'), (PRODUCT, 'Product listing')]
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.id} deleted at {self.deleted_at}"
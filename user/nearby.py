@@ -0,0 +1,54 @@
+import heapq
+
+from django.db.models import Q
+
+from shared import geo
+from .models import FarmerProfile
+
+DEFAULT_RADIUS_KM = 30.0
+MAX_RADIUS_KM = 500.0
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def parse_nearby_params(query_params):
+    try:
+        latitude = float(query_params['lat'])
+        longitude = float(query_params['lon'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Query parameters 'lat' and 'lon' are required numbers.")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("'lat' must be within [-90, 90] and 'lon' within [-180, 180].")
+    try:
+        radius_km = float(query_params.get('radius_km', DEFAULT_RADIUS_KM))
+        limit = int(query_params.get('limit', DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise ValueError("'radius_km' and 'limit' must be numbers.")
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise ValueError(f"'radius_km' must be greater than 0 and at most {MAX_RADIUS_KM:g}.")
+    return latitude, longitude, radius_km, max(1, min(limit, MAX_LIMIT))
+
+
+def nearby_farm_distances(latitude, longitude, radius_km, limit):
+    """
+    The ``limit`` closest farms within ``radius_km``, as (distance_km, id)
+    pairs, nearest first.
+
+    Candidates come from indexed range scans over the geohash cells that
+    cover the search circle; only those are checked with the exact
+    great-circle distance.
+    """
+    condition = Q()
+    for cell in geo.covering_cells(latitude, longitude, radius_km):
+        # Every geohash starting with ``cell`` sorts between cell and cell + '{'
+        # ('{' follows 'z', the last geohash character), which the index can
+        # answer directly unlike LIKE 'cell%' on SQLite.
+        condition |= Q(geohash__gte=cell, geohash__lt=cell + '{')
+    candidates = FarmerProfile.objects.filter(condition).values_list('id', 'latitude', 'longitude')
+
+    hits = []
+    for pk, farm_latitude, farm_longitude in candidates.iterator():
+        distance = geo.haversine_km(latitude, longitude, float(farm_latitude), float(farm_longitude))
+        if distance <= radius_km:
+            hits.append((distance, pk))
+    return heapq.nsmallest(limit, hits)
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.db import transaction
+
+from shared.readthrough import ReadThroughCache, build_backend
+from .models import FarmerProfile
+
+# Serialized FarmerProfileByIDView payloads keyed by profile id. Entries are
+# dropped by the signal handlers in user/signals.py when the profile or its
+# user changes; with the default per-process backend the timeout bounds how
+# long other workers can serve a stale copy. BACKEND 'shared' stores entries
+# in the Django cache named by ALIAS instead.
+PROFILE_CACHE_SETTINGS = {
+    'BACKEND': 'local',
+    'ALIAS': 'default',
+    'MAX_ENTRIES': 10000,
+    'TIMEOUT': 300,
+    **getattr(settings, 'FARMER_PROFILE_CACHE', {}),
+}
+
+profile_cache = ReadThroughCache(build_backend(PROFILE_CACHE_SETTINGS, key_prefix='farmer-profile:'))
+
+
+def _profile_key(profile_id):
+    return str(profile_id)
+
+
+def load_profile_entry(profile_id):
+    # Imported here: user.signals imports this module during app loading,
+    # and the serializer/renderer stack is only needed once a request comes.
+    from shared.conditional import instance_validators
+    from shared.renderers import RawJSON
+    from shared.routers import PRIMARY
+    from .serializers import FarmerProfileDetailsSerializer
+
+    try:
+        # Always from the primary: the entry is served to every client for
+        # TIMEOUT, so a lagging replica's copy must never be stored.
+        profile = FarmerProfileDetailsSerializer.setup_queryset().using(PRIMARY).get(id=profile_id)
+    except FarmerProfile.DoesNotExist:
+        return None
+    etag, last_modified = instance_validators(profile.pk, [profile.updated_at])
+    return {
+        # Stored encoded, so hits skip both serialization and JSON encoding.
+        'data': RawJSON.from_data(FarmerProfileDetailsSerializer(profile).data),
+        'etag': etag,
+        'last_modified': last_modified,
+    }
+
+
+def get_profile_entry(profile_id):
+    """The cached payload and validators for a profile, or None if it does not exist."""
+    return profile_cache.get_or_load(_profile_key(profile_id), lambda: load_profile_entry(profile_id))
+
+
+def invalidate_profile(profile_id):
+    key = _profile_key(profile_id)
+    profile_cache.delete(key)
+    # Also drop anything cached between the write and the commit.
+    transaction.on_commit(lambda: profile_cache.delete(key))
+
+
+def invalidate_profile_of_user(user_id):
+    for profile_id in FarmerProfile.objects.filter(user_id=user_id).values_list('id', flat=True):
+        invalidate_profile(profile_id)
@@ -0,0 +1,247 @@
+import re
+import uuid
+
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import FarmerProfile, ProductListing
+
+# Full-text search over product listings and farms.
+#
+# On SQLite each searchable model gets an FTS5 table whose rowid comes from
+# user_search_doc, which maps (kind, object_id) to an integer so that updates
+# and deletes hit the FTS index by rowid instead of scanning it. Other
+# database vendors fall back to icontains filters.
+
+DOC_TABLE = 'user_search_doc'
+
+SEARCH_INDEXES = {
+    'products': {
+        'model': ProductListing,
+        'table': 'user_product_fts',
+        'columns': ('product_name', 'description'),
+    },
+    'farms': {
+        'model': FarmerProfile,
+        'table': 'user_farm_fts',
+        'columns': ('farm_name', 'farm_location', 'farm_description'),
+    },
+}
+
+MODEL_KINDS = {index['model']: kind for kind, index in SEARCH_INDEXES.items()}
+
+MAX_SEARCH_RESULTS = 1000
+
+_token_re = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_enabled(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def create_search_tables(using='default', drop=False):
+    if not fts_enabled(using):
+        return
+    with connections[using].cursor() as cursor:
+        if drop:
+            cursor.execute(f'DROP TABLE IF EXISTS {DOC_TABLE}')
+            for index in SEARCH_INDEXES.values():
+                cursor.execute(f"DROP TABLE IF EXISTS {index['table']}")
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {DOC_TABLE} ('
+            'rowid INTEGER PRIMARY KEY, kind TEXT NOT NULL, object_id CHAR(32) NOT NULL, '
+            'UNIQUE (kind, object_id))'
+        )
+        for index in SEARCH_INDEXES.values():
+            columns = ', '.join(index['columns'])
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {index['table']} USING fts5("
+                f"{columns}, tokenize='unicode61 remove_diacritics 2')"
+            )
+
+
+def _document_values(instance, columns):
+    return [getattr(instance, column) or '' for column in columns]
+
+
+def index_instance(instance, using=None):
+    kind = MODEL_KINDS[type(instance)]
+    using = using or router.db_for_write(type(instance))
+    if not fts_enabled(using):
+        return
+    index = SEARCH_INDEXES[kind]
+    values = _document_values(instance, index['columns'])
+    assignments = ', '.join(f'{column} = %s' for column in index['columns'])
+    placeholders = ', '.join(['%s'] * len(index['columns']))
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {DOC_TABLE} WHERE kind = %s AND object_id = %s',
+            [kind, instance.pk.hex],
+        )
+        row = cursor.fetchone()
+        if row:
+            cursor.execute(
+                f"UPDATE {index['table']} SET {assignments} WHERE rowid = %s",
+                values + [row[0]],
+            )
+        else:
+            cursor.execute(
+                f'INSERT INTO {DOC_TABLE} (kind, object_id) VALUES (%s, %s)',
+                [kind, instance.pk.hex],
+            )
+            cursor.execute(
+                f"INSERT INTO {index['table']} (rowid, {', '.join(index['columns'])}) "
+                f"VALUES (%s, {placeholders})",
+                [cursor.lastrowid] + values,
+            )
+
+
+def unindex_instance(instance, using=None):
+    unindex_ids(MODEL_KINDS[type(instance)], [instance.pk], using=using)
+
+
+def unindex_ids(kind, ids, using=None, chunk_size=500):
+    """Drop the documents of ``ids`` with one pair of deletes per chunk of ids."""
+    using = using or router.db_for_write(SEARCH_INDEXES[kind]['model'])
+    if not ids or not fts_enabled(using):
+        return
+    object_ids = [pk.hex for pk in ids]
+    with connections[using].cursor() as cursor:
+        for start in range(0, len(object_ids), chunk_size):
+            chunk = object_ids[start:start + chunk_size]
+            id_placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(
+                f"DELETE FROM {SEARCH_INDEXES[kind]['table']} WHERE rowid IN ("
+                f"SELECT rowid FROM {DOC_TABLE} WHERE kind = %s AND object_id IN ({id_placeholders}))",
+                [kind] + chunk,
+            )
+            cursor.execute(
+                f'DELETE FROM {DOC_TABLE} WHERE kind = %s AND object_id IN ({id_placeholders})',
+                [kind] + chunk,
+            )
+
+
+def index_instances(instances, using=None):
+    """Bulk counterpart of index_instance for rows written with bulk_create/bulk_update."""
+    instances = list(instances)
+    if not instances:
+        return
+    kind = MODEL_KINDS[type(instances[0])]
+    using = using or router.db_for_write(type(instances[0]))
+    if not fts_enabled(using):
+        return
+    index = SEARCH_INDEXES[kind]
+    columns = index['columns']
+    object_ids = [instance.pk.hex for instance in instances]
+    id_placeholders = ', '.join(['%s'] * len(object_ids))
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {index['table']} WHERE rowid IN ("
+            f"SELECT rowid FROM {DOC_TABLE} WHERE kind = %s AND object_id IN ({id_placeholders}))",
+            [kind] + object_ids,
+        )
+        cursor.execute(
+            f'DELETE FROM {DOC_TABLE} WHERE kind = %s AND object_id IN ({id_placeholders})',
+            [kind] + object_ids,
+        )
+        cursor.executemany(
+            f'INSERT INTO {DOC_TABLE} (kind, object_id) VALUES (%s, %s)',
+            [(kind, object_id) for object_id in object_ids],
+        )
+        cursor.execute(
+            f'SELECT object_id, rowid FROM {DOC_TABLE} WHERE kind = %s AND object_id IN ({id_placeholders})',
+            [kind] + object_ids,
+        )
+        rowids = dict(cursor.fetchall())
+        cursor.executemany(
+            f"INSERT INTO {index['table']} (rowid, {', '.join(columns)}) "
+            f"VALUES (%s, {', '.join(['%s'] * len(columns))})",
+            [[rowids[instance.pk.hex]] + _document_values(instance, columns) for instance in instances],
+        )
+
+
+def rebuild_index(kind, using='default', chunk_size=2000):
+    index = SEARCH_INDEXES[kind]
+    columns = index['columns']
+    queryset = index['model'].objects.using(using).only('id', *columns).order_by()
+    placeholders = ', '.join(['%s'] * len(columns))
+    total = 0
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {DOC_TABLE} WHERE kind = %s', [kind])
+        cursor.execute(f"DELETE FROM {index['table']}")
+        cursor.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {DOC_TABLE}')
+        next_rowid = cursor.fetchone()[0] + 1
+
+        batch = []
+        for instance in queryset.iterator(chunk_size=chunk_size):
+            batch.append((next_rowid, instance.pk.hex, _document_values(instance, columns)))
+            next_rowid += 1
+            if len(batch) >= chunk_size:
+                _write_batch(cursor, kind, index, placeholders, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            _write_batch(cursor, kind, index, placeholders, batch)
+            total += len(batch)
+        cursor.execute(f"INSERT INTO {index['table']} ({index['table']}) VALUES ('optimize')")
+    return total
+
+
+def _write_batch(cursor, kind, index, placeholders, batch):
+    cursor.executemany(
+        f'INSERT INTO {DOC_TABLE} (rowid, kind, object_id) VALUES (%s, %s, %s)',
+        [(rowid, kind, object_id) for rowid, object_id, _ in batch],
+    )
+    cursor.executemany(
+        f"INSERT INTO {index['table']} (rowid, {', '.join(index['columns'])}) VALUES (%s, {placeholders})",
+        [[rowid] + values for rowid, _, values in batch],
+    )
+
+
+def build_match_expression(query):
+    # Every word must match, each as a prefix, so "mai nak" finds
+    # "Maize from Nakuru". Quoting keeps user input out of FTS5 syntax.
+    tokens = _token_re.findall(query)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_ids(kind, query, offset=0, limit=20, using='default'):
+    """
+    Return up to ``limit`` object ids for ``kind`` ordered by relevance,
+    best match first, and whether more results follow.
+    """
+    index = SEARCH_INDEXES[kind]
+    limit = min(limit, MAX_SEARCH_RESULTS - offset)
+    if limit <= 0:
+        return [], False
+
+    if not fts_enabled(using):
+        return _fallback_search_ids(index, query, offset, limit, using)
+
+    expression = build_match_expression(query)
+    if not expression:
+        return [], False
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"SELECT doc.object_id FROM ("
+            f"SELECT rowid, rank FROM {index['table']} WHERE {index['table']} MATCH %s "
+            f"ORDER BY rank LIMIT %s OFFSET %s"
+            f") hits JOIN {DOC_TABLE} doc ON doc.rowid = hits.rowid ORDER BY hits.rank",
+            [expression, limit + 1, offset],
+        )
+        ids = [uuid.UUID(row[0]) for row in cursor.fetchall()]
+    return ids[:limit], len(ids) > limit and offset + limit < MAX_SEARCH_RESULTS
+
+
+def _fallback_search_ids(index, query, offset, limit, using):
+    queryset = index['model'].objects.using(using)
+    for token in _token_re.findall(query):
+        condition = Q()
+        for column in index['columns']:
+            condition |= Q(**{f'{column}__icontains': token})
+        queryset = queryset.filter(condition)
+    ids = list(queryset.order_by('-created_at', '-id').values_list('id', flat=True)[offset:offset + limit + 1])
+    return ids[:limit], len(ids) > limit
@@ -1,9 +1,11 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from .models import CustomUser,FarmerProfile,BuyerProfile,ProductListing
+from .models import CustomUser,FarmerProfile,BuyerProfile,ProductListing,FeedEntry
+from shared.metrics import SerializerTimingMixin
+from shared.serializers import QuerysetBuilderMixin
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(SerializerTimingMixin, QuerysetBuilderMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = [
@@ -15,7 +17,7 @@ class CustomUserSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'is_active']
 
-class RegistrationSerializer(serializers.ModelSerializer):
+class RegistrationSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True,min_length=8)
 
     class Meta:
@@ -36,7 +38,7 @@ class RegistrationSerializer(serializers.ModelSerializer):
         )
         return user
     
-class LoginSerializer(serializers.Serializer):
+class LoginSerializer(SerializerTimingMixin, serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
 
@@ -57,7 +59,7 @@ class LoginSerializer(serializers.Serializer):
         data['user'] = user
         return data
 
-class FarmerProfileCreateSerializer(serializers.ModelSerializer):
+class FarmerProfileCreateSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = FarmerProfile
 
@@ -67,9 +69,22 @@ class FarmerProfileCreateSerializer(serializers.ModelSerializer):
             'farm_size',
             'farm_image',
             'farm_description',
+            'latitude',
+            'longitude',
         ]
 
-class FarmerProfilesListSerializer(serializers.ModelSerializer):
+    def validate(self, data):
+        latitude = data.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = data.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError("Provide both 'latitude' and 'longitude', or neither.")
+        if latitude is not None and not -90 <= latitude <= 90:
+            raise serializers.ValidationError({'latitude': "Must be within [-90, 90]."})
+        if longitude is not None and not -180 <= longitude <= 180:
+            raise serializers.ValidationError({'longitude': "Must be within [-180, 180]."})
+        return data
+
+class FarmerProfilesListSerializer(SerializerTimingMixin, QuerysetBuilderMixin, serializers.ModelSerializer):
     
     class Meta:
         model = FarmerProfile
@@ -81,10 +96,15 @@ class FarmerProfilesListSerializer(serializers.ModelSerializer):
             'farm_size',
             'farm_image',
             'farm_description',
+            'latitude',
+            'longitude',
             'created_at',
             'updated_at',
         ]
-class FarmerProfileDetailsSerializer(serializers.ModelSerializer):
+        # Only sent when asked for with ?expand=user.
+        expandable_fields = {'user': CustomUserSerializer}
+
+class FarmerProfileDetailsSerializer(SerializerTimingMixin, QuerysetBuilderMixin, serializers.ModelSerializer):
     
     user = CustomUserSerializer(read_only=True)
     class Meta:
@@ -97,12 +117,14 @@ class FarmerProfileDetailsSerializer(serializers.ModelSerializer):
             'farm_location',
             'farm_size',
             'farm_image',
+            'latitude',
+            'longitude',
             'created_at',
             'updated_at',
         ]
         read_only_fields = ['id', 'user']
 
-class BuyerProfileCreateSerializer(serializers.ModelSerializer):
+class BuyerProfileCreateSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = BuyerProfile
 
@@ -113,7 +135,7 @@ class BuyerProfileCreateSerializer(serializers.ModelSerializer):
             'company_image',
         ]
 
-class BuyerProfilesListSerializer(serializers.ModelSerializer):
+class BuyerProfilesListSerializer(SerializerTimingMixin, QuerysetBuilderMixin, serializers.ModelSerializer):
     
     class Meta:
         model = BuyerProfile
@@ -127,7 +149,7 @@ class BuyerProfilesListSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
         ]
-class BuyerProfileDetailsSerializer(serializers.ModelSerializer):
+class BuyerProfileDetailsSerializer(SerializerTimingMixin, QuerysetBuilderMixin, serializers.ModelSerializer):
     
     user = CustomUserSerializer(read_only=True)
     class Meta:
@@ -143,7 +165,7 @@ class BuyerProfileDetailsSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'user']
 
-class ProductCreateSerializer(serializers.ModelSerializer):
+class ProductCreateSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductListing
 
@@ -154,7 +176,7 @@ class ProductCreateSerializer(serializers.ModelSerializer):
             'description',
             'product_image',
         ]
-class ProductDetailsSerializer(serializers.ModelSerializer):
+class ProductDetailsSerializer(SerializerTimingMixin, QuerysetBuilderMixin, serializers.ModelSerializer):
 
     farmer = FarmerProfileDetailsSerializer(read_only=True)
     class Meta:
@@ -172,7 +194,7 @@ class ProductDetailsSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'farmer']
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(SerializerTimingMixin, QuerysetBuilderMixin, serializers.ModelSerializer):
     
     class Meta:
         model = ProductListing
@@ -187,3 +209,32 @@ class ProductListSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
         ]
+        # Only sent when asked for with ?expand=farmer.
+        expandable_fields = {'farmer': FarmerProfilesListSerializer}
+
+class ProductSyncSerializer(ProductListSerializer):
+    """Listings as delta sync sends them: flat, with the farmer's id."""
+
+    class Meta(ProductListSerializer.Meta):
+        fields = ProductListSerializer.Meta.fields + ['farmer_id']
+        expandable_fields = {}
+
+
+class FeedEntrySerializer(SerializerTimingMixin, serializers.ModelSerializer):
+
+    class Meta:
+        model = FeedEntry
+
+        fields = [
+            'id',
+            'product_name',
+            'price_per_unit',
+            'quantity',
+            'product_image',
+            'created_at',
+            'farmer_id',
+            'farm_name',
+            'farm_location',
+            'farm_image',
+            'username',
+        ]
@@ -0,0 +1,158 @@
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import CustomUser, FarmerProfile, BuyerProfile, ProductListing, Tombstone
+from .deletions import claim_deleted_listings
+from .authentication import invalidate_user
+from .profile_cache import invalidate_profile, invalidate_profile_of_user
+from . import feed, market, search, sync
+
+
+@receiver(post_migrate)
+def create_search_tables(sender, using='default', **kwargs):
+    if sender.name == 'user':
+        search.create_search_tables(using=using)
+
+
+@receiver(post_save, sender=FarmerProfile)
+@receiver(post_save, sender=ProductListing)
+def update_search_index(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        search.index_instance(instance, using=using)
+
+
+@receiver(post_delete, sender=FarmerProfile)
+def remove_from_search_index(sender, instance, using=None, **kwargs):
+    # Listings are unindexed in batches by remove_deleted_listings.
+    search.unindex_instance(instance, using=using)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=FarmerProfile)
+@receiver(post_delete, sender=FarmerProfile)
+@receiver(post_save, sender=BuyerProfile)
+@receiver(post_delete, sender=BuyerProfile)
+def invalidate_cached_profile_owner(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=FarmerProfile)
+@receiver(post_delete, sender=FarmerProfile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    invalidate_profile(instance.pk)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_cached_profile_of_user(sender, instance, created=False, update_fields=None, using=None, **kwargs):
+    # The nested user is part of the cached payload. New users have no
+    # profile yet, and last_login is not rendered; deleting a user cascades
+    # to the profile, whose own post_delete drops the entry.
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    # CustomUser has no updated_at of its own, so the profile's stands in
+    # for it: ETag and Last-Modified of every payload nesting the user move.
+    FarmerProfile.objects.using(using).filter(user_id=instance.pk).update(updated_at=timezone.now())
+    invalidate_profile_of_user(instance.pk)
+
+
+ROLLUP_FIELDS = {'product_name', 'price_per_unit', 'quantity', 'farmer', 'farmer_id'}
+
+
+@receiver(pre_save, sender=ProductListing)
+def remember_price_contribution(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    # The listing's previous values, so post_save can move its contribution.
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not ROLLUP_FIELDS & set(update_fields):
+        return
+    row = ProductListing.objects.using(using).filter(pk=instance.pk).values_list(
+        'farmer_id', *market.LISTING_FIELDS
+    ).first()
+    instance._price_rollup_previous = (row[0], market.contribution(*row[1:])) if row else None
+
+
+@receiver(post_save, sender=ProductListing)
+def update_price_rollups(sender, instance, created=False, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    if created:
+        market.apply(added=[market.listing_contribution(instance)], using=using)
+        return
+    if '_price_rollup_previous' not in instance.__dict__:
+        return
+    previous = instance.__dict__.pop('_price_rollup_previous')
+    if previous is None:
+        market.apply(added=[market.listing_contribution(instance)], using=using)
+        return
+    farmer_id, contribution = previous
+    location = contribution[0][1] if farmer_id == instance.farmer_id else None
+    market.apply(
+        added=[market.listing_contribution(instance, location)], removed=[contribution], using=using
+    )
+
+
+@receiver(pre_save, sender=FarmerProfile)
+def remember_farm_location(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and 'farm_location' not in update_fields:
+        return
+    instance._price_rollup_location = FarmerProfile.objects.using(using).filter(
+        pk=instance.pk
+    ).values_list('farm_location', flat=True).first()
+
+
+@receiver(post_save, sender=FarmerProfile)
+def move_price_rollups(sender, instance, raw=False, using=None, **kwargs):
+    previous_location = instance.__dict__.pop('_price_rollup_location', None)
+    if not raw and previous_location is not None:
+        market.move_farm_listings(instance, previous_location, using=using)
+
+
+FEED_USER_FIELDS = {'username'}
+
+
+@receiver(post_save, sender=ProductListing)
+def update_feed_entry(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        feed.refresh_listing(instance, using=using)
+
+
+@receiver(post_save, sender=FarmerProfile)
+def update_feed_farm(sender, instance, created=False, raw=False, using=None, **kwargs):
+    # A new farm has no listings yet.
+    if not (raw or created):
+        feed.refresh_farm(instance, using=using)
+
+
+@receiver(post_save, sender=CustomUser)
+def update_feed_username(sender, instance, created=False, raw=False, using=None, update_fields=None, **kwargs):
+    if raw or created or (update_fields is not None and not FEED_USER_FIELDS & set(update_fields)):
+        return
+    feed.refresh_username(instance, using=using)
+
+
+@receiver(pre_delete, sender=ProductListing)
+def remove_deleted_listings(sender, instance, origin=None, using=None, **kwargs):
+    # Once per delete, for all the listings it removes (see user/deletions.py).
+    rows = claim_deleted_listings(
+        instance, origin, '_listing_deletions_pending', market.LISTING_FIELDS, using=using
+    )
+    if not rows:
+        return
+    ids = [pk for pk, *_ in rows]
+    search.unindex_ids('products', ids, using=using)
+    market.remove_listings([values for _, *values in rows], using=using)
+    feed.remove_entries(ids, using=using)
+    sync.record_deletions(Tombstone.PRODUCT, ids, using=using)
+
+
+@receiver(post_delete, sender=FarmerProfile)
+def record_deleted_profile(sender, instance, using=None, **kwargs):
+    sync.record_deletions(Tombstone.FARMER_PROFILE, [instance.pk], using=using)
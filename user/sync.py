@@ -0,0 +1,139 @@
+import json
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from shared.pagination import InvalidCursor
+from .models import Tombstone
+from .serializers import FarmerProfilesListSerializer, ProductSyncSerializer
+
+# Delta sync for offline clients.
+#
+# Farmer profiles, listings and tombstones (deleted rows) are read as one
+# stream ordered by (timestamp, stream, id): updated_at for the live rows,
+# deleted_at for tombstones. The cursor is the position of the last item
+# sent, so rows sharing a timestamp are split across pages without being
+# skipped or repeated. Each page costs one indexed range query per stream.
+#
+# Timestamps are taken when a row is saved, not when its transaction
+# commits, so rows newer than SETTLE_SECONDS are held back: a slower
+# transaction can still commit rows stamped before a page already sent.
+
+SYNC_SETTINGS = {
+    # How long a write may take to commit and still be picked up.
+    'SETTLE_SECONDS': 5,
+    # Tombstones are kept this long; older cursors need a full resync.
+    'TOMBSTONE_DAYS': 30,
+    **getattr(settings, 'DELTA_SYNC', {}),
+}
+
+# (response key, serializer or None for tombstones, timestamp field), in stream order.
+STREAMS = [
+    ('farmer_profiles', FarmerProfilesListSerializer, 'updated_at'),
+    ('products', ProductSyncSerializer, 'updated_at'),
+    ('deleted', None, 'deleted_at'),
+]
+
+NIL = uuid.UUID(int=0)
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def record_deletions(kind, ids, using=None):
+    now = timezone.now()
+    Tombstone.objects.using(using).bulk_create(
+        [Tombstone(id=pk, kind=kind, deleted_at=now) for pk in ids], ignore_conflicts=True
+    )
+
+
+def encode_cursor(position):
+    timestamp, stream, pk = position
+    payload = {'t': timestamp.isoformat(), 's': stream, 'i': str(pk)}
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    """The (timestamp, stream, id) a cursor points at, or None for no cursor."""
+    if not value:
+        return None
+    try:
+        payload = json.loads(urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+        timestamp = parse_datetime(payload['t'])
+        stream = int(payload['s'])
+        if timestamp is None or timezone.is_naive(timestamp) or not 0 <= stream <= len(STREAMS):
+            raise ValueError(value)
+        return timestamp, stream, uuid.UUID(payload['i'])
+    except (TypeError, ValueError, KeyError, AttributeError):
+        raise InvalidCursor("Invalid sync cursor.")
+
+
+def _after(field, stream, position):
+    timestamp, cursor_stream, pk = position
+    if stream > cursor_stream:
+        return Q(**{f'{field}__gte': timestamp})
+    if stream < cursor_stream:
+        return Q(**{f'{field}__gt': timestamp})
+    return Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'id__gt': pk})
+
+
+def _queryset(serializer, field):
+    if serializer is None:
+        return Tombstone.objects.all()
+    return serializer.setup_queryset(required=(field,))
+
+
+def changes(since, page_size, now=None):
+    """
+    The next page after the ``since`` position (None for a full sync):
+    {response key: rows}, the position to resume from, and whether more
+    changes are waiting.
+    """
+    now = now or timezone.now()
+    if since is not None and since[0] < now - timedelta(days=SYNC_SETTINGS['TOMBSTONE_DAYS']):
+        raise CursorExpired("The sync cursor is older than the deletion history; sync again without one.")
+    until = now - timedelta(seconds=SYNC_SETTINGS['SETTLE_SECONDS'])
+
+    items = []
+    for stream, (key, serializer, field) in enumerate(STREAMS):
+        if serializer is None and since is None:
+            # A client starting from scratch has nothing to delete.
+            continue
+        queryset = _queryset(serializer, field).filter(**{f'{field}__lte': until})
+        if since is not None:
+            queryset = queryset.filter(_after(field, stream, since))
+        for row in queryset.order_by(field, 'id')[:page_size + 1]:
+            items.append(((getattr(row, field), stream, row.pk), row))
+    items.sort(key=lambda item: item[0])
+
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    # A complete page leaves the client caught up to ``until`` in every stream.
+    position = items[-1][0] if has_more else (until, len(STREAMS), NIL)
+    if since is not None and position < since:
+        position = since
+
+    rows = {key: [] for key, _, _ in STREAMS}
+    for (_, stream, _), row in items:
+        rows[STREAMS[stream][0]].append(row)
+    return rows, position, has_more
+
+
+def serialize(rows):
+    data = {}
+    for key, serializer, _ in STREAMS:
+        if serializer is None:
+            data[key] = [
+                {'type': tombstone.kind, 'id': tombstone.pk, 'deleted_at': tombstone.deleted_at}
+                for tombstone in rows[key]
+            ]
+        else:
+            data[key] = serializer(rows[key], many=True).data
+    return data
@@ -1,3 +1,1818 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from base64 import urlsafe_b64encode
+from io import StringIO
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection, router
+from django.db.models.signals import post_init
+from django.db.utils import load_backend
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from unittest import mock
+from asgiref.sync import iscoroutinefunction
+from django.urls import get_resolver, resolve, reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import build_user, invalidate_user, load_user_state, user_cache
+from .export import accepts_gzip
+from .profile_cache import load_profile_entry, profile_cache
+from .models import BuyerProfile, CustomUser, FarmerProfile, FeedEntry, MarketPriceRollup, ProductListing, Tombstone
+from .serializers import (
+    FarmerProfileDetailsSerializer, FarmerProfilesListSerializer, ProductDetailsSerializer, ProductListSerializer,
+)
+from .tokens import BlacklistIndex, blacklist_index
+from . import feed, market, search, sync
+from farmbora import schema
+from shared import idempotency, metrics, routers
+from shared.lazy import LazyView, iter_lazy_views
+from shared.idempotency import IN_PROGRESS, MISMATCH, IdempotencyStore, idempotency_store
+from shared.lru import LRUCache
+from shared.pagination import InvalidCursor, KeysetPagination
+from shared.readthrough import ReadThroughCache, SharedCacheBackend
+from shared.renderers import EnvelopeJSONRenderer, RawJSON
+from shared.serializers import FieldSelection
+from shared.routers import PrimaryReplicaRouter, ReplicaRoutingMiddleware
+from shared.workers import BoundedPool, PoolSaturated
+from .urls import urlpatterns
+from .views import async_auth
+
+SEED_USERS = 300
+SEED_FARMERS = 200
+SEED_PRODUCTS_PER_FARMER = 5
+SEED_PASSWORD = 'harvest-season-2024'
+
+# Per-route budget: (max SQL queries, max wall time in milliseconds).
+# Every named route in user/urls.py must be listed here and exercised below.
+# Authenticated calls run with a warm auth cache, so they do not count the
+# user lookup.
+ENDPOINT_BUDGETS = {
+    'register': (2, 250),
+    'login': (2, 250),
+    'logout': (6, 250),
+    'token-refresh': (12, 250),
+    'register-async': (2, 250),
+    'login-async': (2, 250),
+    'farmer-profile-create': (4, 250),
+    # Includes reading the previous farm_location, which price rollups follow,
+    # and copying the farm's columns to its feed entries.
+    'farmer-profile-update': (6, 250),
+    'farmer-profile-detail': (1, 250),
+    'farmer-profile-by-id': (1, 250),
+    'farmer-profiles-list': (1, 250),
+    'farmer-profiles-nearby': (2, 250),
+    # One in_bulk query for up to MAX_BATCH_IDS ids, nested rows joined.
+    'farmer-profiles-batch': (1, 250),
+    # The same for any number of listings: one read of all of them for the
+    # derived data, two search-index deletes, two price-rollup statements,
+    # one feed delete and one tombstone insert, then the farm's own two
+    # search-index deletes and tombstone.
+    'farmer-profile-delete': (14, 250),
+    'products-list': (1, 250),
+    'product-by-id': (1, 250),
+    'products-nearby': (2, 250),
+    'products-batch': (1, 250),
+    # Two of them read and write the listing's price-rollup bucket, and two
+    # more hold a savepoint around creating it.
+    'product-create': (10, 250),
+    # The same for any batch size: reading the farm and the listings, then
+    # inside a savepoint one bulk write, five search-index statements (two
+    # on delete), up to two price-rollup statements (with a savepoint when
+    # a bucket is created) and one feed statement.
+    'products-bulk': (14, 500),
+    'search': (2, 250),
+    'farmer-profiles-export': (1, 500),
+    'products-export': (1, 500),
+    'market-prices': (1, 250),
+    'feed': (1, 250),
+    # One range query per stream: profiles, listings and tombstones.
+    'sync': (3, 250),
+}
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def api_client(user=None):
+    """An APIClient, signed in as ``user`` (if given) with a warm auth cache."""
+    client = APIClient()
+    if user is not None:
+        load_user_state(user.pk)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
+
+
+def create_farm(name, location='Nakuru', **fields):
+    user = CustomUser.objects.create(username=name)
+    return FarmerProfile.objects.create(
+        user=user, farm_name=name, farm_location=location, farm_size=Decimal('3.00'), **fields
+    )
+
+
+def create_listing(farmer, name='Maize', price='10.00', quantity='10.00'):
+    return ProductListing.objects.create(
+        farmer=farmer, product_name=name, price_per_unit=Decimal(price), quantity=Decimal(quantity)
+    )
+
+
+def rollup_snapshot():
+    return list(
+        MarketPriceRollup.objects.order_by('product_key', 'location_key', 'day')
+        .values_list('product_key', 'location_key', 'day', *market.STATISTIC_FIELDS, 'prices')
+    )
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class EndpointBudgetTests(TestCase):
+    """
+    Query and latency budgets for every route against a seeded database.
+    Behaviour is covered per feature by the test cases below.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        password = make_password(SEED_PASSWORD)
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'user{i}', email=f'user{i}@farmbora.test', password=password)
+            for i in range(SEED_USERS)
+        ])
+        users = list(CustomUser.objects.order_by('id'))
+        farmers = [
+            FarmerProfile(
+                user=user,
+                farm_name=f'Farm {i}',
+                farm_location=f'Nakuru {i % 20}',
+                farm_size=Decimal('12.50'),
+                farm_description='Mixed maize and bean smallholding.',
+                latitude=Decimal('-0.303') + Decimal(i % 40) / 100,
+                longitude=Decimal('36.080') + Decimal(i // 40) / 100,
+            )
+            for i, user in enumerate(users[:SEED_FARMERS])
+        ]
+        for farmer in farmers:
+            farmer.geohash = farmer.compute_geohash()
+        FarmerProfile.objects.bulk_create(farmers)
+        farmers = list(FarmerProfile.objects.all())
+        ProductListing.objects.bulk_create([
+            ProductListing(
+                farmer=farmer,
+                product_name=f'Maize grade {n}',
+                quantity=Decimal('100.00'),
+                price_per_unit=Decimal('45.00') + n,
+                description='Dry, sorted, bagged.',
+            )
+            for farmer in farmers
+            for n in range(SEED_PRODUCTS_PER_FARMER)
+        ])
+        call_command('rebuild_search_index', stdout=StringIO())
+        call_command('rebuild_price_rollups', stdout=StringIO())
+        call_command('rebuild_feed', stdout=StringIO())
+        cls.farmer_user = users[0]
+        cls.plain_user = users[SEED_FARMERS]
+        cls.farmer = FarmerProfile.objects.get(user=cls.farmer_user)
+        cls.product = ProductListing.objects.filter(farmer=cls.farmer).first()
+
+    def setUp(self):
+        user_cache.clear()
+        profile_cache.clear()
+        blacklist_index.reset()
+        # Budgets describe a worker whose blacklist filter is already loaded.
+        blacklist_index.might_contain('')
+
+    def assertWithinBudget(self, name, response_call, expected_status):
+        max_queries, max_ms = ENDPOINT_BUDGETS[name]
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = response_call()
+            if response.streaming:
+                response.streamed_content = body = b''.join(response.streaming_content)
+            else:
+                body = response.content
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.assertEqual(response.status_code, expected_status, f"{name}: {body[:500]!r}")
+        if len(queries) > max_queries:
+            statements = '\n'.join(f"  {q['time']}s  {q['sql']}" for q in queries.captured_queries)
+            self.fail(f"{name} ran {len(queries)} queries (budget {max_queries}):\n{statements}")
+        self.assertLessEqual(
+            elapsed_ms, max_ms,
+            f"{name} took {elapsed_ms:.1f}ms (budget {max_ms}ms)"
+        )
+        return response
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in urlpatterns if pattern.name}
+        self.assertEqual(names - set(ENDPOINT_BUDGETS), set(), "routes without a declared budget")
+        self.assertEqual(set(ENDPOINT_BUDGETS) - names, set(), "budgets for routes that no longer exist")
+
+    def test_register(self):
+        client = api_client()
+        self.assertWithinBudget('register', lambda: client.post(reverse('register'), {
+            'username': 'newfarmer',
+            'email': 'newfarmer@farmbora.test',
+            'password': SEED_PASSWORD,
+        }), 201)
+
+    def test_login(self):
+        client = api_client()
+        self.assertWithinBudget('login', lambda: client.post(reverse('login'), {
+            'username': self.farmer_user.username,
+            'password': SEED_PASSWORD,
+        }), 200)
+
+    def test_logout(self):
+        client = api_client()
+        refresh = str(RefreshToken.for_user(self.farmer_user))
+        self.assertWithinBudget('logout', lambda: client.post(reverse('logout'), {
+            'refresh_token': refresh,
+        }), 200)
+
+    def test_register_async(self):
+        client = api_client()
+        with mock.patch.object(async_auth, 'hashing_pool', BoundedPool(max_workers=0)):
+            self.assertWithinBudget('register-async', lambda: client.post(reverse('register-async'), {
+                'username': 'asyncfarmer',
+                'password': SEED_PASSWORD,
+            }, format='json'), 201)
+
+    def test_login_async(self):
+        client = api_client()
+        with mock.patch.object(async_auth, 'hashing_pool', BoundedPool(max_workers=0)):
+            self.assertWithinBudget('login-async', lambda: client.post(reverse('login-async'), {
+                'username': self.farmer_user.username,
+                'password': SEED_PASSWORD,
+            }, format='json'), 200)
+
+    def test_token_refresh(self):
+        client = api_client()
+        refresh = str(RefreshToken.for_user(self.farmer_user))
+        self.assertWithinBudget('token-refresh', lambda: client.post(reverse('token-refresh'), {
+            'refresh_token': refresh,
+        }), 200)
+
+    def test_farmer_profile_create(self):
+        client = api_client(self.plain_user)
+        self.assertWithinBudget('farmer-profile-create', lambda: client.post(reverse('farmer-profile-create'), {
+            'farm_name': 'Fresh Farm',
+            'farm_location': 'Eldoret',
+            'farm_size': '3.00',
+        }), 201)
+
+    def test_farmer_profile_update(self):
+        client = api_client(self.farmer_user)
+        self.assertWithinBudget('farmer-profile-update', lambda: client.patch(reverse('farmer-profile-update'), {
+            'farm_name': 'Renamed Farm',
+        }), 200)
+
+    def test_farmer_profile_detail(self):
+        client = api_client(self.farmer_user)
+        self.assertWithinBudget('farmer-profile-detail', lambda: client.get(reverse('farmer-profile-detail')), 200)
+
+    def test_farmer_profile_by_id(self):
+        client = api_client(self.plain_user)
+        url = reverse('farmer-profile-by-id', kwargs={'profile_id': self.farmer.id})
+        response = self.assertWithinBudget('farmer-profile-by-id', lambda: client.get(url), 200)
+        self.assertWithinBudget(
+            'farmer-profile-by-id', lambda: client.get(url, HTTP_IF_NONE_MATCH=response['ETag']), 304
+        )
+
+    def test_farmer_profiles_list(self):
+        client = api_client(self.plain_user)
+        url = reverse('farmer-profiles-list')
+        response = self.assertWithinBudget('farmer-profiles-list', lambda: client.get(url), 200)
+        cursor = response.json()['pagination']['next']
+        self.assertWithinBudget('farmer-profiles-list', lambda: client.get(url, {'cursor': cursor}), 200)
+        self.assertWithinBudget('farmer-profiles-list', lambda: client.get(
+            url, {'exclude': 'farm_description', 'expand': 'user', 'fields': 'id,user.username'}
+        ), 200)
+
+    def test_farmer_profile_delete(self):
+        client = api_client(self.farmer_user)
+        self.assertWithinBudget('farmer-profile-delete', lambda: client.delete(reverse('farmer-profile-delete')), 200)
+
+    def test_products_list(self):
+        client = api_client(self.plain_user)
+        url = reverse('products-list')
+        response = self.assertWithinBudget('products-list', lambda: client.get(url), 200)
+        cursor = response.json()['pagination']['next']
+        self.assertWithinBudget('products-list', lambda: client.get(url, {'cursor': cursor}), 200)
+        self.assertWithinBudget(
+            'products-list', lambda: client.get(url, HTTP_IF_NONE_MATCH=response['ETag']), 304
+        )
+        self.assertWithinBudget('products-list', lambda: client.get(
+            url, {'fields': 'product_name', 'expand': 'farmer', 'exclude': 'farmer.farm_description'}
+        ), 200)
+
+    def test_product_by_id(self):
+        client = api_client(self.plain_user)
+        url = reverse('product-by-id', kwargs={'product_id': self.product.id})
+        self.assertWithinBudget('product-by-id', lambda: client.get(url), 200)
+        self.assertWithinBudget('product-by-id', lambda: client.get(url, {'exclude': 'farmer,description'}), 200)
+
+    def test_market_prices(self):
+        client = api_client(self.plain_user)
+        self.assertWithinBudget('market-prices', lambda: client.get(
+            reverse('market-prices'), {'product': 'maize grade 1', 'location': 'Nakuru 3'}
+        ), 200)
+        self.assertWithinBudget('market-prices', lambda: client.get(
+            reverse('market-prices'), {'product': 'maize grade 1', 'days': 30}
+        ), 200)
+
+    def test_feed(self):
+        client = api_client(self.plain_user)
+        self.assertWithinBudget('feed', lambda: client.get(reverse('feed'), {'page_size': 5}), 200)
+        response = self.assertWithinBudget('feed', lambda: client.get(
+            reverse('feed'), {'sort': 'cheapest', 'location': 'nakuru 3', 'page_size': 10}
+        ), 200)
+        cursor = response.json()['pagination']['next']
+        self.assertWithinBudget('feed', lambda: client.get(
+            reverse('feed'), {'sort': 'cheapest', 'location': 'nakuru 3', 'page_size': 10, 'cursor': cursor}
+        ), 200)
+
+    @mock.patch.dict(sync.SYNC_SETTINGS, {'SETTLE_SECONDS': 0})
+    def test_sync(self):
+        client = api_client(self.plain_user)
+        response = self.assertWithinBudget('sync', lambda: client.get(reverse('sync'), {'page_size': 50}), 200)
+        since = response.json()['pagination']['next']
+        self.product.delete()
+        self.assertWithinBudget('sync', lambda: client.get(reverse('sync'), {'since': since, 'page_size': 500}), 200)
+
+    def test_batch_lookups(self):
+        client = api_client(self.plain_user)
+        profiles = [str(pk) for pk in FarmerProfile.objects.order_by('?').values_list('id', flat=True)[:50]]
+        self.assertWithinBudget('farmer-profiles-batch', lambda: client.get(
+            reverse('farmer-profiles-batch'), {'ids': ','.join(profiles)}
+        ), 200)
+        products = [str(pk) for pk in ProductListing.objects.order_by('?').values_list('id', flat=True)[:50]]
+        self.assertWithinBudget('products-batch', lambda: client.get(
+            reverse('products-batch'), {'ids': ','.join(products), 'fields': 'id,price_per_unit,farmer.farm_name'}
+        ), 200)
+
+    def test_search(self):
+        client = api_client(self.plain_user)
+        response = self.assertWithinBudget(
+            'search', lambda: client.get(reverse('search'), {'q': 'maiz grade', 'page_size': 10}), 200
+        )
+        cursor = response.json()['pagination']['next']
+        self.assertWithinBudget(
+            'search', lambda: client.get(reverse('search'), {'q': 'nakuru', 'type': 'farms', 'cursor': cursor}), 200
+        )
+
+    def test_farmer_profiles_nearby(self):
+        client = api_client(self.plain_user)
+        self.assertWithinBudget('farmer-profiles-nearby', lambda: client.get(
+            reverse('farmer-profiles-nearby'), {'lat': '-0.30', 'lon': '36.08', 'radius_km': 10}
+        ), 200)
+
+    def test_products_nearby(self):
+        client = api_client(self.plain_user)
+        self.assertWithinBudget('products-nearby', lambda: client.get(
+            reverse('products-nearby'), {'lat': '-0.30', 'lon': '36.08', 'radius_km': 5, 'limit': 20}
+        ), 200)
+
+    def test_farmer_profiles_export(self):
+        client = api_client(self.plain_user)
+        self.assertWithinBudget('farmer-profiles-export', lambda: client.get(reverse('farmer-profiles-export')), 200)
+
+    def test_products_export(self):
+        client = api_client(self.plain_user)
+        self.assertWithinBudget('products-export', lambda: client.get(
+            reverse('products-export'), {'output': 'csv', 'updated_since': '2000-01-01'},
+            HTTP_ACCEPT_ENCODING='gzip',
+        ), 200)
+
+    def test_product_create(self):
+        client = api_client(self.farmer_user)
+        self.assertWithinBudget('product-create', lambda: client.post(reverse('product-create'), {
+            'product_name': 'Sukuma wiki', 'quantity': '20.00', 'price_per_unit': '30.00',
+        }, format='json'), 201)
+
+    def test_products_bulk(self):
+        client = api_client(self.farmer_user)
+        items = [
+            {'product_name': f'Bulk beans {n}', 'quantity': '10.00', 'price_per_unit': '80.00'}
+            for n in range(50)
+        ]
+        response = self.assertWithinBudget(
+            'products-bulk', lambda: client.post(reverse('products-bulk'), items, format='json'), 201
+        )
+        created = [item['id'] for item in response.json()['data']]
+        updates = [{'id': pk, 'price_per_unit': '95.00'} for pk in created]
+        self.assertWithinBudget(
+            'products-bulk', lambda: client.patch(reverse('products-bulk'), updates, format='json'), 200
+        )
+        self.assertWithinBudget('products-bulk', lambda: client.delete(
+            reverse('products-bulk'), {'ids': created[:3]}, format='json'
+        ), 200)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AuthFlowTests(TestCase):
+
+    def setUp(self):
+        blacklist_index.reset()
+        self.user = CustomUser.objects.create_user('grower', password=SEED_PASSWORD)
+
+    def test_refresh_rotation_blacklists_the_old_token(self):
+        client = api_client()
+        refresh = str(RefreshToken.for_user(self.user))
+        self.assertEqual(client.post(reverse('token-refresh'), {'refresh_token': refresh}).status_code, 200)
+        self.assertEqual(client.post(reverse('token-refresh'), {'refresh_token': refresh}).status_code, 400)
+
+    def test_login_async_sheds_load_when_pool_is_full(self):
+        client = api_client()
+        with mock.patch.object(async_auth, 'hashing_pool', BoundedPool(max_workers=0, max_pending=0)):
+            response = client.post(reverse('login-async'), {
+                'username': 'grower',
+                'password': SEED_PASSWORD,
+            }, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class IdempotentCreateTests(TestCase):
+
+    def setUp(self):
+        idempotency_store.clear()
+
+    def test_register_replays_retries(self):
+        client = api_client()
+        payload = {'username': 'retrying', 'email': 'retrying@farmbora.test', 'password': SEED_PASSWORD}
+        first = client.post(reverse('register'), payload, HTTP_IDEMPOTENCY_KEY='signup-retrying')
+        self.assertEqual(first.status_code, 201)
+        with CaptureQueriesContext(connection) as queries:
+            retry = client.post(reverse('register'), payload, HTTP_IDEMPOTENCY_KEY='signup-retrying')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual((retry.status_code, retry.content), (201, first.content))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(CustomUser.objects.filter(username='retrying').count(), 1)
+
+        response = client.post(reverse('register'), {**payload, 'username': 'other'}, HTTP_IDEMPOTENCY_KEY='signup-retrying')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(client.post(reverse('register'), payload, HTTP_IDEMPOTENCY_KEY='').status_code, 400)
+
+    def test_register_async_replays_retries(self):
+        client = api_client()
+        payload = {'username': 'asyncretry', 'password': SEED_PASSWORD}
+        with mock.patch.object(async_auth, 'hashing_pool', BoundedPool(max_workers=0)):
+            first = client.post(reverse('register-async'), payload, format='json', HTTP_IDEMPOTENCY_KEY='async-signup')
+            with CaptureQueriesContext(connection) as queries:
+                retry = client.post(
+                    reverse('register-async'), payload, format='json', HTTP_IDEMPOTENCY_KEY='async-signup'
+                )
+            other = client.post(reverse('register-async'), {**payload, 'username': 'someoneelse'},
+                                format='json', HTTP_IDEMPOTENCY_KEY='async-signup')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual((retry.status_code, retry.content), (201, first.content))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(other.status_code, 422)
+
+    def test_product_create_replays_retries(self):
+        client = api_client(create_farm('wanjiru').user)
+        payload = {'product_name': 'Cassava', 'quantity': '5.00', 'price_per_unit': '25.00'}
+        first = client.post(reverse('product-create'), payload, format='json', HTTP_IDEMPOTENCY_KEY='cassava-1')
+        retry = client.post(reverse('product-create'), payload, format='json', HTTP_IDEMPOTENCY_KEY='cassava-1')
+        self.assertEqual((first.status_code, retry.status_code), (201, 201))
+        self.assertEqual(retry.json()['data']['id'], first.json()['data']['id'])
+        self.assertEqual(ProductListing.objects.filter(product_name='Cassava').count(), 1)
+        # Keys are per caller: another farmer's identical key is a new request.
+        other = api_client(create_farm('kiprop').user)
+        other.post(reverse('product-create'), payload, format='json', HTTP_IDEMPOTENCY_KEY='cassava-1')
+        self.assertEqual(ProductListing.objects.filter(product_name='Cassava').count(), 2)
+
+
+    def test_bulk_create_replays_retries(self):
+        client = api_client(create_farm('wanjiru').user)
+        items = [{'product_name': f'Sorghum {n}', 'quantity': '5.00', 'price_per_unit': '25.00'} for n in range(3)]
+        first = client.post(reverse('products-bulk'), items, format='json', HTTP_IDEMPOTENCY_KEY='sorghum-batch')
+        retry = client.post(reverse('products-bulk'), items, format='json', HTTP_IDEMPOTENCY_KEY='sorghum-batch')
+        self.assertEqual((first.status_code, retry.status_code), (201, 201))
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(ProductListing.objects.filter(product_name__startswith='Sorghum').count(), 3)
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        profile_cache.clear()
+        self.farmer = create_farm('wanjiru')
+        self.product = create_listing(self.farmer)
+        self.client = api_client(CustomUser.objects.create(username='buyer'))
+
+    def test_farmer_profile_validators(self):
+        url = reverse('farmer-profile-by-id', args=[self.farmer.pk])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.content), (304, b''))
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        self.farmer.farm_name = 'Renamed Farm'
+        self.farmer.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # The nested user has no updated_at; editing it still moves the validators.
+        etag = response['ETag']
+        product_url = reverse('product-by-id', args=[self.product.pk])
+        product_etag = self.client.get(product_url)['ETag']
+        self.farmer.user.username = 'renamed-farmer'
+        self.farmer.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['user']['username'], 'renamed-farmer')
+        self.assertEqual(self.client.get(product_url, HTTP_IF_NONE_MATCH=product_etag).status_code, 200)
+
+    def test_product_validators_follow_the_farmer(self):
+        url = reverse('product-by-id', args=[self.product.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        FarmerProfile.objects.filter(pk=self.farmer.pk).update(
+            updated_at=self.farmer.updated_at + timedelta(seconds=5)
+        )
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        detail = self.client.get(url, {'exclude': 'farmer,description'})
+        self.assertNotIn('farmer', detail.json()['data'])
+        self.assertEqual(self.client.get(
+            url, {'exclude': 'farmer,description'}, HTTP_IF_NONE_MATCH=detail['ETag']
+        ).status_code, 304)
+
+    def test_list_validators_cover_the_page(self):
+        for n in range(4):
+            create_listing(self.farmer, f'Beans {n}')
+        url = reverse('products-list')
+        first_page = self.client.get(url, {'page_size': 3})
+        etag = first_page['ETag']
+        self.assertEqual(self.client.get(url, {'page_size': 3}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        cursor = first_page.json()['pagination']['next']
+        response = self.client.get(url, {'page_size': 3, 'cursor': cursor}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        # Lists carry no Last-Modified: deletes cannot move a newest timestamp.
+        self.assertNotIn('Last-Modified', first_page)
+        ProductListing.objects.filter(pk=first_page.json()['data'][1]['id']).delete()
+        self.assertEqual(self.client.get(url, {'page_size': 3}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        farmer = create_farm('wanjiru')
+        for n in range(7):
+            create_listing(farmer, name=f'Crop {n}')
+        # Every row shares one timestamp, so only the id orders them.
+        ProductListing.objects.update(created_at=timezone.now())
+        self.expected = list(ProductListing.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def paginate(self, **params):
+        paginator = KeysetPagination()
+        request = Request(RequestFactory().get('/', params))
+        page = paginator.paginate_queryset(ProductListing.objects.all(), request)
+        return [listing.pk for listing in page], paginator.get_pagination_data()
+
+    def test_cursors_walk_tied_timestamps_in_both_directions(self):
+        pages, data = [], {'next': None}
+        params = {'page_size': 3}
+        while True:
+            ids, data = self.paginate(**params)
+            pages.append((ids, data))
+            if data['next'] is None:
+                break
+            params = {'page_size': 3, 'cursor': data['next']}
+        self.assertEqual([ids for ids, _ in pages], [self.expected[:3], self.expected[3:6], self.expected[6:]])
+        self.assertIsNone(pages[0][1]['previous'])
+
+        # Walking back from the last page yields the same pages.
+        ids, data = self.paginate(page_size=3, cursor=pages[-1][1]['previous'])
+        self.assertEqual(ids, self.expected[3:6])
+        self.assertEqual(data['next'], pages[1][1]['next'])
+        ids, data = self.paginate(page_size=3, cursor=data['previous'])
+        self.assertEqual(ids, self.expected[:3])
+        self.assertIsNone(data['previous'])
+        self.assertEqual(self.paginate(page_size=3, cursor=data['next'])[0], self.expected[3:6])
+
+    def test_bad_or_forged_cursors_are_rejected(self):
+        def encode(payload):
+            return urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+        forged = [
+            'not a cursor',
+            urlsafe_b64encode(b'\xff\xfe').decode(),
+            encode(['2024-01-01T00:00:00+00:00']),
+            encode({'c': '2024-01-01T00:00:00+00:00', 'r': 0}),
+            encode({'c': 'yesterday', 'i': str(self.expected[0]), 'r': 0}),
+            encode({'c': '2024-13-40T00:00:00+00:00', 'i': str(self.expected[0]), 'r': 0}),
+            encode({'c': '2024-01-01T00:00:00+00:00', 'i': 'not-a-uuid', 'r': 0}),
+            encode({'c': '2024-01-01T00:00:00+00:00', 'i': 7, 'r': 0}),
+        ]
+        for cursor in forged:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                self.paginate(cursor=cursor)
+
+        client = api_client(CustomUser.objects.create(username='buyer'))
+        response = client.get(reverse('products-list'), {'cursor': forged[0]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'Invalid pagination cursor.')
+
+    def test_page_size_is_clamped(self):
+        paginator = KeysetPagination()
+        for value, expected in [
+            ('2', 2), ('200', 200), ('201', 200), ('100000', 200),
+            ('0', paginator.page_size), ('-5', paginator.page_size), ('ten', paginator.page_size),
+            ('', paginator.page_size),
+        ]:
+            with self.subTest(page_size=value):
+                request = Request(RequestFactory().get('/', {'page_size': value}))
+                self.assertEqual(paginator.get_page_size(request), expected)
+        self.assertEqual(len(self.paginate(page_size=2)[0]), 2)
+        self.assertEqual(self.paginate(page_size=10000)[1]['page_size'], KeysetPagination.max_page_size)
+
+
+class SparseFieldsetTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.farmer = create_farm('wanjiru', farm_description='Tea and dairy.')
+        create_farm('kiprop')
+        self.product = create_listing(self.farmer)
+        self.client = api_client(CustomUser.objects.create(username='buyer'))
+
+    def test_lists_load_and_return_only_the_selected_fields(self):
+        url = reverse('farmer-profiles-list')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'farm_name,farm_image', 'page_size': 1})
+        self.assertEqual(set(response.json()['data'][0]), {'farm_name', 'farm_image'})
+        self.assertNotIn('farm_description', queries.captured_queries[-1]['sql'])
+        cursor = response.json()['pagination']['next']
+        response = self.client.get(url, {'fields': 'farm_name', 'cursor': cursor, 'page_size': 1})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(
+            url, {'exclude': 'farm_description', 'expand': 'user', 'fields': 'id,user.username'}
+        )
+        item = response.json()['data'][0]
+        self.assertEqual(set(item), {'id', 'user'})
+        self.assertEqual(set(item['user']), {'username'})
+
+        response = self.client.get(
+            reverse('products-list'),
+            {'fields': 'product_name', 'expand': 'farmer', 'exclude': 'farmer.farm_description'},
+        )
+        item = response.json()['data'][0]
+        self.assertEqual(set(item), {'product_name', 'farmer'})
+        self.assertNotIn('farm_description', item['farmer'])
+        self.assertIn('farm_name', item['farmer'])
+
+    def test_unknown_or_private_fields_are_rejected(self):
+        url = reverse('farmer-profiles-list')
+        response = self.client.get(url, {'fields': 'farm_name,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['message'])
+        self.assertEqual(self.client.get(url, {'fields': 'farm_name.id'}).status_code, 400)
+
+
+class QuerysetBuilderTests(TestCase):
+
+    def setUp(self):
+        for n in range(3):
+            farmer = create_farm(f'farmer{n}')
+            for m in range(3):
+                create_listing(farmer, name=f'Crop {m}')
+
+    def test_nested_rows_serialize_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = ProductDetailsSerializer(ProductDetailsSerializer.setup_queryset(), many=True).data
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(len(data), 9)
+        self.assertEqual(
+            sorted({(item['farmer']['farm_name'], item['farmer']['user']['username']) for item in data}),
+            [(f'farmer{n}', f'farmer{n}') for n in range(3)],
+        )
+        # Only the serialized columns are loaded.
+        self.assertNotIn('password', queries.captured_queries[0]['sql'])
+        self.assertNotIn('farm_description', queries.captured_queries[0]['sql'])
+
+    def test_expanded_rows_serialize_in_one_query(self):
+        selection = FieldSelection(fields=['product_name', 'farmer.farm_name', 'farmer.user.username'])
+        with self.assertNumQueries(1):
+            data = ProductListSerializer(
+                ProductListSerializer.setup_queryset(selection=selection), many=True, selection=selection
+            ).data
+        self.assertEqual(len(data), 9)
+        for item in data:
+            self.assertEqual(set(item), {'product_name', 'farmer'})
+            self.assertEqual(item['farmer']['user'], {'username': item['farmer']['farm_name']})
+
+
+class BatchLookupTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.farmers = [create_farm(f'farmer{n}') for n in range(4)]
+        self.products = [create_listing(farmer, price=f'{10 + n}.00') for n, farmer in enumerate(self.farmers)]
+        self.client = api_client(CustomUser.objects.create(username='buyer'))
+
+    def test_results_keep_the_requested_order(self):
+        profiles = [str(farmer.pk) for farmer in reversed(self.farmers)]
+        missing = str(uuid.uuid4())
+        ids = profiles[:2] + [missing, profiles[0]] + profiles[2:]
+        data = self.client.get(reverse('farmer-profiles-batch'), {'ids': ','.join(ids)}).json()['data']
+        self.assertEqual([profile['id'] for profile in data['results']], profiles)
+        self.assertEqual(data['missing'], [missing])
+        self.assertIn('username', data['results'][0]['user'])
+
+        products = [str(product.pk) for product in self.products[::-1]]
+        results = self.client.get(reverse('products-batch'), {
+            'ids': ','.join(products), 'fields': 'id,price_per_unit,farmer.farm_name'
+        }).json()['data']['results']
+        self.assertEqual([product['id'] for product in results], products)
+        self.assertEqual(set(results[0]), {'id', 'price_per_unit', 'farmer'})
+        self.assertEqual(set(results[0]['farmer']), {'farm_name'})
+
+    def test_bad_ids_are_rejected(self):
+        self.assertEqual(self.client.get(reverse('products-batch')).status_code, 400)
+        response = self.client.get(reverse('products-batch'), {'ids': f'{self.products[0].pk},nope'})
+        self.assertEqual((response.status_code, response.json()['errors']), (400, {'ids': ['nope']}))
+        too_many = ','.join(str(uuid.uuid4()) for _ in range(201))
+        self.assertEqual(self.client.get(reverse('farmer-profiles-batch'), {'ids': too_many}).status_code, 400)
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        nakuru = create_farm('wanjiru', 'Nakuru')
+        eldoret = create_farm('kiprop', 'Eldoret')
+        self.maize = [create_listing(farmer, f'Maize grade {n}') for farmer in (nakuru, eldoret) for n in range(2)]
+        create_listing(nakuru, 'Beans')
+        self.nakuru = nakuru
+        self.client = api_client(CustomUser.objects.create(username='buyer'))
+
+    def test_pages_through_matches(self):
+        url = reverse('search')
+        response = self.client.get(url, {'q': 'maiz grade', 'page_size': 3})
+        first = [item['id'] for item in response.json()['data']]
+        cursor = response.json()['pagination']['next']
+        response = self.client.get(url, {'q': 'maiz grade', 'page_size': 3, 'cursor': cursor})
+        second = [item['id'] for item in response.json()['data']]
+        self.assertEqual(sorted(first + second), sorted(str(listing.pk) for listing in self.maize))
+        self.assertIsNone(response.json()['pagination']['next'])
+
+        response = self.client.get(url, {'q': 'nakuru', 'type': 'farms'})
+        self.assertEqual([farm['id'] for farm in response.json()['data']], [str(self.nakuru.pk)])
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'q': 'maize', 'type': 'buyers'}).status_code, 400)
+
+
+    def test_deletes_leave_the_index(self):
+        self.maize[2].delete()
+        self.nakuru.delete()
+        remaining = set(search.search_ids('products', 'maize grade')[0])
+        self.assertEqual(remaining, {self.maize[3].pk})
+        self.assertEqual(search.search_ids('farms', 'nakuru')[0], [])
+
+
+class NearbyTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        for n, (latitude, longitude) in enumerate([('-0.300', '36.080'), ('-0.310', '36.090'), ('-0.500', '36.500')]):
+            farmer = create_farm(f'farmer{n}', latitude=Decimal(latitude), longitude=Decimal(longitude))
+            for price in ('10.00', '20.00'):
+                create_listing(farmer, price=price)
+        self.client = api_client(CustomUser.objects.create(username='buyer'))
+
+    def test_nearest_farm_first_within_the_radius(self):
+        response = self.client.get(
+            reverse('farmer-profiles-nearby'), {'lat': '-0.30', 'lon': '36.08', 'radius_km': 10}
+        )
+        distances = [item['distance_km'] for item in response.json()['data']]
+        self.assertEqual(len(distances), 2)
+        self.assertEqual(distances, sorted(distances))
+        self.assertLessEqual(max(distances), 10)
+
+        response = self.client.get(
+            reverse('products-nearby'), {'lat': '-0.30', 'lon': '36.08', 'radius_km': 10, 'limit': 3}
+        )
+        distances = [item['distance_km'] for item in response.json()['data']]
+        self.assertEqual(len(distances), 3)
+        self.assertEqual(distances, sorted(distances))
+
+
+    def test_products_are_ranked_and_limited_in_sql(self):
+        nearest = FarmerProfile.objects.get(user__username='farmer0')
+        for n in range(30):
+            create_listing(nearest, f'Kale {n}')
+        fetched = []
+
+        def count(sender, instance, **kwargs):
+            fetched.append(instance)
+
+        post_init.connect(count, sender=ProductListing)
+        try:
+            response = self.client.get(
+                reverse('products-nearby'), {'lat': '-0.30', 'lon': '36.08', 'radius_km': 10, 'limit': 5}
+            )
+        finally:
+            post_init.disconnect(count, sender=ProductListing)
+        self.assertEqual(len(fetched), 5)
+        self.assertEqual(
+            [item['id'] for item in response.json()['data']],
+            [str(pk) for pk in nearest.product_listings.order_by('-created_at', '-id').values_list('id', flat=True)[:5]],
+        )
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        for n in range(3):
+            farmer = create_farm(f'farmer{n}')
+            for price in ('10.00', '20.00'):
+                create_listing(farmer, price=price)
+        self.client = api_client(CustomUser.objects.create(username='buyer'))
+
+    def test_farmer_profiles_as_json_lines(self):
+        response = self.client.get(reverse('farmer-profiles-export'))
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(set(rows[0]), set(FarmerProfilesListSerializer.Meta.fields))
+
+    def test_products_as_gzipped_csv(self):
+        response = self.client.get(
+            reverse('products-export'), {'output': 'csv', 'updated_since': '2000-01-01'},
+            HTTP_ACCEPT_ENCODING='gzip',
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        rows = list(csv.DictReader(gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()))
+        self.assertEqual(len(rows), 6)
+
+
+    def test_gzip_follows_accept_encoding_q_values(self):
+        factory = RequestFactory()
+        for header, expected in [
+            ('gzip', True), ('deflate, gzip;q=0.5', True), ('GZIP; Q=1', True), ('x-gzip', True),
+            ('*', True), ('br;q=1, *;q=0.1', True), ('', False), ('br, deflate', False),
+            ('gzip;q=0', False), ('gzip; q=0.000', False), ('*;q=0', False), ('gzip;q=0, *', False),
+            ('gzip;q=high', False), ('identity, gzipped', False),
+        ]:
+            with self.subTest(header=header):
+                self.assertIs(accepts_gzip(factory.get('/', HTTP_ACCEPT_ENCODING=header)), expected)
+
+        response = self.client.get(reverse('products-export'), HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 6)
+
+
+class ProductBulkTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.farmer = create_farm('wanjiru')
+        self.product = create_listing(self.farmer, quantity='100.00')
+        self.other = create_listing(create_farm('kiprop'))
+        self.client = api_client(self.farmer.user)
+
+    def test_create_update_delete(self):
+        url = reverse('products-bulk')
+        items = [
+            {'product_name': f'Bulk beans {n}', 'quantity': '10.00', 'price_per_unit': '80.00'}
+            for n in range(5)
+        ]
+        response = self.client.post(url, items, format='json')
+        self.assertEqual(response.status_code, 201)
+        created = [item['id'] for item in response.json()['data']]
+        self.assertEqual(len(created), 5)
+        self.assertEqual(len(self.client.get(reverse('search'), {'q': 'bulk beans'}).json()['data']), 5)
+
+        updates = [{'id': pk, 'price_per_unit': '95.00'} for pk in created]
+        self.assertEqual(self.client.patch(url, updates, format='json').status_code, 200)
+        self.assertEqual(ProductListing.objects.filter(id__in=created, price_per_unit=Decimal('95.00')).count(), 5)
+        # Ids in any UUID spelling name the same listing.
+        response = self.client.patch(url, [
+            {'id': created[0].upper(), 'quantity': '7.00'},
+            {'id': created[1].replace('-', ''), 'quantity': '7.00'},
+        ], format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(ProductListing.objects.filter(id__in=created[:2], quantity=Decimal('7.00')).count(), 2)
+        # Naming a listing twice, in any spelling, is refused before anything is written.
+        response = self.client.patch(url, [
+            {'id': created[0], 'price_per_unit': '10.00'},
+            {'id': created[0].upper(), 'price_per_unit': '20.00'},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.delete(url, {'ids': [created[0], created[0]]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ProductListing.objects.filter(id__in=created, price_per_unit=Decimal('95.00')).count(), 5)
+
+        response = self.client.delete(url, {'ids': [created[0].upper(), *created[1:3]]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ProductListing.objects.filter(id__in=created).count(), 2)
+        incremental = rollup_snapshot()
+        call_command('rebuild_price_rollups', stdout=StringIO())
+        self.assertEqual(incremental, rollup_snapshot())
+        self.assertEqual(feed.check(), {'missing': [], 'orphaned': [], 'stale': []})
+
+    def test_rejects_the_whole_batch(self):
+        url = reverse('products-bulk')
+        before = ProductListing.objects.count()
+        response = self.client.post(url, [
+            {'product_name': 'Good', 'quantity': '1.00', 'price_per_unit': '1.00'},
+            {'product_name': 'Bad', 'quantity': 'lots', 'price_per_unit': '1.00'},
+        ], format='json')
+        self.assertEqual(response.status_code, 422)
+        errors = response.json()['errors']
+        self.assertEqual(errors[0], {})
+        self.assertIn('quantity', errors[1])
+        self.assertEqual(ProductListing.objects.count(), before)
+
+        response = self.client.patch(url, [
+            {'id': str(self.product.pk), 'quantity': '2.00'},
+            {'id': str(self.other.pk), 'quantity': '2.00'},
+        ], format='json')
+        self.assertEqual(response.status_code, 422)
+        self.assertIn('id', response.json()['errors'][1])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, Decimal('100.00'))
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.user = CustomUser.objects.create_user('cached', password=SEED_PASSWORD)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_warm_cache_skips_user_query(self):
+        self.client.get(reverse('farmer-profiles-list'))
+        # Only the page itself; no user lookup.
+        with self.assertNumQueries(1):
+            self.client.get(reverse('farmer-profiles-list'))
+
+    def test_deactivation_invalidates_cache(self):
+        self.assertEqual(self.client.get(reverse('farmer-profiles-list')).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('farmer-profiles-list')).status_code, 401)
+
+    def test_bulk_deactivation_needs_explicit_invalidation(self):
+        self.assertEqual(self.client.get(reverse('farmer-profiles-list')).status_code, 200)
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        # update() sends no signals, so the cached snapshot is still served.
+        self.assertEqual(self.client.get(reverse('farmer-profiles-list')).status_code, 200)
+        invalidate_user(self.user.pk)
+        self.assertEqual(self.client.get(reverse('farmer-profiles-list')).status_code, 401)
+
+    def test_cached_user_keeps_the_alias_it_was_read_from(self):
+        state = load_user_state(self.user.pk)
+        self.assertEqual(build_user(state)._state.db, 'default')
+        self.assertEqual(build_user({**state, 'db': 'replica1'})._state.db, 'replica1')
+
+    def test_profile_creation_invalidates_cache(self):
+        self.assertEqual(self.client.get(reverse('farmer-profile-detail')).status_code, 404)
+        FarmerProfile.objects.create(user=self.user, farm_name='Late Farm', farm_location='Kisumu', farm_size=1)
+        response = self.client.post(reverse('farmer-profile-create'), {
+            'farm_name': 'Second Farm', 'farm_location': 'Kisumu', 'farm_size': '1.00',
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class BlacklistIndexTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('revoker', password=SEED_PASSWORD)
+        self.index = BlacklistIndex(
+            sync_interval=0, rebuild_interval=3600, settle_seconds=5, min_capacity=100, error_rate=0.001
+        )
+
+    def blacklist(self, pk, jti):
+        token = OutstandingToken.objects.create(
+            user=self.user, jti=jti, token='', expires_at=timezone.now() + timedelta(days=1)
+        )
+        BlacklistedToken.objects.create(id=pk, token=token)
+
+    def test_sync_picks_up_ids_that_commit_out_of_order(self):
+        self.blacklist(10, 'settled')
+        self.assertTrue(self.index.might_contain('settled'))
+        # Id 12 commits while 11 is still in flight elsewhere.
+        self.blacklist(12, 'fast')
+        self.assertTrue(self.index.might_contain('fast'))
+        self.blacklist(11, 'slow')
+        self.assertTrue(self.index.might_contain('slow'))
+
+    def test_rebuild_looks_for_unsettled_ids(self):
+        self.blacklist(10, 'first')
+        self.blacklist(12, 'fast')
+        self.assertTrue(self.index.might_contain('fast'))
+        self.blacklist(11, 'slow')
+        self.assertTrue(self.index.might_contain('slow'))
+
+    def test_skipped_ids_are_given_up_after_settling(self):
+        self.blacklist(10, 'first')
+        self.blacklist(12, 'fast')
+        with mock.patch('user.tokens.time.monotonic', return_value=1000.0):
+            self.index.might_contain('')
+        self.assertIn(11, self.index._gaps)
+        with mock.patch('user.tokens.time.monotonic', return_value=1006.0):
+            self.index.might_contain('')
+        self.assertEqual(self.index._gaps, {})
+
+
+class BoundedPoolTests(SimpleTestCase):
+
+    def test_cancelled_callers_keep_their_slot_until_the_job_ends(self):
+        pool = BoundedPool(max_workers=1, max_pending=2)
+        started, release = threading.Event(), threading.Event()
+
+        def job():
+            started.set()
+            release.wait(5)
+            return 'done'
+
+        async def scenario():
+            running = asyncio.ensure_future(pool.run(job))
+            await asyncio.to_thread(started.wait, 5)
+            queued = asyncio.ensure_future(pool.run(job))
+            await asyncio.sleep(0)
+            # Both clients give up: the queued job is dropped, the running
+            # one keeps its slot until it returns.
+            running.cancel()
+            queued.cancel()
+            await asyncio.gather(running, queued, return_exceptions=True)
+            self.assertEqual(pool.pending, 1)
+            release.set()
+            self.assertEqual(await pool.run(lambda: 'next'), 'next')
+            for _ in range(100):
+                if pool.pending == 0:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(pool.pending, 0)
+
+        asyncio.run(scenario())
+
+    def test_saturated_pool_refuses_work(self):
+        pool = BoundedPool(max_workers=1, max_pending=1)
+        release = threading.Event()
+
+        async def scenario():
+            blocked = asyncio.ensure_future(pool.run(release.wait, 5))
+            await asyncio.sleep(0)
+            with self.assertRaises(PoolSaturated):
+                await pool.run(lambda: None)
+            blocked.cancel()
+            await asyncio.gather(blocked, return_exceptions=True)
+            with self.assertRaises(PoolSaturated):
+                await pool.run(lambda: None)
+            release.set()
+
+        asyncio.run(scenario())
+
+
+class ReadThroughCacheTests(SimpleTestCase):
+
+    def test_concurrent_misses_share_one_load(self):
+        cache = ReadThroughCache(LRUCache(max_entries=10, timeout=60))
+        calls = []
+        started = threading.Event()
+
+        def loader():
+            calls.append(1)
+            started.set()
+            time.sleep(0.05)
+            return {'value': 1}
+
+        threads = [threading.Thread(target=cache.get_or_load, args=('hot', loader)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get('hot'), {'value': 1})
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_shared_backend_clear_keeps_other_entries(self):
+        cache = caches['default']
+        cache.set('idempotency:key', 'kept')
+        backend = SharedCacheBackend('default', timeout=60, key_prefix='farmer-profile:')
+        backend.set('a', 1)
+        other = SharedCacheBackend('default', timeout=60, key_prefix='farmer-profile:')
+        self.assertEqual(other.get('a'), 1)
+        backend.clear()
+        self.assertIsNone(other.get('a'))
+        self.assertEqual(cache.get('idempotency:key'), 'kept')
+        # An evicted generation token reads as a clear.
+        backend.set('b', 2)
+        cache.delete('farmer-profile:generation')
+        self.assertIsNone(backend.get('b'))
+
+    def test_load_overlapping_delete_is_not_stored(self):
+        cache = ReadThroughCache(LRUCache(max_entries=10, timeout=60))
+
+        def loader():
+            cache.delete('key')
+            return 'stale'
+
+        self.assertEqual(cache.get_or_load('key', loader), 'stale')
+        self.assertIsNone(cache.get('key'))
+
+
+class IdempotencyStoreTests(SimpleTestCase):
+
+    def store(self, wait_timeout=5):
+        return IdempotencyStore(LRUCache(max_entries=10, timeout=60), wait_timeout=wait_timeout)
+
+    def test_duplicates_wait_for_the_first_result(self):
+        store = self.store()
+        self.assertIsNone(store.begin('key', 'fp'))
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(store.begin('key', 'fp')))
+        waiter.start()
+        time.sleep(0.05)
+        self.assertEqual(results, [])
+        store.finish('key', 'fp', 201, b'{}')
+        waiter.join(1)
+        self.assertEqual(results, [('fp', 201, b'{}')])
+        self.assertIs(store.begin('key', 'other'), MISMATCH)
+
+    def test_failing_backend_gives_up_at_the_deadline(self):
+        backend = mock.Mock(add=mock.Mock(return_value=False), get=mock.Mock(return_value=None))
+        store = IdempotencyStore(backend, wait_timeout=0.2, poll_interval=0.05)
+        started = time.monotonic()
+        self.assertIs(store.begin('key', 'fingerprint'), IN_PROGRESS)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertLess(backend.add.call_count, 10)
+
+    def test_fingerprints_are_keyed(self):
+        data = {'username': 'wanjiru', 'password': SEED_PASSWORD}
+        fingerprint = idempotency._fingerprint('POST', data)
+        payload = json.dumps(data, sort_keys=True, default=str)
+        self.assertNotEqual(
+            fingerprint, hashlib.blake2b(f'POST\0{payload}'.encode(), digest_size=16).hexdigest()
+        )
+        with override_settings(SECRET_KEY='another-secret-key-for-this-test-only-0123456789'):
+            self.assertNotEqual(idempotency._fingerprint('POST', data), fingerprint)
+
+    def test_unfinished_and_failed_requests(self):
+        store = self.store(wait_timeout=0.05)
+        self.assertIsNone(store.begin('key', 'fp'))
+        self.assertIs(store.begin('key', 'fp'), IN_PROGRESS)
+        # A failed request releases the key, so the retry runs.
+        store.finish('key', 'fp')
+        self.assertIsNone(store.begin('key', 'fp'))
+
+    def test_lru_add_only_sets_missing_or_expired_keys(self):
+        cache = LRUCache(max_entries=10, timeout=60)
+        self.assertTrue(cache.add('key', 1))
+        self.assertFalse(cache.add('key', 2))
+        self.assertEqual(cache.get('key'), 1)
+        self.assertTrue(cache.add('short', 1, timeout=0))
+        self.assertTrue(cache.add('short', 2))
+        self.assertEqual(cache.get('short'), 2)
+
+
+class EnvelopeJSONRendererTests(SimpleTestCase):
+
+    def test_matches_json_renderer(self):
+        farmer = FarmerProfile(
+            user=CustomUser(username='grower', email='grower@farmbora.test'),
+            farm_name='Shamba Boré',
+            farm_location='Eldoret\u2028West',
+            farm_size=Decimal('3.50'),
+            latitude=Decimal('0.514277'),
+            longitude=Decimal('35.269779'),
+            created_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        payloads = [
+            {'status': 'success', 'message': 'ok', 'data': FarmerProfileDetailsSerializer(farmer).data},
+            {'status': 'success', 'message': 'raw', 'data': {
+                'id': farmer.pk, 'price': Decimal('45.10'), 'at': farmer.created_at, 'day': farmer.created_at.date(),
+            }},
+            [1, 'two', None],
+        ]
+        for payload in payloads:
+            self.assertEqual(EnvelopeJSONRenderer().render(payload), JSONRenderer().render(payload))
+
+    def test_splices_raw_json(self):
+        data = {'id': 1, 'name': 'Maize'}
+        envelope = {'status': 'success', 'message': 'ok', 'data': RawJSON.from_data(data)}
+        rendered = EnvelopeJSONRenderer().render(envelope)
+        self.assertEqual(rendered, JSONRenderer().render({**envelope, 'data': data}))
+        page = {**envelope, 'pagination': {'next': None, 'page_size': 50}}
+        self.assertEqual(EnvelopeJSONRenderer().render(page), JSONRenderer().render({**page, 'data': data}))
+        self.assertEqual(EnvelopeJSONRenderer().render(RawJSON.from_data(data)), JSONRenderer().render(data))
+        indented = EnvelopeJSONRenderer().render(envelope, 'application/json; indent=2')
+        self.assertEqual(json.loads(indented)['data'], data)
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        metrics.registry.clear()
+        user_cache.clear()
+        user = CustomUser.objects.create_user('metrics', password=SEED_PASSWORD)
+        FarmerProfile.objects.create(user=user, farm_name='Metrics Farm', farm_location='Nakuru', farm_size=2)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def test_records_per_route(self):
+        self.client.get(reverse('farmer-profiles-list'))
+        self.client.get(reverse('farmer-profiles-list'))
+        body = self.client.get('/metrics').content.decode()
+        labels = 'route="farmer-profiles-list",method="GET"'
+        self.assertIn(f'farmbora_http_requests_total{{{labels},status="200"}} 2', body)
+        self.assertIn(f'farmbora_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', body)
+        # The user lookup on the first call plus the page on each.
+        self.assertIn(f'farmbora_db_queries_total{{{labels}}} 3', body)
+        serializer_seconds = re.search(rf'farmbora_serializer_seconds_total{{{labels}}} (\S+)', body)
+        self.assertGreater(float(serializer_seconds.group(1)), 0)
+
+    def test_scrapes_are_limited_to_allowed_addresses(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 403)
+
+    def test_scrapes_with_the_bearer_token(self):
+        client = APIClient(REMOTE_ADDR='203.0.113.7')
+        with mock.patch.dict(metrics.METRICS_SETTINGS, TOKEN='scrape-secret'):
+            self.assertEqual(client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret').status_code, 200)
+            self.assertEqual(client.get('/metrics', HTTP_AUTHORIZATION='Bearer guess').status_code, 403)
+
+    def test_sums_worker_snapshots(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry = metrics.MetricsRegistry(directory)
+            registry.record('login', 'POST', 200, 0.02, [2, 0.001, 0.0, False], 100)
+            other = metrics.MetricsRegistry()
+            other.record('login', 'POST', 200, 0.2, [3, 0.002, 0.0, False], 50)
+            with open(os.path.join(directory, 'metrics-1.json'), 'w') as snapshot:
+                json.dump(other.snapshot(), snapshot)
+            body = metrics.render_prometheus(registry.collect())
+        self.assertIn('farmbora_http_requests_total{route="login",method="POST",status="200"} 2', body)
+        self.assertIn('farmbora_db_queries_total{route="login",method="POST"} 5', body)
+        self.assertIn('farmbora_http_response_bytes_total{route="login",method="POST"} 150', body)
+
+
+class APISchemaTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'openapi.json')
+        patcher = mock.patch.dict(schema.API_SCHEMA_SETTINGS, {'FILE': self.path})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        schema._document = None
+        self.addCleanup(setattr, schema, '_document', None)
+
+    def test_serves_prebuilt_document(self):
+        call_command('build_api_schema', stdout=StringIO())
+        with open(self.path, 'rb') as artifact:
+            content = artifact.read()
+        response = self.client.get('/swagger.json')
+        self.assertEqual(response.content, content)
+        self.assertIn('/products/bulk/', json.loads(content)['paths'])
+        self.assertEqual(
+            self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304
+        )
+        compressed = self.client.get('/swagger.json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), content)
+
+    def test_rebuilds_stale_document(self):
+        with open(self.path, 'w') as artifact:
+            json.dump({schema.VERSION_KEY: 'previous-release', 'paths': {}}, artifact)
+        document = json.loads(self.client.get('/swagger.json').content)
+        self.assertEqual(document[schema.VERSION_KEY], schema.code_version())
+        self.assertTrue(document['paths'])
+        with open(self.path) as artifact:
+            self.assertEqual(json.load(artifact)[schema.VERSION_KEY], schema.code_version())
+
+
+class LazyViewTests(SimpleTestCase):
+
+    def test_imports_on_first_use(self):
+        view = LazyView('user.views.profiles.ProductListView')
+        self.assertFalse(hasattr(view, 'view_class'))
+        self.assertEqual(f'{view.__module__}.{view.__qualname__}', 'user.views.profiles.ProductListView')
+        self.assertFalse(view.loaded)
+        self.assertTrue(view.csrf_exempt)
+        self.assertTrue(view.loaded)
+        self.assertIs(view.view_class, view.cls)
+
+    def test_every_route_loads(self):
+        match = resolve(reverse('login-async'))
+        self.assertEqual(match._func_path, 'user.views.async_auth.AsyncLoginView')
+        for view in iter_lazy_views(get_resolver().url_patterns):
+            self.assertTrue(callable(view.load()), view)
+        self.assertTrue(iscoroutinefunction(match.func))
+
+
+class PrimaryReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter(replicas=['replica1'])
+        self.router._health['replica1'] = (time.monotonic(), True)
+
+    def route(self, model, pinned=False):
+        token = routers._request_state.set(routers._RequestState(pinned))
+        try:
+            return self.router.db_for_read(model)
+        finally:
+            routers._request_state.reset(token)
+
+    def test_safe_requests_read_listed_models_from_replicas(self):
+        self.assertEqual(self.route(ProductListing), 'replica1')
+        self.assertEqual(self.route(FarmerProfile), 'replica1')
+        self.assertEqual(self.route(CustomUser), 'default')
+        self.assertEqual(self.router.db_for_read(ProductListing), 'default')
+
+    def test_pinned_and_writing_requests_read_from_primary(self):
+        self.assertEqual(self.route(ProductListing, pinned=True), 'default')
+        state = routers._RequestState(False)
+        token = routers._request_state.set(state)
+        try:
+            self.assertEqual(self.router.db_for_write(ProductListing), 'default')
+            self.assertEqual(self.router.db_for_read(ProductListing), 'default')
+        finally:
+            routers._request_state.reset(token)
+        self.assertTrue(state.wrote)
+
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        self.router._health['replica1'] = (time.monotonic(), False)
+        self.assertEqual(self.route(ProductListing), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'user'))
+
+
+class FarmerProfileCacheTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        profile_cache.clear()
+
+    def test_entries_follow_the_profile_and_its_user(self):
+        farmer = create_farm('wanjiru')
+        client = api_client(CustomUser.objects.create(username='buyer'))
+        url = reverse('farmer-profile-by-id', args=[farmer.pk])
+        self.assertEqual(client.get(url).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get(url).status_code, 200)
+
+        farmer.user.email = 'renamed@farmbora.test'
+        farmer.user.save()
+        self.assertEqual(client.get(url).json()['data']['user']['email'], 'renamed@farmbora.test')
+
+        farmer.delete()
+        self.assertEqual(client.get(url).status_code, 404)
+
+    def test_cache_loads_read_the_primary(self):
+        profile = create_farm('Fresh')
+        # A replica alias that does not exist: any routed read would fail.
+        with mock.patch.object(router, 'db_for_read', return_value='lagging-replica'):
+            entry = load_profile_entry(profile.pk)
+        self.assertEqual(entry['data'].decode()['farm_name'], 'Fresh')
+
+
+class ReplicaRoutingMiddlewareTests(TestCase):
+
+    def middleware(self, view):
+        middleware = ReplicaRoutingMiddleware(view)
+        middleware.enabled = True
+        return middleware
+
+    def test_write_pins_client_to_primary(self):
+        def view(request):
+            CustomUser.objects.create(email='sticky@example.com', password='unused')
+            return JsonResponse({})
+
+        request = RequestFactory().post('/', HTTP_AUTHORIZATION='Bearer sticky')
+        response = self.middleware(view)(request)
+        cookie = response.cookies[routers.REPLICA_SETTINGS['COOKIE_NAME']]
+        self.assertEqual(cookie['max-age'], routers.REPLICA_SETTINGS['STICKY_SECONDS'])
+
+        seen = []
+
+        def reader(request):
+            seen.append(routers._request_state.get().pinned)
+            return JsonResponse({})
+
+        middleware = self.middleware(reader)
+        factory = RequestFactory()
+        with_cookie = factory.get('/')
+        with_cookie.COOKIES[cookie.key] = cookie.value
+        middleware(with_cookie)
+        middleware(factory.get('/', HTTP_AUTHORIZATION='Bearer sticky'))
+        middleware(factory.get('/', HTTP_AUTHORIZATION='Bearer other'))
+        self.assertEqual(seen, [True, True, False])
+
+
+class SQLiteProfileTests(SimpleTestCase):
+
+    def setUp(self):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+        self.settings_dict = {
+            **connection.settings_dict, 'ENGINE': 'shared.sqlite', 'NAME': path,
+            'OPTIONS': settings.SQLITE_PROFILE_OPTIONS,
+        }
+
+    def connect(self):
+        return load_backend('shared.sqlite').DatabaseWrapper(self.settings_dict, alias='sqlite-profile')
+
+    def test_pragmas(self):
+        wrapper = self.connect()
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone()[0], 1)
+            self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+            self.assertEqual(cursor.execute('PRAGMA mmap_size').fetchone()[0], 256 * 1024 * 1024)
+        self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+
+    def test_concurrent_writers_are_serialized(self):
+        setup = self.connect()
+        self.addCleanup(setup.close)
+        with setup.cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (n INTEGER)')
+            cursor.execute('INSERT INTO counter VALUES (0)')
+        self.assertFalse(setup.holds_writer)
+        errors = []
+
+        def write():
+            wrapper = self.connect()
+            try:
+                for _ in range(20):
+                    # What atomic() does on SQLite: BEGIN, work, COMMIT.
+                    wrapper.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+                    with wrapper.cursor() as cursor:
+                        value = cursor.execute('SELECT n FROM counter').fetchone()[0]
+                        cursor.execute('UPDATE counter SET n = %s', [value + 1])
+                    wrapper.commit()
+                    wrapper.set_autocommit(True)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                wrapper.close()
+
+        threads = [threading.Thread(target=write) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        with setup.cursor() as cursor:
+            self.assertEqual(cursor.execute('SELECT n FROM counter').fetchone()[0], 80)
+
+
+class MarketPriceRollupTests(TestCase):
+
+    def test_incremental_updates_match_full_rebuild(self):
+        nakuru = create_farm('wanjiru', 'Nakuru')
+        also_nakuru = create_farm('otieno', '  nakuru ')
+        eldoret = create_farm('kiprop', 'Eldoret')
+        listings = [
+            create_listing(farmer, name, price, quantity)
+            for farmer, name, price, quantity in [
+                (nakuru, 'Maize', '40.00', '100'),
+                (nakuru, 'maize ', '44.50', '20'),
+                (also_nakuru, 'MAIZE', '40.00', '5'),
+                (also_nakuru, 'Beans', '120.00', '30'),
+                (eldoret, 'Maize', '38.00', '250'),
+                (eldoret, 'Beans', '110.00', '0'),
+            ]
+        ]
+        maize = MarketPriceRollup.objects.get(product_key='maize', location_key='nakuru')
+        self.assertEqual(maize.listings, 3)
+        self.assertEqual((maize.min_price, maize.max_price), (Decimal('40.00'), Decimal('44.50')))
+        self.assertEqual(maize.median_price, Decimal('40.00'))
+        self.assertEqual(maize.weighted_price, Decimal('40.72'))
+
+        listings[0].price_per_unit = Decimal('42.00')
+        listings[0].save()
+        listings[1].product_name = 'Beans'
+        listings[1].save(update_fields=['product_name', 'updated_at'])
+        listings[2].description = 'Unchanged price'
+        listings[2].save(update_fields=['description'])
+        also_nakuru.farm_location = 'Eldoret'
+        also_nakuru.save()
+        listings[4].delete()
+        ProductListing.objects.filter(product_name='Beans', farmer=eldoret).delete()
+        create_listing(eldoret, 'Sorghum', '60.00', '10')
+        incremental = rollup_snapshot()
+
+        call_command('rebuild_price_rollups', stdout=StringIO())
+        self.assertEqual(incremental, rollup_snapshot())
+
+        nakuru.user.delete()
+        self.assertFalse(MarketPriceRollup.objects.filter(location_key='nakuru').exists())
+        incremental = rollup_snapshot()
+        call_command('rebuild_price_rollups', stdout=StringIO())
+        self.assertEqual(incremental, rollup_snapshot())
+
+
+    def test_concurrently_created_bucket_is_merged(self):
+        farmer = create_farm('wanjiru', 'Nakuru')
+        locked_rollups = market._locked_rollups
+        reads = []
+
+        def racing(lookup, using):
+            rows = locked_rollups(lookup, using)
+            if not reads:
+                # Another first listing commits the bucket after our read.
+                rival = MarketPriceRollup(product_key='maize', location_key='nakuru', day=timezone.localdate())
+                market.set_statistics(rival, {'12.00': [1, '5.00']})
+                rival.save()
+            reads.append(rows)
+            return rows
+
+        with mock.patch.object(market, '_locked_rollups', racing):
+            create_listing(farmer, 'Maize', '10.00')
+        self.assertEqual(len(reads), 2)
+        rollup = MarketPriceRollup.objects.get()
+        self.assertEqual(rollup.prices, {'10.00': [1, '10.00'], '12.00': [1, '5.00']})
+        self.assertEqual((rollup.listings, rollup.total_quantity), (2, Decimal('15.00')))
+
+    def test_market_prices_view(self):
+        nakuru, eldoret = create_farm('wanjiru', 'Nakuru'), create_farm('kiprop', 'Eldoret')
+        for farmer, price in [(nakuru, '40.00'), (nakuru, '46.00'), (nakuru, '50.00'), (eldoret, '38.00')]:
+            create_listing(farmer, 'Maize', price)
+        client = api_client(CustomUser.objects.create(username='buyer'))
+        url = reverse('market-prices')
+
+        data = client.get(url, {'product': ' MAIZE ', 'location': '  nakuru'}).json()['data']
+        self.assertEqual((data['product'], data['location']), ('maize', 'nakuru'))
+        self.assertEqual(data['summary']['listings'], 3)
+        self.assertEqual(data['summary']['median_price'], '46.00')
+        self.assertEqual(len(data['buckets']), 1)
+
+        data = client.get(url, {'product': 'maize', 'days': 30}).json()['data']
+        self.assertEqual(data['summary']['listings'], 4)
+        self.assertEqual({bucket['location'] for bucket in data['buckets']}, {'nakuru', 'eldoret'})
+        self.assertEqual(client.get(url).status_code, 400)
+        self.assertEqual(client.get(url, {'product': 'maize', 'days': 0}).status_code, 400)
+
+
+class FeedTests(TestCase):
+
+    def assertConsistent(self):
+        self.assertEqual(feed.check(), {'missing': [], 'orphaned': [], 'stale': []})
+
+    def test_entries_follow_their_sources(self):
+        wanjiru = create_farm('wanjiru', 'Nakuru')
+        kiprop = create_farm('kiprop', 'Eldoret')
+        maize = create_listing(wanjiru, 'Maize', '40.00')
+        create_listing(wanjiru, 'Beans', '120.00')
+        create_listing(kiprop, 'Maize', '38.00')
+        self.assertEqual(FeedEntry.objects.count(), 3)
+        self.assertConsistent()
+
+        maize.price_per_unit = Decimal('42.00')
+        maize.save()
+        self.assertEqual(FeedEntry.objects.get(pk=maize.pk).price_per_unit, Decimal('42.00'))
+        wanjiru.farm_name = 'Wanjiru Farm'
+        wanjiru.farm_location = ' NAIVASHA '
+        wanjiru.save()
+        self.assertEqual(
+            set(FeedEntry.objects.filter(farmer_id=wanjiru.pk).values_list('farm_name', 'location_key')),
+            {('Wanjiru Farm', 'naivasha')},
+        )
+        kiprop.user.username = 'kiprop2'
+        kiprop.user.save()
+        self.assertEqual(FeedEntry.objects.get(farmer_id=kiprop.pk).username, 'kiprop2')
+        self.assertConsistent()
+
+        maize.delete()
+        self.assertFalse(FeedEntry.objects.filter(pk=maize.pk).exists())
+        wanjiru.user.delete()
+        self.assertEqual(list(FeedEntry.objects.values_list('farmer_id', flat=True)), [kiprop.pk])
+        self.assertConsistent()
+
+    def test_feed_view_sorts_filters_and_pages(self):
+        nakuru, eldoret = create_farm('wanjiru', 'Nakuru'), create_farm('kiprop', 'Eldoret')
+        for price in ('30.00', '10.00', '20.00', '10.00', '40.00'):
+            create_listing(nakuru, 'Maize', price)
+        create_listing(eldoret, 'Maize', '5.00')
+        client = api_client(CustomUser.objects.create(username='buyer'))
+        url = reverse('feed')
+
+        newest = client.get(url, {'page_size': 3}).json()['data']
+        self.assertEqual([entry['created_at'] for entry in newest],
+                         sorted((entry['created_at'] for entry in newest), reverse=True))
+        self.assertEqual(newest[0]['username'], FeedEntry.objects.get(pk=newest[0]['id']).username)
+
+        response = client.get(url, {'sort': 'cheapest', 'location': ' NAKURU ', 'page_size': 3})
+        first_page = response.json()['data']
+        cursor = response.json()['pagination']['next']
+        response = client.get(url, {'sort': 'cheapest', 'location': 'nakuru', 'page_size': 3, 'cursor': cursor})
+        seen = [entry['id'] for entry in first_page + response.json()['data']]
+        self.assertEqual(seen, [
+            str(pk) for pk in FeedEntry.objects.filter(location_key='nakuru')
+            .order_by('price_per_unit', 'id').values_list('id', flat=True)
+        ])
+        self.assertEqual(client.get(url, {'sort': 'priciest'}).status_code, 400)
+        self.assertEqual(client.get(url, {'sort': 'cheapest', 'cursor': 'bogus'}).status_code, 400)
+
+    def test_rebuild_writes_one_chunk_at_a_time(self):
+        farmer = create_farm('akinyi', 'Kisumu')
+        for price in ('90.00', '95.00', '99.00', '80.00', '85.00'):
+            create_listing(farmer, 'Fish', price)
+        FeedEntry.objects.update(farm_name='Wrong')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(feed.rebuild(chunk_size=2), 5)
+        writes = [
+            query['sql'].split()[0] for query in queries.captured_queries
+            if 'user_feedentry' in query['sql'] and not query['sql'].startswith('SELECT')
+        ]
+        # The table is emptied first, then each chunk is inserted as it is read.
+        self.assertEqual(writes, ['DELETE', 'INSERT', 'INSERT', 'INSERT'])
+        self.assertConsistent()
+
+    def test_check_feed_reports_and_repairs(self):
+        farmer = create_farm('akinyi', 'Kisumu')
+        kept, removed, tampered = [create_listing(farmer, 'Fish', price) for price in ('90.00', '95.00', '99.00')]
+        FeedEntry.objects.filter(pk=removed.pk).delete()
+        FeedEntry.objects.filter(pk=tampered.pk).update(farm_name='Wrong')
+        orphan = FeedEntry.objects.get(pk=kept.pk)
+        orphan.pk = uuid.uuid4()
+        orphan.save()
+
+        with self.assertRaises(CommandError):
+            call_command('check_feed', stdout=StringIO())
+        out = StringIO()
+        call_command('check_feed', '--repair', stdout=out)
+        self.assertIn('1 missing, 1 orphaned, 1 stale', out.getvalue())
+        self.assertConsistent()
+        self.assertEqual(FeedEntry.objects.get(pk=tampered.pk).farm_name, 'akinyi')
+
+
+@mock.patch.dict(sync.SYNC_SETTINGS, {'SETTLE_SECONDS': 0})
+class DeltaSyncTests(TestCase):
+
+    def sync_all(self, since=None, page_size=2):
+        """Every page from ``since`` on: ({key: [ids]}, final cursor)."""
+        seen = {key: [] for key, _, _ in sync.STREAMS}
+        position = sync.decode_cursor(since)
+        while True:
+            rows, position, has_more = sync.changes(position, page_size)
+            for key, items in rows.items():
+                seen[key].extend(item.pk for item in items)
+            if not has_more:
+                return seen, sync.encode_cursor(position)
+
+    def test_pages_split_timestamp_ties_without_loss_or_repeats(self):
+        farmers = [create_farm(f'farmer{n}') for n in range(3)]
+        listings = [
+            ProductListing.objects.create(
+                farmer=farmer, product_name='Maize', quantity=Decimal('1.00'), price_per_unit=Decimal('1.00')
+            )
+            for farmer in farmers for _ in range(3)
+        ]
+        tie = timezone.now() - timedelta(minutes=1)
+        FarmerProfile.objects.update(updated_at=tie)
+        ProductListing.objects.update(updated_at=tie)
+
+        seen, cursor = self.sync_all()
+        self.assertEqual(sorted(seen['farmer_profiles']), sorted(farmer.pk for farmer in farmers))
+        self.assertEqual(sorted(seen['products']), sorted(listing.pk for listing in listings))
+        self.assertEqual(self.sync_all(cursor)[0], {key: [] for key, _, _ in sync.STREAMS})
+
+        listings[0].quantity = Decimal('5.00')
+        listings[0].save()
+        deleted = sorted([farmers[1].pk, *(listing.pk for listing in listings[3:6])])
+        farmers[1].delete()
+        seen, _ = self.sync_all(cursor)
+        self.assertEqual(seen['products'], [listings[0].pk])
+        self.assertEqual(sorted(seen['deleted']), deleted)
+        self.assertEqual(
+            set(Tombstone.objects.values_list('kind', flat=True)), {Tombstone.FARMER_PROFILE, Tombstone.PRODUCT}
+        )
+
+    def test_sync_view_reports_deletions(self):
+        listing = create_listing(create_farm('wanjiru'))
+        client = api_client(CustomUser.objects.create(username='buyer'))
+        body = client.get(reverse('sync')).json()
+        self.assertEqual(body['data']['deleted'], [])
+        self.assertEqual([item['id'] for item in body['data']['products']], [str(listing.pk)])
+
+        listing_id = str(listing.pk)
+        listing.delete()
+        body = client.get(reverse('sync'), {'since': body['pagination']['next']}).json()
+        self.assertEqual(
+            [(entry['type'], entry['id']) for entry in body['data']['deleted']], [('product', listing_id)]
+        )
+        self.assertEqual(client.get(reverse('sync'), {'since': 'bogus'}).status_code, 400)
+        self.assertEqual(client.get(reverse('sync'), {'page_size': 0}).status_code, 400)
+
+    def test_unsettled_writes_are_held_back(self):
+        create_farm('late')
+        with mock.patch.dict(sync.SYNC_SETTINGS, {'SETTLE_SECONDS': 60}):
+            rows, position, has_more = sync.changes(None, 10)
+        self.assertEqual(rows['farmer_profiles'], [])
+        rows, _, _ = sync.changes(position, 10)
+        self.assertEqual(len(rows['farmer_profiles']), 1)
+
+    def test_old_cursors_expire_with_their_tombstones(self):
+        old = timezone.now() - timedelta(days=sync.SYNC_SETTINGS['TOMBSTONE_DAYS'] + 1)
+        with self.assertRaises(sync.CursorExpired):
+            sync.changes((old, 0, sync.NIL), 10)
+        farmer = create_farm('gone')
+        farmer.delete()
+        Tombstone.objects.update(deleted_at=old)
+        call_command('prune_tombstones', stdout=StringIO())
+        self.assertFalse(Tombstone.objects.exists())
+
+
+@mock.patch.dict(sync.SYNC_SETTINGS, {'SETTLE_SECONDS': 0})
+class RekeyUUID7Tests(TestCase):
+
+    def test_rekeys_v4_rows_and_moves_every_foreign_key(self):
+        farmers = [create_farm(f'legacy{n}') for n in range(2)]
+        for n, farmer in enumerate(farmers):
+            for m in range(n + 2):
+                create_listing(farmer, name=f'Crop {m}')
+        buyer = BuyerProfile.objects.create(user=CustomUser.objects.create(username='buyer'))
+        # Give every row a random (v4) id, moving the listings along by hand.
+        old_ids = set()
+        for farmer in farmers:
+            old_id = uuid.uuid4()
+            FarmerProfile.objects.filter(pk=farmer.pk).update(id=old_id)
+            ProductListing.objects.filter(farmer_id=farmer.pk).update(farmer_id=old_id)
+            old_ids.add(old_id)
+        for model in (ProductListing, BuyerProfile):
+            for pk in model.objects.values_list('id', flat=True):
+                old_id = uuid.uuid4()
+                model.objects.filter(pk=pk).update(id=old_id)
+                old_ids.add(old_id)
+        listings_by_user = sorted(ProductListing.objects.values_list('farmer__user__username', 'product_name'))
+
+        call_command('rekey_uuid7', batch_size=2, stdout=StringIO())
+
+        for model in (FarmerProfile, BuyerProfile, ProductListing):
+            ids = set(model.objects.values_list('id', flat=True))
+            self.assertEqual({pk.version for pk in ids}, {7}, model)
+            self.assertFalse(ids & old_ids, model)
+        self.assertEqual(BuyerProfile.objects.get().user_id, buyer.user_id)
+        farmer_ids = set(FarmerProfile.objects.values_list('id', flat=True))
+        self.assertEqual(set(ProductListing.objects.values_list('farmer_id', flat=True)), farmer_ids)
+        self.assertEqual(
+            sorted(ProductListing.objects.values_list('farmer__user__username', 'product_name')), listings_by_user
+        )
+        self.assertEqual(
+            set(FeedEntry.objects.values_list('id', 'farmer_id')),
+            set(ProductListing.objects.values_list('id', 'farmer_id')),
+        )
+
+    def test_rekeyed_rows_reach_sync_clients(self):
+        user = CustomUser.objects.create(username='legacy')
+        farmer = FarmerProfile.objects.create(
+            user=user, farm_name='Legacy', farm_location='Nakuru', farm_size=Decimal('1.00')
+        )
+        listing = ProductListing.objects.create(
+            farmer=farmer, product_name='Millet', quantity=Decimal('1.00'), price_per_unit=Decimal('9.00')
+        )
+        old_farmer, old_listing = uuid.uuid4(), uuid.uuid4()
+        ProductListing.objects.filter(pk=listing.pk).update(id=old_listing)
+        FarmerProfile.objects.filter(pk=farmer.pk).update(id=old_farmer)
+        ProductListing.objects.filter(pk=old_listing).update(farmer_id=old_farmer)
+        _, cursor, _ = sync.changes(None, 100)
+
+        call_command('rekey_uuid7', stdout=StringIO())
+        new_farmer = FarmerProfile.objects.get(user=user).pk
+        new_listing = ProductListing.objects.get(farmer_id=new_farmer).pk
+        self.assertEqual((new_farmer.version, new_listing.version), (7, 7))
+
+        # Derived data follows the new ids.
+        self.assertEqual(feed.check(), {'missing': [], 'orphaned': [], 'stale': []})
+        self.assertEqual(search.search_ids('products', 'millet')[0], [new_listing])
+
+        rows, _, _ = sync.changes(cursor, 100)
+        self.assertEqual([profile.pk for profile in rows['farmer_profiles']], [new_farmer])
+        self.assertEqual([product.pk for product in rows['products']], [new_listing])
+        self.assertEqual(sorted(tombstone.pk for tombstone in rows['deleted']), sorted([old_farmer, old_listing]))
@@ -0,0 +1,140 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from shared.bloom import BloomFilter
+
+BLOOM_SETTINGS = {
+    # How often to pull tokens blacklisted by other processes, in seconds.
+    'SYNC_INTERVAL': 2,
+    # How often to rebuild from scratch so expired tokens fall out.
+    'REBUILD_INTERVAL': 3600,
+    # How long a blacklist write may take to commit and still be picked up.
+    'SETTLE_SECONDS': 5,
+    'MIN_CAPACITY': 10000,
+    'ERROR_RATE': 0.001,
+    **getattr(settings, 'TOKEN_BLACKLIST_BLOOM', {}),
+}
+
+
+class BlacklistIndex:
+    """
+    In-process Bloom filter of blacklisted refresh token JTIs.
+
+    A JTI the filter has never seen cannot be blacklisted, so the database
+    is only asked about possible hits. Tokens blacklisted in this process
+    are added immediately; tokens blacklisted by other processes are picked
+    up within SYNC_INTERVAL seconds by an indexed scan of new blacklist rows.
+
+    Ids are handed out at insert time, not at commit, so a row can become
+    visible after rows with higher ids. Ids skipped by a scan are looked up
+    again on every sync for SETTLE_SECONDS before they are given up as
+    rolled back.
+    """
+
+    def __init__(self, sync_interval, rebuild_interval, settle_seconds, min_capacity, error_rate):
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.settle_seconds = settle_seconds
+        self.min_capacity = min_capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._filter = None
+        self._last_id = 0
+        # Skipped id -> monotonic time after which it is no longer looked for.
+        self._gaps = {}
+        self._built_at = 0.0
+        self._synced_at = 0.0
+
+    def _rebuild(self, now):
+        current = timezone.now()
+        rows = list(
+            BlacklistedToken.objects
+            .filter(token__expires_at__gt=current)
+            .values_list('id', 'token__jti', 'blacklisted_at')
+        )
+        bloom = BloomFilter(max(self.min_capacity, 2 * len(rows)), self.error_rate)
+        for _, jti, _ in rows:
+            bloom.add(jti)
+        self._filter = bloom
+        self._gaps = {}
+        if rows:
+            # Only ids above the newest settled row can still be in flight.
+            settled = current - timedelta(seconds=self.settle_seconds)
+            floor = max((pk for pk, _, at in rows if at <= settled), default=min(pk for pk, _, _ in rows))
+            self._last_id = max(pk for pk, _, _ in rows)
+            self._track_gaps(floor, self._last_id, {pk for pk, _, _ in rows}, now)
+        else:
+            self._last_id = self._max_id()
+        self._built_at = self._synced_at = now
+
+    def _max_id(self):
+        return BlacklistedToken.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    def _sync(self, now):
+        self._gaps = {pk: deadline for pk, deadline in self._gaps.items() if deadline > now}
+        rows = BlacklistedToken.objects.filter(
+            Q(id__gt=self._last_id) | Q(id__in=list(self._gaps))
+        ).values_list('id', 'token__jti')
+        seen = set()
+        for pk, jti in rows:
+            self._filter.add(jti)
+            self._gaps.pop(pk, None)
+            seen.add(pk)
+        top = max(seen, default=self._last_id)
+        if top > self._last_id:
+            self._track_gaps(self._last_id, top, seen, now)
+            self._last_id = top
+        self._synced_at = now
+
+    def _track_gaps(self, after, upto, seen, now):
+        deadline = now + self.settle_seconds
+        for pk in range(after + 1, upto):
+            if pk not in seen:
+                self._gaps[pk] = deadline
+
+    def might_contain(self, jti):
+        now = time.monotonic()
+        with self._lock:
+            if self._filter is None or self._filter.is_saturated or now - self._built_at >= self.rebuild_interval:
+                self._rebuild(now)
+            elif now - self._synced_at >= self.sync_interval:
+                self._sync(now)
+            return jti in self._filter
+
+    def add(self, jti):
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+
+
+blacklist_index = BlacklistIndex(
+    sync_interval=BLOOM_SETTINGS['SYNC_INTERVAL'],
+    rebuild_interval=BLOOM_SETTINGS['REBUILD_INTERVAL'],
+    settle_seconds=BLOOM_SETTINGS['SETTLE_SECONDS'],
+    min_capacity=BLOOM_SETTINGS['MIN_CAPACITY'],
+    error_rate=BLOOM_SETTINGS['ERROR_RATE'],
+)
+
+
+class BloomRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check is fronted by blacklist_index."""
+
+    def check_blacklist(self):
+        if blacklist_index.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_index.add(self.payload[api_settings.JTI_CLAIM])
+        return result
@@ -1,27 +1,40 @@
 from django.urls import path
-from .views.auth import (
-    RegistrationView,
-    LoginView,
-    LogoutView,
-)
-from .views.profiles import (
-    FarmerProfileCreateView,
-    FarmerProfileUpdateView,
-    FarmerProfileDetailView,
-    FarmerProfilesListView,
-    FarmerProfileByIDView,
-    DeleteFarmerProfileView,
-)   
 
+from shared.lazy import LazyView
+
+# Views are imported on first request (or by farmbora.warmup under gunicorn
+# preload) rather than when the URLconf loads.
 urlpatterns = [
-    path('register/', RegistrationView.as_view(), name='register'),
-    path('login/', LoginView.as_view(), name='login'),
-    path('logout/', LogoutView.as_view(), name='logout'),
+    path('register/', LazyView('user.views.auth.RegistrationView'), name='register'),
+    path('login/', LazyView('user.views.auth.LoginView'), name='login'),
+    path('logout/', LazyView('user.views.auth.LogoutView'), name='logout'),
+    path('token/refresh/', LazyView('user.views.auth.RefreshTokenView'), name='token-refresh'),
+    path('async/register/', LazyView('user.views.async_auth.AsyncRegistrationView'), name='register-async'),
+    path('async/login/', LazyView('user.views.async_auth.AsyncLoginView'), name='login-async'),
     # farmer profile URLs
-    path('farmer/profile/create/', FarmerProfileCreateView.as_view(), name='farmer-profile-create'),
-    path('farmer/profile/update/', FarmerProfileUpdateView.as_view(), name='farmer-profile-update'),
-    path('farmer/profile/details/', FarmerProfileDetailView.as_view(), name='farmer-profile-detail'),
-    path('farmer/profile/<uuid:profile_id>/details/', FarmerProfileByIDView.as_view(), name='farmer-profile-by-id'),
-    path('farmer/profiles/list/', FarmerProfilesListView.as_view(), name='farmer-profiles-list'),
-    path('farmer/profile/delete/', DeleteFarmerProfileView.as_view(), name='farmer-profile-delete'),
+    path('farmer/profile/create/', LazyView('user.views.profiles.FarmerProfileCreateView'), name='farmer-profile-create'),
+    path('farmer/profile/update/', LazyView('user.views.profiles.FarmerProfileUpdateView'), name='farmer-profile-update'),
+    path('farmer/profile/details/', LazyView('user.views.profiles.FarmerProfileDetailView'), name='farmer-profile-detail'),
+    path('farmer/profile/<uuid:profile_id>/details/', LazyView('user.views.profiles.FarmerProfileByIDView'), name='farmer-profile-by-id'),
+    path('farmer/profiles/list/', LazyView('user.views.profiles.FarmerProfilesListView'), name='farmer-profiles-list'),
+    path('farmer/profiles/batch/', LazyView('user.views.profiles.FarmerProfilesBatchView'), name='farmer-profiles-batch'),
+    path('farmer/profiles/nearby/', LazyView('user.views.profiles.FarmerProfilesNearbyView'), name='farmer-profiles-nearby'),
+    path('farmer/profile/delete/', LazyView('user.views.profiles.DeleteFarmerProfileView'), name='farmer-profile-delete'),
+    # product listing URLs
+    path('products/list/', LazyView('user.views.profiles.ProductListView'), name='products-list'),
+    path('products/<uuid:product_id>/details/', LazyView('user.views.profiles.ProductByIDView'), name='product-by-id'),
+    path('products/batch/', LazyView('user.views.profiles.ProductsBatchView'), name='products-batch'),
+    path('products/nearby/', LazyView('user.views.profiles.ProductsNearbyView'), name='products-nearby'),
+    path('products/create/', LazyView('user.views.profiles.ProductCreateView'), name='product-create'),
+    path('products/bulk/', LazyView('user.views.profiles.ProductBulkView'), name='products-bulk'),
+    path('feed/', LazyView('user.views.feed.FeedView'), name='feed'),
+    # delta sync for offline clients
+    path('sync/', LazyView('user.views.sync.SyncView'), name='sync'),
+    # search
+    path('search/', LazyView('user.views.search.SearchView'), name='search'),
+    # market prices
+    path('market/prices/', LazyView('user.views.market.MarketPricesView'), name='market-prices'),
+    # bulk export
+    path('export/farmer-profiles/', LazyView('user.views.export.FarmerProfilesExportView'), name='farmer-profiles-export'),
+    path('export/products/', LazyView('user.views.export.ProductsExportView'), name='products-export'),
 ]
\ No newline at end of file
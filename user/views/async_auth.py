@@ -0,0 +1,121 @@
+import json
+
+from django.conf import settings
+from django.views import View
+from rest_framework import status
+
+from shared.idempotency import run_idempotent
+from shared.responses import (
+    handle_error,
+    handle_success,
+    handle_validation_error,
+    render_response,
+)
+from shared.workers import BoundedPool, PoolSaturated
+from ..serializers import CustomUserSerializer, LoginSerializer, RegistrationSerializer
+from ..tokens import BloomRefreshToken
+
+# Async counterparts of RegistrationView and LoginView. Served through
+# farmbora/asgi.py they keep the event loop free while PBKDF2 runs in a
+# bounded pool, and answer 503 with Retry-After once the pool's queue is full
+# instead of piling requests up behind a login burst.
+
+POOL_SETTINGS = {
+    'MAX_WORKERS': 4,
+    'MAX_PENDING': 64,
+    'RETRY_AFTER': 1,
+    **getattr(settings, 'AUTH_HASHING_POOL', {}),
+}
+
+hashing_pool = BoundedPool(
+    max_workers=POOL_SETTINGS['MAX_WORKERS'],
+    max_pending=POOL_SETTINGS['MAX_PENDING'],
+    name='auth-hashing',
+)
+
+
+def parse_body(request):
+    if request.content_type == 'application/json':
+        return json.loads(request.body or b'{}')
+    return request.POST
+
+
+def register_user(data):
+    serializer = RegistrationSerializer(data=data)
+    if serializer.is_valid():
+        user = serializer.save()
+        return handle_success(
+            data=CustomUserSerializer(user).data,
+            message="User registered successfully.",
+            status_code=status.HTTP_201_CREATED
+        )
+    return handle_validation_error(
+        errors=serializer.errors,
+        message="Validation failed.",
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
+    )
+
+
+def login_user(data):
+    serializer = LoginSerializer(data=data)
+    if serializer.is_valid():
+        refresh = BloomRefreshToken.for_user(serializer.validated_data['user'])
+        return handle_success(
+            data={
+                'refresh_token': str(refresh),
+                'access_token': str(refresh.access_token),
+            },
+            message="Login successful.",
+            status_code=status.HTTP_200_OK
+        )
+    return handle_validation_error(
+        errors=serializer.errors,
+        message="Validation failed.",
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
+    )
+
+
+class AsyncHashingView(View):
+    http_method_names = ['post']
+    handler = None
+    # Honour the Idempotency-Key header (see shared/idempotency.py).
+    idempotent = False
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def post(self, request):
+        try:
+            data = parse_body(request)
+        except ValueError:
+            return render_response(handle_error(
+                message="Request body is not valid JSON.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            ))
+        if self.idempotent:
+            return await run_idempotent(request, data, lambda: self.run_handler(data))
+        return await self.run_handler(data)
+
+    async def run_handler(self, data):
+        try:
+            response = await hashing_pool.run(self.handler, data)
+        except PoolSaturated:
+            response = render_response(handle_error(
+                message="Server is busy, please retry shortly.",
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+            ))
+            response['Retry-After'] = str(POOL_SETTINGS['RETRY_AFTER'])
+            return response
+        return render_response(response)
+
+
+class AsyncRegistrationView(AsyncHashingView):
+    handler = staticmethod(register_user)
+    idempotent = True
+
+
+class AsyncLoginView(AsyncHashingView):
+    handler = staticmethod(login_user)
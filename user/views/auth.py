@@ -4,9 +4,13 @@ from drf_yasg import openapi
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from ..serializers import RegistrationSerializer, LoginSerializer, CustomUserSerializer
+from ..tokens import BloomRefreshToken
+from ..authentication import get_cached_user
+from ..models import CustomUser
+from shared.idempotency import idempotent, idempotency_key_parameter
 from shared.responses import (
     handle_success,
     handle_error,
@@ -21,11 +25,14 @@ class RegistrationView(APIView):
     @swagger_auto_schema(
         tags=['Authentication'],
         request_body=RegistrationSerializer,
+        manual_parameters=[idempotency_key_parameter],
         responses={
             201: CustomUserSerializer,
-            400: 'Bad Request'
+            400: 'Bad Request',
+            409: 'A request with the same Idempotency-Key is in progress'
         }
     )
+    @idempotent
     def post(self, request):
         serializer = RegistrationSerializer(data=request.data)
         if serializer.is_valid():
@@ -58,7 +65,7 @@ class LoginView(APIView):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data['user']
-            refresh = RefreshToken.for_user(user)
+            refresh = BloomRefreshToken.for_user(user)
             return handle_success(
                 data={
                     'refresh_token': str(refresh),
@@ -96,7 +103,7 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data['refresh_token']
-            token = RefreshToken(refresh_token)
+            token = BloomRefreshToken(refresh_token)
             token.blacklist()
             
             return handle_success(
@@ -107,4 +114,60 @@ class LogoutView(APIView):
             return handle_error(
                 message="Invalid or expired token.",
                 status_code=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+
+class RefreshTokenView(APIView):
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        tags=['Authentication'],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'refresh_token': openapi.Schema(
+                    type=openapi.TYPE_STRING,
+                    description='Refresh token to exchange'
+                ),
+            },
+            required=['refresh_token'],
+        ),
+        responses={
+            200: 'Token Refreshed',
+            400: 'Bad Request',
+            401: 'Unauthorized'
+        }
+    )
+    def post(self, request):
+        try:
+            refresh = BloomRefreshToken(request.data['refresh_token'])
+        except (KeyError, TokenError):
+            return handle_error(
+                message="Invalid or expired token.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            user = get_cached_user(refresh.payload.get(jwt_settings.USER_ID_CLAIM))
+        except (CustomUser.DoesNotExist, ValueError):
+            user = None
+        if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            return handle_error(
+                message="No active account found for the given token.",
+                status_code=status.HTTP_401_UNAUTHORIZED
+            )
+
+        data = {'access_token': str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh_token'] = str(refresh)
+
+        return handle_success(
+            data=data,
+            message="Token refreshed successfully.",
+            status_code=status.HTTP_200_OK
+        )
@@ -0,0 +1,104 @@
+from django.http import StreamingHttpResponse
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated
+from ..serializers import FarmerProfilesListSerializer, ProductListSerializer
+from ..export import (
+    CONTENT_TYPES,
+    accepts_gzip,
+    export_queryset,
+    iter_csv,
+    iter_gzip,
+    iter_ndjson,
+    iter_rows,
+    parse_timestamp,
+)
+from shared.responses import handle_error
+
+export_parameters = [
+    openapi.Parameter('output', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(CONTENT_TYPES),
+                      description="Output format: ndjson (default) or csv."),
+    openapi.Parameter('updated_since', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                      description="Only rows with updated_at >= this ISO datetime or date."),
+    openapi.Parameter('updated_until', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                      description="Only rows with updated_at < this ISO datetime or date."),
+]
+
+
+class ExportView(APIView):
+    """
+    Streams every row of serializer_class's model, oldest update first, with
+    constant memory: rows come off a chunked iterator and are encoded and
+    (if the client accepts gzip) compressed as they are sent.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = None
+    filename = None
+
+    def get(self, request):
+        export_format = request.query_params.get('output', 'ndjson')
+        if export_format not in CONTENT_TYPES:
+            return handle_error(
+                message=f"Unknown export format '{export_format}'.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            bounds = {
+                name: parse_timestamp(request.query_params[name])
+                for name in ('updated_since', 'updated_until')
+                if request.query_params.get(name)
+            }
+        except ValueError:
+            return handle_error(
+                message="'updated_since' and 'updated_until' must be ISO dates or datetimes.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = export_queryset(self.serializer_class, **bounds)
+        rows = iter_rows(self.serializer_class, queryset)
+        if export_format == 'csv':
+            chunks = iter_csv(rows, self.serializer_class.Meta.fields)
+        else:
+            chunks = iter_ndjson(rows)
+
+        compress = accepts_gzip(request)
+        response = StreamingHttpResponse(
+            iter_gzip(chunks) if compress else chunks,
+            content_type=CONTENT_TYPES[export_format],
+        )
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        response['Vary'] = 'Accept-Encoding'
+        response['Content-Disposition'] = f'attachment; filename="{self.filename}.{export_format}"'
+        return response
+
+
+class FarmerProfilesExportView(ExportView):
+    serializer_class = FarmerProfilesListSerializer
+    filename = 'farmer-profiles'
+
+    @swagger_auto_schema(
+        tags=['Export'],
+        manual_parameters=export_parameters,
+        responses={200: 'Streamed NDJSON or CSV', 400: 'Bad Request'},
+        description="Stream all farmer profiles as NDJSON or CSV."
+    )
+    def get(self, request):
+        return super().get(request)
+
+
+class ProductsExportView(ExportView):
+    serializer_class = ProductListSerializer
+    filename = 'products'
+
+    @swagger_auto_schema(
+        tags=['Export'],
+        manual_parameters=export_parameters,
+        responses={200: 'Streamed NDJSON or CSV', 400: 'Bad Request'},
+        description="Stream all product listings as NDJSON or CSV."
+    )
+    def get(self, request):
+        return super().get(request)
@@ -0,0 +1,83 @@
+from decimal import Decimal
+
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated
+from ..models import FeedEntry
+from ..serializers import FeedEntrySerializer
+from .. import market
+from .profiles import pagination_parameters
+from shared.pagination import KeysetPagination, InvalidCursor
+from shared.responses import handle_error
+
+
+class CheapestFirstPagination(KeysetPagination):
+    key_field = 'price_per_unit'
+    descending = False
+
+    def encode_key(self, value):
+        return str(value)
+
+    def decode_key(self, value):
+        return Decimal(value)
+
+
+PAGINATORS = {
+    'newest': KeysetPagination,
+    'cheapest': CheapestFirstPagination,
+}
+
+
+class FeedView(APIView):
+    """
+    The marketplace feed, read from FeedEntry (user/feed.py): each page is
+    one query on one table, walking the index for the chosen ordering.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=['Products'],
+        manual_parameters=[
+            openapi.Parameter('sort', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(PAGINATORS),
+                              description="'newest' (default) or 'cheapest'."),
+            openapi.Parameter('location', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Farm location; case and spacing are ignored."),
+        ] + pagination_parameters,
+        responses={
+            200: FeedEntrySerializer(many=True),
+            400: 'Bad Request',
+            500: 'Internal Server Error'
+        },
+        description="Retrieve a page of the marketplace feed: listings with their farm and farmer."
+    )
+    def get(self, request):
+        sort = request.query_params.get('sort', 'newest')
+        if sort not in PAGINATORS:
+            return handle_error(
+                message=f"'sort' must be one of: {', '.join(PAGINATORS)}.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        paginator = PAGINATORS[sort]()
+        try:
+            queryset = FeedEntry.objects.all()
+            location = market.normalize(request.query_params.get('location'))
+            if location:
+                queryset = queryset.filter(location_key=location)
+            entries = paginator.paginate_queryset(queryset, request, view=self)
+            return paginator.get_paginated_response(
+                FeedEntrySerializer(entries, many=True).data,
+                message="Feed retrieved successfully."
+            )
+        except InvalidCursor as exc:
+            return handle_error(
+                message=str(exc),
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception:
+            return handle_error(
+                message="An error occurred while retrieving the feed.",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -0,0 +1,108 @@
+from datetime import date, timedelta
+
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated
+from django.utils import timezone
+from ..models import MarketPriceRollup
+from .. import market
+from shared.responses import (
+    handle_success,
+    handle_error,
+)
+
+DEFAULT_DAYS = 7
+MAX_DAYS = 90
+
+
+def format_statistics(values):
+    return {
+        field: value if field == 'listings' or value is None else str(value)
+        for field, value in values.items()
+    }
+
+
+class MarketPricesView(APIView):
+    """
+    Going prices for a product, read from the daily rollups in user/market.py:
+    one row per (day, location) bucket, so the cost depends on the window
+    and not on how many listings it covers.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=['Market'],
+        manual_parameters=[
+            openapi.Parameter('product', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True,
+                              description="Product name; case and spacing are ignored."),
+            openapi.Parameter('location', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Farm location; all locations when left out."),
+            openapi.Parameter('days', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description=f"Number of days up to 'until' (default {DEFAULT_DAYS}, max {MAX_DAYS})."),
+            openapi.Parameter('until', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
+                              description="Last day of the window (default today)."),
+        ],
+        responses={
+            200: 'Price summary and daily buckets',
+            400: 'Bad Request',
+            500: 'Internal Server Error'
+        },
+        description="Listing count, min/max/mean, quantity-weighted and percentile prices for a product."
+    )
+    def get(self, request):
+        product = market.normalize(request.query_params.get('product'))
+        location = market.normalize(request.query_params.get('location')) or None
+        if not product:
+            return handle_error(
+                message="Query parameter 'product' is required.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            days = int(request.query_params.get('days', DEFAULT_DAYS))
+            until = request.query_params.get('until')
+            until = date.fromisoformat(until) if until else timezone.localdate()
+        except ValueError:
+            return handle_error(
+                message="'days' must be an integer and 'until' a YYYY-MM-DD date.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= days <= MAX_DAYS:
+            return handle_error(
+                message=f"'days' must be between 1 and {MAX_DAYS}.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        since = until - timedelta(days=days - 1)
+
+        try:
+            rollups = MarketPriceRollup.objects.filter(product_key=product, day__range=(since, until))
+            if location is not None:
+                rollups = rollups.filter(location_key=location)
+            rollups = list(rollups.order_by('day', 'location_key'))
+            histogram = market.merged_histogram(rollups)
+            return handle_success(
+                data={
+                    'product': product,
+                    'location': location,
+                    'from': since,
+                    'to': until,
+                    'summary': format_statistics(market.statistics(histogram)) if histogram else None,
+                    'buckets': [
+                        {
+                            'day': rollup.day,
+                            'location': rollup.location_key,
+                            **format_statistics({field: getattr(rollup, field) for field in market.STATISTIC_FIELDS}),
+                        }
+                        for rollup in rollups
+                    ],
+                },
+                message="Market prices retrieved successfully.",
+                status_code=status.HTTP_200_OK
+            )
+        except Exception:
+            return handle_error(
+                message="An error occurred while retrieving market prices.",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -1,4 +1,6 @@
+import uuid
 from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
@@ -11,7 +13,25 @@ from ..serializers import (
     ProductListSerializer,
     ProductCreateSerializer
 )
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
 from ..models import FarmerProfile,ProductListing
+from .. import feed, market, search
+from shared.pagination import KeysetPagination, InvalidCursor
+from shared.serializers import FieldSelection, InvalidFieldSelection
+from shared.idempotency import idempotent, idempotency_key_parameter
+from shared.conditional import (
+    instance_validators,
+    instance_versions,
+    is_conditional,
+    page_validators,
+    not_modified,
+    object_versions,
+    set_validators,
+)
+from ..profile_cache import get_profile_entry
+from ..nearby import MAX_LIMIT, nearby_farm_distances, parse_nearby_params
 from shared.responses import (
     handle_success,
     handle_error,
@@ -19,6 +39,59 @@ from shared.responses import (
     handle_not_found,
 )
 
+MAX_BULK_ITEMS = 500
+MAX_BATCH_IDS = 200
+
+pagination_parameters = [
+    openapi.Parameter(
+        'cursor', openapi.IN_QUERY,
+        description="Opaque cursor returned as pagination.next or pagination.previous.",
+        type=openapi.TYPE_STRING,
+    ),
+    openapi.Parameter(
+        'page_size', openapi.IN_QUERY,
+        description="Number of results per page (max 200).",
+        type=openapi.TYPE_INTEGER,
+    ),
+]
+
+field_selection_parameters = [
+    openapi.Parameter(
+        'fields', openapi.IN_QUERY,
+        description="Comma-separated fields to return, dotted for nested ones (e.g. farm_name,user.username).",
+        type=openapi.TYPE_STRING,
+    ),
+    openapi.Parameter(
+        'exclude', openapi.IN_QUERY,
+        description="Comma-separated fields to leave out.",
+        type=openapi.TYPE_STRING,
+    ),
+    openapi.Parameter(
+        'expand', openapi.IN_QUERY,
+        description="Comma-separated related objects to include (user on farmer profiles, farmer on products).",
+        type=openapi.TYPE_STRING,
+    ),
+]
+
+batch_parameters = [
+    openapi.Parameter(
+        'ids', openapi.IN_QUERY, required=True,
+        description=f"Comma-separated ids (at most {MAX_BATCH_IDS}); results come back in this order.",
+        type=openapi.TYPE_STRING,
+    ),
+]
+
+nearby_parameters = [
+    openapi.Parameter('lat', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, required=True,
+                      description="Latitude of the search centre."),
+    openapi.Parameter('lon', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, required=True,
+                      description="Longitude of the search centre."),
+    openapi.Parameter('radius_km', openapi.IN_QUERY, type=openapi.TYPE_NUMBER,
+                      description="Search radius in kilometres (default 30, max 500)."),
+    openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                      description="Maximum number of results (default 50, max 200)."),
+]
+
 
 class FarmerProfileCreateView(APIView):
     
@@ -27,13 +100,16 @@ class FarmerProfileCreateView(APIView):
     @swagger_auto_schema(
         tags=['Profiles (Farmer)'],
         request_body=FarmerProfileCreateSerializer,
+        manual_parameters=[idempotency_key_parameter],
         responses={
             201: FarmerProfileDetailsSerializer,
             400: 'Bad Request',
+            409: 'A request with the same Idempotency-Key is in progress',
             500: 'Internal Server Error'
         },
         description="Create a farmer profile for the authenticated user."
     )
+    @idempotent
     def post(self, request):
         user=request.user
         if hasattr(user, 'farmer_profile'):
@@ -113,8 +189,11 @@ class FarmerProfileDetailView(APIView):
 
     @swagger_auto_schema(
         tags=['Profiles (Farmer)'],
+        manual_parameters=field_selection_parameters,
         responses={
             200: FarmerProfileDetailsSerializer,
+            304: 'Not Modified',
+            400: 'Bad Request',
             404: 'Not Found',
             500: 'Internal Server Error'
 
@@ -124,13 +203,30 @@ class FarmerProfileDetailView(APIView):
     def get(self, request):
         user = request.user
         try:
-            farmer_profile = user.farmer_profile
-            serializer = FarmerProfileDetailsSerializer(farmer_profile)
-            return  handle_success(
+            selection = FieldSelection.from_query_params(request.query_params)
+            FarmerProfileDetailsSerializer.plan(selection)
+        except InvalidFieldSelection as exc:
+            return handle_error(
+                message=str(exc),
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        if is_conditional(request):
+            versions = instance_versions(FarmerProfile.objects.filter(user=user), ['id', 'updated_at'])
+            if versions is not None:
+                response = not_modified(request, *instance_validators(versions[0], versions[1:]))
+                if response is not None:
+                    return response
+        try:
+            farmer_profile = FarmerProfileDetailsSerializer.setup_queryset(selection=selection).get(user=user)
+            serializer = FarmerProfileDetailsSerializer(farmer_profile, selection=selection)
+            response = handle_success(
                 data=serializer.data,
                 message="Farmer profile retrieved successfully.",
                 status_code=status.HTTP_200_OK
             )
+            return set_validators(
+                response, *instance_validators(farmer_profile.pk, [farmer_profile.updated_at])
+            )
         except FarmerProfile.DoesNotExist:
             return handle_not_found(
                 message="Farmer profile not found.",
@@ -146,6 +242,7 @@ class FarmerProfileByIDView(APIView):
         tags=['Profiles (Farmer)'],
         responses={
             200: FarmerProfileDetailsSerializer,
+            304: 'Not Modified',
             404: 'Not Found',
             500: 'Internal Server Error'
         },
@@ -153,18 +250,22 @@ class FarmerProfileByIDView(APIView):
     )
     def get(self, request, profile_id):
         try:
-            farmer_profile = FarmerProfile.objects.get(id=profile_id)
-            serializer = FarmerProfileDetailsSerializer(farmer_profile)
-            return handle_success(
-                data=serializer.data,
+            # Served from profile_cache: a warm hit runs no SQL at all.
+            entry = get_profile_entry(profile_id)
+            if entry is None:
+                return handle_not_found(
+                    message="Farmer profile not found.",
+                    status_code=status.HTTP_404_NOT_FOUND
+                )
+            response = not_modified(request, entry['etag'], entry['last_modified'])
+            if response is not None:
+                return response
+            response = handle_success(
+                data=entry['data'],
                 message="Farmer profile retrieved successfully.",
                 status_code=status.HTTP_200_OK
             )
-        except FarmerProfile.DoesNotExist:
-            return handle_not_found(
-                message="Farmer profile not found.",
-                status_code=status.HTTP_404_NOT_FOUND
-            )
+            return set_validators(response, entry['etag'], entry['last_modified'])
         except Exception:
             return handle_error(
                 message="An error occurred while retrieving the farmer profile.",
@@ -176,25 +277,90 @@ class FarmerProfilesListView(APIView):
 
     @swagger_auto_schema(
         tags=['Profiles (Farmer)'],
+        manual_parameters=pagination_parameters + field_selection_parameters,
         responses={
             200: FarmerProfilesListSerializer(many=True),
+            304: 'Not Modified',
+            400: 'Bad Request',
             404: 'Not Found',
             500: 'Internal Server Error'
         },
-        description="Retrieve a list of all farmer profiles."
+        description="Retrieve a page of farmer profiles, newest first."
+    )
+    def get(self, request):
+        paginator = KeysetPagination()
+        try:
+            selection = FieldSelection.from_query_params(request.query_params)
+            version_fields = FarmerProfilesListSerializer.get_version_fields(selection=selection)
+            queryset = FarmerProfilesListSerializer.setup_queryset(
+                selection=selection, required=(*paginator.key_fields, *version_fields)
+            )
+            farmer_profiles = paginator.paginate_queryset(queryset, request, view=self)
+            validators = page_validators(
+                farmer_profiles, request, version_fields, paginator.get_pagination_data()
+            )
+            response = not_modified(request, *validators)
+            if response is not None:
+                return response
+            serializer = FarmerProfilesListSerializer(farmer_profiles, many=True, selection=selection)
+            response = paginator.get_paginated_response(
+                serializer.data,
+                message="Farmer profiles retrieved successfully."
+            )
+            return set_validators(response, *validators)
+        except (InvalidCursor, InvalidFieldSelection) as exc:
+            return handle_error(
+                message=str(exc),
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception:
+            return handle_error(
+                message="An error occurred while retrieving farmer profiles.",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class FarmerProfilesNearbyView(APIView):
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=['Profiles (Farmer)'],
+        manual_parameters=nearby_parameters + field_selection_parameters,
+        responses={
+            200: FarmerProfilesListSerializer(many=True),
+            400: 'Bad Request',
+            500: 'Internal Server Error'
+        },
+        description="Retrieve farms within a radius of a point, nearest first."
     )
     def get(self, request):
         try:
-            farmer_profiles = FarmerProfile.objects.all()
-            serializer = FarmerProfilesListSerializer(farmer_profiles, many=True)
+            latitude, longitude, radius_km, limit = parse_nearby_params(request.query_params)
+            selection = FieldSelection.from_query_params(request.query_params)
+            FarmerProfilesListSerializer.plan(selection)
+        except (ValueError, InvalidFieldSelection) as exc:
+            return handle_error(
+                message=str(exc),
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            hits = nearby_farm_distances(latitude, longitude, radius_km, limit)
+            profiles = FarmerProfilesListSerializer.setup_queryset(selection=selection).in_bulk(
+                [pk for _, pk in hits]
+            )
+            data = []
+            for distance, pk in hits:
+                item = FarmerProfilesListSerializer(profiles[pk], selection=selection).data
+                item['distance_km'] = round(distance, 3)
+                data.append(item)
             return handle_success(
-                data=serializer.data,
-                message="Farmer profiles retrieved successfully.",
+                data=data,
+                message="Nearby farmer profiles retrieved successfully.",
                 status_code=status.HTTP_200_OK
             )
         except Exception:
             return handle_error(
-                message="An error occurred while retrieving farmer profiles.",
+                message="An error occurred while retrieving nearby farmer profiles.",
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
@@ -229,4 +395,532 @@ class DeleteFarmerProfileView(APIView):
             return handle_error(
                 message="An error occurred while deleting the farmer profile.",
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+class ProductListView(APIView):
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=['Products'],
+        manual_parameters=pagination_parameters + field_selection_parameters,
+        responses={
+            200: ProductListSerializer(many=True),
+            304: 'Not Modified',
+            400: 'Bad Request',
+            500: 'Internal Server Error'
+        },
+        description="Retrieve a page of product listings, newest first."
+    )
+    def get(self, request):
+        paginator = KeysetPagination()
+        try:
+            selection = FieldSelection.from_query_params(request.query_params)
+            version_fields = ProductListSerializer.get_version_fields(selection=selection)
+            queryset = ProductListSerializer.setup_queryset(
+                selection=selection, required=(*paginator.key_fields, *version_fields)
+            )
+            products = paginator.paginate_queryset(queryset, request, view=self)
+            validators = page_validators(
+                products, request, version_fields, paginator.get_pagination_data()
+            )
+            response = not_modified(request, *validators)
+            if response is not None:
+                return response
+            serializer = ProductListSerializer(products, many=True, selection=selection)
+            response = paginator.get_paginated_response(
+                serializer.data,
+                message="Product listings retrieved successfully."
+            )
+            return set_validators(response, *validators)
+        except (InvalidCursor, InvalidFieldSelection) as exc:
+            return handle_error(
+                message=str(exc),
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception:
+            return handle_error(
+                message="An error occurred while retrieving product listings.",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ProductByIDView(APIView):
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=['Products'],
+        manual_parameters=field_selection_parameters,
+        responses={
+            200: ProductDetailsSerializer,
+            304: 'Not Modified',
+            400: 'Bad Request',
+            404: 'Not Found',
+            500: 'Internal Server Error'
+        },
+        description="Retrieve a product listing by its ID."
+    )
+    def get(self, request, product_id):
+        try:
+            selection = FieldSelection.from_query_params(request.query_params)
+            # The nested farmer is part of the payload unless left out, so
+            # its edits change the tag too.
+            version_fields = ProductDetailsSerializer.get_version_fields(selection=selection)
+        except InvalidFieldSelection as exc:
+            return handle_error(
+                message=str(exc),
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        if is_conditional(request):
+            versions = instance_versions(ProductListing.objects.filter(id=product_id), version_fields)
+            if versions is not None:
+                response = not_modified(request, *instance_validators(product_id, versions))
+                if response is not None:
+                    return response
+        try:
+            product = ProductDetailsSerializer.setup_queryset(selection=selection).get(id=product_id)
+            serializer = ProductDetailsSerializer(product, selection=selection)
+            response = handle_success(
+                data=serializer.data,
+                message="Product listing retrieved successfully.",
+                status_code=status.HTTP_200_OK
+            )
+            return set_validators(response, *instance_validators(
+                product.pk, object_versions(product, version_fields)
+            ))
+        except ProductListing.DoesNotExist:
+            return handle_not_found(
+                message="Product listing not found.",
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        except Exception:
+            return handle_error(
+                message="An error occurred while retrieving the product listing.",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+def batch_lookup(request, serializer_class, noun):
+    """
+    The rows of ``serializer_class``'s model named by ?ids=, in the order
+    asked for, from one in_bulk query; ids with no row are listed under
+    ``missing``.
+    """
+    ids = list(dict.fromkeys(pk.strip() for pk in request.query_params.get('ids', '').split(',') if pk.strip()))
+    if not ids:
+        return handle_error(
+            message="Query parameter 'ids' is required.",
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+    if len(ids) > MAX_BATCH_IDS:
+        return handle_error(
+            message=f"At most {MAX_BATCH_IDS} ids are allowed per request.",
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+    invalid = [pk for pk in ids if not _is_uuid(pk)]
+    if invalid:
+        return handle_error(
+            errors={'ids': invalid},
+            message="Some ids are not valid UUIDs.",
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        selection = FieldSelection.from_query_params(request.query_params)
+        ids = list(dict.fromkeys(uuid.UUID(pk) for pk in ids))
+        found = serializer_class.setup_queryset(selection=selection, required=('id',)).in_bulk(ids)
+        return handle_success(
+            data={
+                'results': serializer_class(
+                    [found[pk] for pk in ids if pk in found], many=True, selection=selection
+                ).data,
+                'missing': [pk for pk in ids if pk not in found],
+            },
+            message=f"{noun.capitalize()} retrieved successfully.",
+            status_code=status.HTTP_200_OK
+        )
+    except InvalidFieldSelection as exc:
+        return handle_error(
+            message=str(exc),
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception:
+        return handle_error(
+            message=f"An error occurred while retrieving {noun}.",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+class FarmerProfilesBatchView(APIView):
+    """Many farmer profiles by id in one request, e.g. for a screen of farm cards."""
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=['Profiles (Farmer)'],
+        manual_parameters=batch_parameters + field_selection_parameters,
+        responses={
+            200: 'Profiles in the requested order, and the ids not found',
+            400: 'Bad Request',
+            500: 'Internal Server Error'
+        },
+        description=f"Retrieve up to {MAX_BATCH_IDS} farmer profiles by id."
+    )
+    def get(self, request):
+        return batch_lookup(request, FarmerProfileDetailsSerializer, 'farmer profiles')
+
+
+class ProductsBatchView(APIView):
+    """Many product listings by id in one request."""
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=['Products'],
+        manual_parameters=batch_parameters + field_selection_parameters,
+        responses={
+            200: 'Listings in the requested order, and the ids not found',
+            400: 'Bad Request',
+            500: 'Internal Server Error'
+        },
+        description=f"Retrieve up to {MAX_BATCH_IDS} product listings by id."
+    )
+    def get(self, request):
+        return batch_lookup(request, ProductDetailsSerializer, 'product listings')
+
+
+class ProductsNearbyView(APIView):
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=['Products'],
+        manual_parameters=nearby_parameters + field_selection_parameters,
+        responses={
+            200: ProductListSerializer(many=True),
+            400: 'Bad Request',
+            500: 'Internal Server Error'
+        },
+        description="Retrieve product listings from farms within a radius of a point, nearest farm first."
+    )
+    def get(self, request):
+        try:
+            latitude, longitude, radius_km, limit = parse_nearby_params(request.query_params)
+            selection = FieldSelection.from_query_params(request.query_params)
+            ProductListSerializer.plan(selection)
+        except (ValueError, InvalidFieldSelection) as exc:
+            return handle_error(
+                message=str(exc),
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            hits = nearby_farm_distances(latitude, longitude, radius_km, MAX_LIMIT)
+            distances = {pk: distance for distance, pk in hits}
+            # Nearest farm first, newest listing first within a farm, ranked
+            # and cut to ``limit`` in SQL.
+            farm_rank = Case(
+                *(When(farmer_id=pk, then=Value(rank)) for rank, (_, pk) in enumerate(hits)),
+                output_field=IntegerField(),
+            )
+            products = ProductListSerializer.setup_queryset(
+                ProductListing.objects.filter(farmer_id__in=distances),
+                selection=selection, required=('farmer_id',),
+            ).order_by(farm_rank, '-created_at', '-id')[:limit]
+            data = []
+            for product in products:
+                item = ProductListSerializer(product, selection=selection).data
+                item['farmer_id'] = str(product.farmer_id)
+                item['distance_km'] = round(distances[product.farmer_id], 3)
+                data.append(item)
+            return handle_success(
+                data=data,
+                message="Nearby product listings retrieved successfully.",
+                status_code=status.HTTP_200_OK
+            )
+        except Exception:
+            return handle_error(
+                message="An error occurred while retrieving nearby product listings.",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ProductCreateView(APIView):
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=['Products'],
+        request_body=ProductCreateSerializer,
+        manual_parameters=[idempotency_key_parameter],
+        responses={
+            201: ProductListSerializer,
+            404: 'Not Found',
+            409: 'A request with the same Idempotency-Key is in progress',
+            422: 'Validation Error',
+            500: 'Internal Server Error'
+        },
+        description="Create a product listing for the authenticated farmer."
+    )
+    @idempotent
+    def post(self, request):
+        try:
+            farmer_profile = request.user.farmer_profile
+        except FarmerProfile.DoesNotExist:
+            return handle_not_found(
+                message="Farmer profile not found.",
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        serializer = ProductCreateSerializer(data=request.data)
+        if serializer.is_valid():
+            try:
+                product = serializer.save(farmer=farmer_profile)
+                return handle_success(
+                    data=ProductListSerializer(product).data,
+                    message="Product listing created successfully.",
+                    status_code=status.HTTP_201_CREATED
+                )
+            except Exception:
+                return handle_error(
+                    message="An error occurred while creating the product listing.",
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+        return handle_validation_error(
+            errors=serializer.errors,
+            message="Validation failed.",
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+
+
+bulk_update_item = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'id': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID),
+        'product_name': openapi.Schema(type=openapi.TYPE_STRING),
+        'quantity': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DECIMAL),
+        'price_per_unit': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DECIMAL),
+        'description': openapi.Schema(type=openapi.TYPE_STRING),
+        'product_image': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_URI),
+    },
+    required=['id'],
+)
+
+
+class ProductBulkView(APIView):
+    """
+    Create, update or delete up to MAX_BULK_ITEMS of the authenticated
+    farmer's listings in one request and one transaction. Every item is
+    validated first; if any item fails, nothing is written and the errors
+    come back as a list aligned with the submitted items.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get_farmer_profile(self, request):
+        try:
+            return request.user.farmer_profile
+        except FarmerProfile.DoesNotExist:
+            return None
+
+    def check_items(self, items, id_of=None):
+        if not isinstance(items, list) or not items:
+            return "Expected a non-empty list of items."
+        if len(items) > MAX_BULK_ITEMS:
+            return f"At most {MAX_BULK_ITEMS} items are allowed per request."
+        if id_of is not None:
+            # Applying one listing's changes twice would count its old and
+            # new values twice in the price rollups and the feed.
+            valid = [pk for pk in map(id_of, items) if pk is not None]
+            if len(set(valid)) != len(valid):
+                return "Each id may appear only once per request."
+        return None
+
+    @swagger_auto_schema(
+        tags=['Products'],
+        request_body=ProductCreateSerializer(many=True),
+        manual_parameters=[idempotency_key_parameter],
+        responses={
+            201: ProductListSerializer(many=True),
+            400: 'Bad Request',
+            404: 'Not Found',
+            409: 'A request with the same Idempotency-Key is in progress',
+            422: 'Validation Error'
+        },
+        description="Create many product listings for the authenticated farmer."
+    )
+    @idempotent
+    def post(self, request):
+        farmer_profile = self.get_farmer_profile(request)
+        if farmer_profile is None:
+            return handle_not_found(
+                message="Farmer profile not found.",
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        problem = self.check_items(request.data)
+        if problem:
+            return handle_error(message=problem, status_code=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ProductCreateSerializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            return handle_validation_error(
+                errors=serializer.errors,
+                message="Validation failed.",
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        products = [ProductListing(farmer=farmer_profile, **item) for item in serializer.validated_data]
+        with transaction.atomic():
+            ProductListing.objects.bulk_create(products)
+            search.index_instances(products)
+            # bulk_create sends no signals, so the rollups and the feed are updated here.
+            market.apply(added=[
+                market.listing_contribution(product, farmer_profile.farm_location) for product in products
+            ])
+            feed.save_entries(feed.listing_entries(products, farmer_profile))
+        return handle_success(
+            data=ProductListSerializer(products, many=True).data,
+            message=f"{len(products)} product listings created successfully.",
+            status_code=status.HTTP_201_CREATED
+        )
+
+    @swagger_auto_schema(
+        tags=['Products'],
+        request_body=openapi.Schema(type=openapi.TYPE_ARRAY, items=bulk_update_item),
+        responses={
+            200: ProductListSerializer(many=True),
+            400: 'Bad Request',
+            404: 'Not Found',
+            422: 'Validation Error'
+        },
+        description="Partially update many of the authenticated farmer's product listings."
+    )
+    def patch(self, request):
+        farmer_profile = self.get_farmer_profile(request)
+        if farmer_profile is None:
+            return handle_not_found(
+                message="Farmer profile not found.",
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        items = request.data
+        problem = self.check_items(items, id_of=_item_id)
+        if problem:
+            return handle_error(message=problem, status_code=status.HTTP_400_BAD_REQUEST)
+
+        ids = [_item_id(item) for item in items]
+        products = ProductListing.objects.filter(farmer=farmer_profile).in_bulk(
+            [pk for pk in ids if pk is not None]
+        )
+
+        errors = []
+        updated = []
+        previous = []
+        fields = {'updated_at'}
+        for pk, item in zip(ids, items):
+            product = products.get(pk)
+            if product is None:
+                errors.append({'id': ["Product listing not found."]})
+                continue
+            serializer = ProductCreateSerializer(product, data=item, partial=True)
+            if not serializer.is_valid():
+                errors.append(serializer.errors)
+                continue
+            previous.append(market.listing_contribution(product, farmer_profile.farm_location))
+            for field, value in serializer.validated_data.items():
+                setattr(product, field, value)
+                fields.add(field)
+            updated.append(product)
+            errors.append({})
+        if any(errors):
+            return handle_validation_error(
+                errors=errors,
+                message="Validation failed.",
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+
+        now = timezone.now()
+        for product in updated:
+            product.updated_at = now
+        with transaction.atomic():
+            ProductListing.objects.bulk_update(updated, sorted(fields))
+            search.index_instances(updated)
+            market.apply(
+                added=[market.listing_contribution(product, farmer_profile.farm_location) for product in updated],
+                removed=previous,
+            )
+            feed.save_entries(feed.listing_entries(updated, farmer_profile))
+        return handle_success(
+            data=ProductListSerializer(updated, many=True).data,
+            message=f"{len(updated)} product listings updated successfully.",
+            status_code=status.HTTP_200_OK
+        )
+
+    @swagger_auto_schema(
+        tags=['Products'],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'ids': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID),
+                ),
+            },
+            required=['ids'],
+        ),
+        responses={
+            200: 'Deleted',
+            400: 'Bad Request',
+            404: 'Not Found',
+            422: 'Validation Error'
+        },
+        description="Delete many of the authenticated farmer's product listings."
+    )
+    def delete(self, request):
+        farmer_profile = self.get_farmer_profile(request)
+        if farmer_profile is None:
+            return handle_not_found(
+                message="Farmer profile not found.",
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        problem = self.check_items(ids, id_of=_parse_uuid)
+        if problem:
+            return handle_error(message=problem, status_code=status.HTTP_400_BAD_REQUEST)
+
+        ids = [_parse_uuid(pk) for pk in ids]
+        found = set(
+            ProductListing.objects
+            .filter(farmer=farmer_profile, id__in=[pk for pk in ids if pk is not None])
+            .values_list('id', flat=True)
+        )
+        errors = [{} if pk in found else {'id': ["Product listing not found."]} for pk in ids]
+        if any(errors):
+            return handle_validation_error(
+                errors=errors,
+                message="Validation failed.",
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        with transaction.atomic():
+            ProductListing.objects.filter(farmer=farmer_profile, id__in=found).delete()
+        return handle_success(
+            data={'deleted': len(found)},
+            message=f"{len(found)} product listings deleted successfully.",
+            status_code=status.HTTP_200_OK
+        )
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(str(value))
+        return True
+    except ValueError:
+        return False
+
+
+def _item_id(item):
+    return _parse_uuid(item.get('id')) if isinstance(item, dict) else None
+
+
+def _parse_uuid(value):
+    """``value`` as a UUID, whatever its case or hyphenation, or None if it is not one."""
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
@@ -0,0 +1,100 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated
+from ..serializers import FarmerProfilesListSerializer, ProductListSerializer
+from ..search import search_ids
+from shared.pagination import KeysetPagination
+from shared.responses import (
+    handle_paginated_success,
+    handle_error,
+)
+
+SEARCH_SERIALIZERS = {
+    'products': ProductListSerializer,
+    'farms': FarmerProfilesListSerializer,
+}
+
+
+def encode_offset(offset):
+    raw = json.dumps({'o': offset}, separators=(',', ':')).encode()
+    return urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_offset(value):
+    raw = urlsafe_b64decode(value + '=' * (-len(value) % 4))
+    offset = json.loads(raw)['o']
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError(offset)
+    return offset
+
+
+class SearchView(APIView):
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=['Search'],
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True,
+                              description="Words to search for; each word matches as a prefix."),
+            openapi.Parameter('type', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(SEARCH_SERIALIZERS),
+                              description="What to search: products (default) or farms."),
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Opaque cursor returned as pagination.next or pagination.previous."),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description="Number of results per page (max 200)."),
+        ],
+        responses={
+            200: 'Ranked search results',
+            400: 'Bad Request',
+            500: 'Internal Server Error'
+        },
+        description="Full-text search over product listings or farms, best match first."
+    )
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        kind = request.query_params.get('type', 'products')
+        if not query:
+            return handle_error(
+                message="Query parameter 'q' is required.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        if kind not in SEARCH_SERIALIZERS:
+            return handle_error(
+                message=f"Unknown search type '{kind}'.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            offset = decode_offset(request.query_params['cursor']) if request.query_params.get('cursor') else 0
+        except (TypeError, ValueError, KeyError):
+            return handle_error(
+                message="Invalid pagination cursor.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            page_size = KeysetPagination().get_page_size(request)
+            ids, has_more = search_ids(kind, query, offset=offset, limit=page_size)
+            serializer_class = SEARCH_SERIALIZERS[kind]
+            objects = serializer_class.setup_queryset().in_bulk(ids)
+            results = [objects[pk] for pk in ids if pk in objects]
+            serializer = serializer_class(results, many=True)
+            return handle_paginated_success(
+                data=serializer.data,
+                pagination={
+                    'next': encode_offset(offset + page_size) if has_more else None,
+                    'previous': encode_offset(max(offset - page_size, 0)) if offset else None,
+                    'page_size': page_size,
+                },
+                message="Search results retrieved successfully.",
+            )
+        except Exception:
+            return handle_error(
+                message="An error occurred while searching.",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
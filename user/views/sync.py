@@ -0,0 +1,79 @@
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated
+from .. import sync
+from shared.pagination import InvalidCursor
+from shared.responses import (
+    handle_paginated_success,
+    handle_error,
+)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class SyncView(APIView):
+    """
+    Farmer profiles and listings changed since a cursor, plus the ids of
+    those deleted, for offline clients (user/sync.py). Clients keep
+    pagination.next and send it back as ``since``; while pagination.has_more
+    is true there are further pages to fetch right away.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=['Sync'],
+        manual_parameters=[
+            openapi.Parameter('since', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Cursor from a previous response's pagination.next; leave out for a full sync."),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description=f"Changes per page (default {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE})."),
+        ],
+        responses={
+            200: 'Changed farmer profiles and products, and deleted ids',
+            400: 'Bad Request',
+            410: 'Cursor expired; sync again without one',
+            500: 'Internal Server Error'
+        },
+        description="Changes to farmer profiles and product listings since the last sync."
+    )
+    def get(self, request):
+        try:
+            page_size = int(request.query_params.get('page_size', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            page_size = 0
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            return handle_error(
+                message=f"'page_size' must be an integer between 1 and {MAX_PAGE_SIZE}.",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            since = sync.decode_cursor(request.query_params.get('since'))
+            rows, position, has_more = sync.changes(since, page_size)
+            return handle_paginated_success(
+                data=sync.serialize(rows),
+                pagination={
+                    'next': sync.encode_cursor(position),
+                    'has_more': has_more,
+                    'page_size': page_size,
+                },
+                message="Changes retrieved successfully."
+            )
+        except InvalidCursor as exc:
+            return handle_error(
+                message=str(exc),
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        except sync.CursorExpired as exc:
+            return handle_error(
+                message=str(exc),
+                status_code=status.HTTP_410_GONE
+            )
+        except Exception:
+            return handle_error(
+                message="An error occurred while retrieving changes.",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )